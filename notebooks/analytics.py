@@ -2,6 +2,94 @@ import pandas as pd
 import numpy as np
 from pyhive import hive
 
+from bootstrap import SegmentBootstrap
+from box_summary import BoxSketch
+from delivery_rules import DELAY_THRESHOLD
+from memory_budget import SAMPLE_ROWS, SpillBuffer, budget_bytes, chunk_rows, fits_in_memory, report_stage, row_bytes
+from partner_store import PartnerStore
+from zones import apply_zones, load_zones
+
+COLUMNS = [
+    "OrderID", "RestaurantLat", "RestaurantLon", "RestaurantName",
+    "FoodType", "DeliveryLat", "DeliveryLon", "CustomerArea",
+    "Weather", "PartnerID", "PartnerRating", "OrderHour", "DayType",
+    "OrderValue", "ActualDeliveryTime", "DistanceKM", "PeakHour"
+]
+ENRICHED_PATH = "datas/delivery_data_enriched.csv"
+weather_factor_map = {"Sunny": 1.0, "Cloudy": 0.9, "Rainy": 0.7, "Stormy": 0.5}
+CHURN_RATE = 0.15
+
+# Segment tables as (output column, source column, mean/sum/count); they are
+# built from per-chunk sums so the in-memory and out-of-core paths agree.
+SEGMENTS = {
+    "Weather": [
+        ("avg_delivery_time", "ActualDeliveryTime", "mean"),
+        ("avg_efficiency", "EfficiencyScore", "mean"),
+        ("delay_rate", "IsDelayed", "mean"),
+        ("revenue_loss", "RevenueLossContribution", "sum"),
+        ("order_count", "OrderID", "count"),
+    ],
+    "CustomerArea": [
+        ("avg_delivery_time", "ActualDeliveryTime", "mean"),
+        ("avg_satisfaction", "CustomerSatisfactionIndex", "mean"),
+        ("avg_order_value", "OrderValue", "mean"),
+        ("delay_rate", "IsDelayed", "mean"),
+        ("total_revenue", "OrderValue", "sum"),
+    ],
+    "PeakHour": [
+        ("avg_delivery_time", "ActualDeliveryTime", "mean"),
+        ("delay_rate", "IsDelayed", "mean"),
+        ("order_count", "OrderID", "count"),
+    ],
+}
+TOTALS = ["OrderValue", "RevenueLossContribution", "IsDelayed", "EfficiencyScore",
+          "CustomerSatisfactionIndex", "RouteOptimizationScore"]
+
+
+def enrich(frame, max_time, max_distance):
+    frame["WeatherFactor"] = frame["Weather"].map(weather_factor_map)
+
+    frame["EfficiencyScore"] = (
+        (5 - frame["ActualDeliveryTime"] / 10)
+        * frame["PartnerRating"]
+        * frame["WeatherFactor"]
+    )
+    frame["EfficiencyScore"] = frame["EfficiencyScore"].round(2)
+
+    frame["IsDelayed"] = frame["ActualDeliveryTime"] > DELAY_THRESHOLD
+    frame["RevenueLossContribution"] = frame["IsDelayed"].astype(int) * frame["OrderValue"] * CHURN_RATE
+
+    frame["TimeEfficiency"] = 1 - (frame["ActualDeliveryTime"] / max_time)
+    frame["DistanceEfficiency"] = 1 - (frame["DistanceKM"] / max_distance)
+    frame["RouteOptimizationScore"] = ((frame["DistanceEfficiency"] + frame["TimeEfficiency"]) / 2 * 100).round(2)
+
+    frame["CustomerSatisfactionIndex"] = (
+        (1 - frame["ActualDeliveryTime"] / max_time) * 0.6
+        + (frame["PartnerRating"] / 5.0) * 0.4
+    ).round(3) * 100
+    return frame
+
+
+def segment_partials(frame, by, spec):
+    columns = list(dict.fromkeys(col for _, col, func in spec if func != "count"))
+    sums = frame.groupby(by)[columns].sum()
+    sums.columns = [f"{col}__sum" for col in sums.columns]
+    sums["__count"] = frame.groupby(by).size()
+    return sums
+
+
+def segment_table(partials, spec):
+    table = pd.DataFrame(index=partials.index)
+    for out, col, func in spec:
+        if func == "count":
+            table[out] = partials["__count"]
+        elif func == "sum":
+            table[out] = partials[f"{col}__sum"]
+        else:
+            table[out] = partials[f"{col}__sum"] / partials["__count"]
+    return table.round(2)
+
+
 # --- Connect to HiveServer2 ---
 conn = hive.Connection(
     host="localhost",      # or your hive-server container name if inside docker
@@ -11,70 +99,94 @@ conn = hive.Connection(
 )
 
 # --- Read from Hive table instead of CSV ---
+# Size the job first: small tables are read whole, larger ones are streamed
+# in budget-sized chunks with intermediate aggregates spilled to disk.
+stats = pd.read_sql(
+    "SELECT COUNT(*), MAX(ActualDeliveryTime), MAX(DistanceKM) FROM delivery_data", conn
+)
+n_rows, max_time, max_distance = int(stats.iloc[0, 0]), stats.iloc[0, 1], stats.iloc[0, 2]
 query = "SELECT * FROM delivery_data"
-df = pd.read_sql(query, conn)
 
-# Normalize column names: strip table prefix and capitalize properly
-df.columns = [col.split(".")[-1] for col in df.columns]  # remove "tablename." prefix if present
-df.columns = [
-    "OrderID", "RestaurantLat", "RestaurantLon", "RestaurantName",
-    "FoodType", "DeliveryLat", "DeliveryLon", "CustomerArea",
-    "Weather", "PartnerID", "PartnerRating", "OrderHour", "DayType",
-    "OrderValue", "ActualDeliveryTime", "DistanceKM", "PeakHour"
-]
-print(df.columns.tolist())  # <-- add this temporarily to see exact names
+# Footprint of one enriched row, measured on the first rows of the table
+sample = pd.read_sql(f"{query} LIMIT {SAMPLE_ROWS}", conn)
+sample.columns = COLUMNS
+enrich(sample, max_time, max_distance)
+enriched_row_bytes = row_bytes(sample)
+del sample
+in_memory = fits_in_memory(n_rows, enriched_row_bytes)
+
+if in_memory:
+    chunks = [pd.read_sql(query, conn)]
+else:
+    rows_per_chunk = chunk_rows(enriched_row_bytes)
+    print(f"{n_rows:,} rows exceed the memory budget; streaming in chunks of {rows_per_chunk:,}")
+    chunks = pd.read_sql(query, conn, chunksize=rows_per_chunk)
+
+partner_store = PartnerStore.load()
+if not in_memory:
+    partner_store.reset()
+boots = {
+    by: SegmentBootstrap(["avg_delivery_time", "delay_rate"], memory_bytes=budget_bytes() // 20)
+    for by in SEGMENTS
+}
+partials = SpillBuffer()
+food_boxes = BoxSketch()
+zones = load_zones()
+totals = pd.Series(0.0, index=TOTALS)
+
+for i, df in enumerate(chunks):
+    # Normalize column names: strip table prefix and capitalize properly
+    df.columns = COLUMNS
+    apply_zones(df, zones)
+    enrich(df, max_time, max_distance)
+    df.to_csv(ENRICHED_PATH, index=False, mode="w" if i == 0 else "a", header=i == 0)
+
+    if in_memory:
+        partner_store.sync(df)
+    else:
+        partner_store.update(df)
+    for by, spec in SEGMENTS.items():
+        partials.add(by, segment_partials(df, by, spec))
+        boots[by].add(df[by].to_numpy(), df[["ActualDeliveryTime", "IsDelayed"]].to_numpy(dtype=float))
+    food_boxes.update(df["FoodType"].to_numpy(), df["ActualDeliveryTime"].to_numpy())
+    totals += df[TOTALS].sum().astype(float)
 conn.close()
 
-# --- Analytics (same logic as before) ---
-weather_factor_map = {"Sunny": 1.0, "Cloudy": 0.9, "Rainy": 0.7, "Stormy": 0.5}
-df["WeatherFactor"] = df["Weather"].map(weather_factor_map)
-
-df["EfficiencyScore"] = (
-    (5 - df["ActualDeliveryTime"] / 10)
-    * df["PartnerRating"]
-    * df["WeatherFactor"]
-)
-df["EfficiencyScore"] = df["EfficiencyScore"].round(2)
-
-CHURN_RATE = 0.15
-DELAY_THRESHOLD = 40
-df["IsDelayed"] = df["ActualDeliveryTime"] > DELAY_THRESHOLD
-df["RevenueLossContribution"] = df["IsDelayed"].astype(int) * df["OrderValue"] * CHURN_RATE
-
-total_revenue_loss = df["RevenueLossContribution"].sum()
+partner_store.save()
+food_boxes.save()
+partner_hours = partner_store.to_frame()[
+    ["total_orders", "unique_hours", "avg_rating", "avg_time", "utilization"]
+].round(2)
+
+segment_tables = {}
+for by, spec in SEGMENTS.items():
+    table = segment_table(partials.collect(by), spec)
+    table["delay_rate"] = (table["delay_rate"] * 100).round(1)
+    ci = boots[by].intervals()
+    ci.index = pd.Index(ci.index.tolist(), name=by)
+    ci[["delay_rate_ci_low", "delay_rate_ci_high"]] *= 100
+    segment_tables[by] = table.join(ci.round(2))
+partials.close()
+weather_impact = segment_tables["Weather"]
+area_perf = segment_tables["CustomerArea"]
+peak_perf = segment_tables["PeakHour"]
+
+total_revenue_loss = totals["RevenueLossContribution"]
 monthly_projection = total_revenue_loss * 30
 
-partner_hours = df.groupby("PartnerID").agg(
-    total_orders=("OrderID", "count"),
-    unique_hours=("OrderHour", "nunique"),
-    avg_rating=("PartnerRating", "mean"),
-    avg_time=("ActualDeliveryTime", "mean"),
-).round(2)
-partner_hours["utilization"] = (partner_hours["total_orders"] / partner_hours["unique_hours"]).round(2)
-
-df["TimeEfficiency"] = 1 - (df["ActualDeliveryTime"] / df["ActualDeliveryTime"].max())
-df["DistanceEfficiency"] = 1 - (df["DistanceKM"] / df["DistanceKM"].max())
-df["RouteOptimizationScore"] = ((df["DistanceEfficiency"] + df["TimeEfficiency"]) / 2 * 100).round(2)
-
-max_time = df["ActualDeliveryTime"].max()
-df["CustomerSatisfactionIndex"] = (
-    (1 - df["ActualDeliveryTime"] / max_time) * 0.6
-    + (df["PartnerRating"] / 5.0) * 0.4
-).round(3) * 100
-
 # --- Print Reports ---
 print("=" * 60)
 print("BUSINESS INTELLIGENCE SUMMARY (from Hive)")
 print("=" * 60)
 
-print(f"\nTotal Orders Analyzed: {len(df)}")
-print(f"Delayed Orders (>{DELAY_THRESHOLD} min): {df['IsDelayed'].sum()} ({df['IsDelayed'].mean()*100:.1f}%)")
-print(f"Total Revenue in Dataset: Rs.{df['OrderValue'].sum():,.0f}")
+print(f"\nTotal Orders Analyzed: {n_rows}")
+print(f"Delayed Orders (>{DELAY_THRESHOLD} min): {totals['IsDelayed']:.0f} ({totals['IsDelayed'] / n_rows * 100:.1f}%)")
+print(f"Total Revenue in Dataset: Rs.{totals['OrderValue']:,.0f}")
 print(f"Revenue at Risk (from delays): Rs.{total_revenue_loss:,.0f}")
 print(f"Projected Monthly Loss: Rs.{monthly_projection:,.0f}")
-print(f"Average Efficiency Score: {df['EfficiencyScore'].mean():.2f}")
-print(f"Average Customer Satisfaction: {df['CustomerSatisfactionIndex'].mean():.1f}/100")
-print(f"Average Route Optimization: {df['RouteOptimizationScore'].mean():.1f}/100")
+print(f"Average Efficiency Score: {totals['EfficiencyScore'] / n_rows:.2f}")
+print(f"Average Customer Satisfaction: {totals['CustomerSatisfactionIndex'] / n_rows:.1f}/100")
+print(f"Average Route Optimization: {totals['RouteOptimizationScore'] / n_rows:.1f}/100")
 
 print("\n" + "=" * 60)
 print("TOP 10 PARTNERS BY UTILIZATION")
@@ -84,33 +196,23 @@ print(partner_hours.sort_values("utilization", ascending=False).head(10))
 print("\n" + "=" * 60)
 print("WEATHER IMPACT ANALYSIS")
 print("=" * 60)
-weather_impact = df.groupby("Weather").agg(
-    avg_delivery_time=("ActualDeliveryTime", "mean"),
-    avg_efficiency=("EfficiencyScore", "mean"),
-    delay_rate=("IsDelayed", "mean"),
-    revenue_loss=("RevenueLossContribution", "sum"),
-    order_count=("OrderID", "count"),
-).round(2)
-weather_impact["delay_rate"] = (weather_impact["delay_rate"] * 100).round(1)
 print(weather_impact)
 
 print("\n" + "=" * 60)
 print("AREA-WISE PERFORMANCE")
 print("=" * 60)
-area_perf = df.groupby("CustomerArea").agg(
-    avg_delivery_time=("ActualDeliveryTime", "mean"),
-    avg_satisfaction=("CustomerSatisfactionIndex", "mean"),
-    avg_order_value=("OrderValue", "mean"),
-    delay_rate=("IsDelayed", "mean"),
-    total_revenue=("OrderValue", "sum"),
-).round(2)
-area_perf["delay_rate"] = (area_perf["delay_rate"] * 100).round(1)
 print(area_perf)
 
+print("\n" + "=" * 60)
+print("PEAK VS OFF-PEAK (95% bootstrap CI)")
+print("=" * 60)
+print(peak_perf)
+
 # --- Save outputs ---
-df.to_csv("datas/delivery_data_enriched.csv", index=False)
 partner_hours.to_csv("output/reports/partner_utilization.csv")
 weather_impact.to_csv("output/reports/weather_impact.csv")
 area_perf.to_csv("output/reports/area_performance.csv")
+peak_perf.to_csv("output/reports/peak_performance.csv")
 
-print("\nEnriched dataset saved to datas/delivery_data_enriched.csv")
\ No newline at end of file
+print(f"\nEnriched dataset saved to {ENRICHED_PATH}")
+report_stage("analytics")
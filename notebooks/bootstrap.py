@@ -0,0 +1,88 @@
+"""
+bootstrap.py - Poisson bootstrap confidence intervals for per-segment
+means (average delivery time, delay rate, ...) from sufficient statistics.
+
+In a Poisson bootstrap every row gets an independent Poisson(1) weight
+per resample, so the total weight of c identical rows is Poisson(c).
+Rows are therefore only counted per distinct (segment, metric values)
+tuple while streaming, one value_counts per chunk, and the resamples are
+drawn per tuple at the end. Delivery times and delay flags take few
+distinct values, so the cost follows the number of tuples rather than
+the number of orders; the draws are made in chunks whose weight matrix
+stays inside a fixed memory budget.
+"""
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_RESAMPLES = 2000
+DEFAULT_MEMORY_BYTES = 64 * 1024 ** 2
+# int64 Poisson draws and the float64 weights * values temporary, per
+# tuple per resample
+_BYTES_PER_WEIGHT = 16
+
+
+class SegmentBootstrap:
+    def __init__(self, metrics, n_boot=DEFAULT_RESAMPLES, seed=42,
+                 memory_bytes=DEFAULT_MEMORY_BYTES):
+        self.metrics = list(metrics)
+        self.n_boot = n_boot
+        self.seed = seed
+        self.chunk_rows = max(1, memory_bytes // (_BYTES_PER_WEIGHT * n_boot))
+        self.counts = None
+
+    def add(self, segments, values):
+        """Accumulate rows; ``values`` has one column per metric."""
+        segments = np.asarray(segments)
+        values = np.asarray(values, dtype=np.float64).reshape(len(segments), len(self.metrics))
+        frame = pd.DataFrame(values, columns=[f"m{j}" for j in range(len(self.metrics))])
+        frame.insert(0, "segment", segments)
+        counts = frame.value_counts(sort=False, dropna=False)
+        self.counts = counts if self.counts is None else self.counts.add(counts, fill_value=0)
+
+    def intervals(self, alpha=0.05):
+        counts = self.counts.sort_index()
+        counts = counts[counts.index.get_level_values(0).notna()]
+        codes, keys = pd.factorize(counts.index.get_level_values(0))
+        values = np.column_stack([
+            counts.index.get_level_values(j + 1).to_numpy(dtype=np.float64)
+            for j in range(len(self.metrics))
+        ])
+        lam = counts.to_numpy(dtype=np.float64)
+
+        rng = np.random.default_rng(self.seed)
+        weight_sums = np.zeros((len(keys), self.n_boot))
+        value_sums = np.zeros((len(keys), len(self.metrics), self.n_boot))
+        for start in range(0, len(lam), self.chunk_rows):
+            stop = start + self.chunk_rows
+            chunk_codes = codes[start:stop]
+            # Tuples are sorted by segment, so each segment is one run
+            starts = np.flatnonzero(np.r_[True, chunk_codes[1:] != chunk_codes[:-1]])
+            rows = chunk_codes[starts]
+            weights = rng.poisson(lam[start:stop, None], size=(len(chunk_codes), self.n_boot))
+            weight_sums[rows] += np.add.reduceat(weights, starts, axis=0, dtype=np.float64)
+            for j in range(len(self.metrics)):
+                value_sums[rows, j] += np.add.reduceat(weights * values[start:stop, j:j + 1], starts, axis=0)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            means = value_sums / weight_sums[:, None, :]
+        bounds = np.nanpercentile(means, [100 * alpha / 2, 100 * (1 - alpha / 2)], axis=-1)
+        columns = {}
+        for j, metric in enumerate(self.metrics):
+            columns[f"{metric}_ci_low"] = bounds[0, :, j]
+            columns[f"{metric}_ci_high"] = bounds[1, :, j]
+        return pd.DataFrame(columns, index=pd.Index(keys)).sort_index()
+
+
+def bootstrap_ci(df, by, alpha=0.05, n_boot=DEFAULT_RESAMPLES, seed=42,
+                 memory_bytes=DEFAULT_MEMORY_BYTES, **metrics):
+    """Per-segment CIs for the means of ``metrics`` (name=column).
+
+    Returns one row per value of ``by`` with <name>_ci_low/<name>_ci_high
+    columns, ready to join onto a ``df.groupby(by)`` result.
+    """
+    boot = SegmentBootstrap(metrics, n_boot=n_boot, seed=seed, memory_bytes=memory_bytes)
+    boot.add(df[by].to_numpy(), df[list(metrics.values())].to_numpy(dtype=np.float64))
+    result = boot.intervals(alpha)
+    result.index = pd.Index(result.index.tolist(), name=by)
+    return result
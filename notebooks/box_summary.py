@@ -0,0 +1,164 @@
+"""
+box_summary.py - Box-plot statistics from streamed histograms.
+
+Delivery times are folded per category into fixed-width histograms
+(RESOLUTION minutes per bin) while the data is aggregated, so quartiles,
+whiskers and a bounded sample of outliers can be read back later without
+keeping or sorting the raw values. The result is in the dict format
+``Axes.bxp`` draws directly.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+RESOLUTION = 0.05
+MAX_FLIERS = 200
+SKETCH_PATH = "datas/delivery_time_boxes.npz"
+
+
+class BoxSketch:
+    def __init__(self, resolution=RESOLUTION):
+        self.resolution = resolution
+        self.reset()
+
+    def reset(self):
+        self.labels = []
+        self.offsets = {}
+        self.counts = {}
+        self.vmin = {}
+        self.vmax = {}
+        self.n_rows = 0
+        self.total = 0.0
+
+    def update(self, groups, values):
+        groups = np.asarray(groups)
+        values = np.asarray(values, dtype=np.float64)
+        codes, uniques = pd.factorize(groups)
+        bins = np.floor(values / self.resolution).astype(np.int64)
+        for code, label in enumerate(uniques):
+            mask = codes == code
+            group_bins, group_values = bins[mask], values[mask]
+            low, high = group_bins.min(), group_bins.max()
+            if label not in self.counts:
+                self.labels.append(label)
+                self.offsets[label] = low
+                self.counts[label] = np.zeros(0, dtype=np.int64)
+                self.vmin[label], self.vmax[label] = np.inf, -np.inf
+            self._cover(label, low, high)
+            self.counts[label] += np.bincount(
+                group_bins - self.offsets[label], minlength=len(self.counts[label])
+            )
+            self.vmin[label] = min(self.vmin[label], group_values.min())
+            self.vmax[label] = max(self.vmax[label], group_values.max())
+        self.n_rows += len(values)
+        self.total += values.sum()
+
+    def _cover(self, label, low, high):
+        offset, counts = self.offsets[label], self.counts[label]
+        new_offset = min(offset, low)
+        new_end = max(offset + len(counts), high + 1)
+        if new_offset == offset and new_end == offset + len(counts):
+            return
+        grown = np.zeros(new_end - new_offset, dtype=np.int64)
+        grown[offset - new_offset:offset - new_offset + len(counts)] = counts
+        self.offsets[label], self.counts[label] = new_offset, grown
+
+    def _quantile(self, label, q):
+        counts = self.counts[label]
+        cum = np.cumsum(counts)
+        rank = q * (cum[-1] - 1)
+        i = np.searchsorted(cum, rank, side="right")
+        before = cum[i - 1] if i > 0 else 0
+        # Spread the bin's rows evenly across its width
+        left = (self.offsets[label] + i) * self.resolution
+        value = left + (rank - before + 0.5) / counts[i] * self.resolution
+        return float(np.clip(value, self.vmin[label], self.vmax[label]))
+
+    def stats(self, label, whis=1.5, max_fliers=MAX_FLIERS):
+        """Box-plot statistics for one category, as consumed by ``Axes.bxp``."""
+        counts = self.counts[label]
+        q1, med, q3 = (self._quantile(label, q) for q in (0.25, 0.5, 0.75))
+        low_fence, high_fence = q1 - whis * (q3 - q1), q3 + whis * (q3 - q1)
+
+        centers = (self.offsets[label] + np.arange(len(counts)) + 0.5) * self.resolution
+        centers = np.clip(centers, self.vmin[label], self.vmax[label])
+        inside = (counts > 0) & (centers >= low_fence) & (centers <= high_fence)
+        outside = (counts > 0) & ~inside
+
+        flier_values = np.repeat(centers[outside], counts[outside])
+        if len(flier_values) > max_fliers:
+            # Evenly spaced ranks keep the extremes and the shape of the tails
+            flier_values = flier_values[np.linspace(0, len(flier_values) - 1, max_fliers).astype(int)]
+
+        whislo, whishi = q1, q3
+        inside_bins = np.flatnonzero(inside)
+        if len(inside_bins):
+            first, last = inside_bins[0], inside_bins[-1]
+            # Whiskers that reach the data's extremes are known exactly
+            whislo = float(centers[first]) if outside[:first].any() else self.vmin[label]
+            whishi = float(centers[last]) if outside[last + 1:].any() else self.vmax[label]
+
+        return {
+            "label": label,
+            "med": med,
+            "q1": q1,
+            "q3": q3,
+            "whislo": whislo,
+            "whishi": whishi,
+            "fliers": flier_values,
+            "n": int(counts.sum()),
+        }
+
+    def summaries(self, whis=1.5, max_fliers=MAX_FLIERS):
+        return [self.stats(label, whis, max_fliers) for label in self.labels]
+
+    def save(self, path=SKETCH_PATH):
+        np.savez(
+            path,
+            resolution=self.resolution,
+            labels=np.asarray(self.labels, dtype=str),
+            offsets=np.array([self.offsets[label] for label in self.labels], dtype=np.int64),
+            lengths=np.array([len(self.counts[label]) for label in self.labels], dtype=np.int64),
+            counts=np.concatenate([self.counts[label] for label in self.labels] or [np.zeros(0, np.int64)]),
+            vmin=np.array([self.vmin[label] for label in self.labels]),
+            vmax=np.array([self.vmax[label] for label in self.labels]),
+            n_rows=self.n_rows,
+            total=self.total,
+        )
+
+    @classmethod
+    def load(cls, path=SKETCH_PATH):
+        sketch = cls()
+        if not os.path.exists(path):
+            return sketch
+        with np.load(path) as data:
+            sketch.resolution = float(data["resolution"])
+            sketch.labels = data["labels"].astype(object).tolist()
+            counts = np.split(data["counts"], np.cumsum(data["lengths"])[:-1])
+            for i, label in enumerate(sketch.labels):
+                sketch.offsets[label] = int(data["offsets"][i])
+                sketch.counts[label] = counts[i]
+                sketch.vmin[label] = float(data["vmin"][i])
+                sketch.vmax[label] = float(data["vmax"][i])
+            sketch.n_rows = int(data["n_rows"])
+            sketch.total = float(data["total"])
+        return sketch
+
+
+def load_box_sketch(df=None, by="FoodType", column="ActualDeliveryTime", path=SKETCH_PATH):
+    """Open the sketch saved by the aggregation pass.
+
+    With ``df`` given, the sketch is rebuilt (and re-saved) when it does
+    not describe the same rows, e.g. after the dataset was regenerated.
+    """
+    sketch = BoxSketch.load(path)
+    if df is None:
+        return sketch
+    stale = sketch.n_rows != len(df) or not np.isclose(sketch.total, df[column].sum())
+    if stale:
+        sketch.reset()
+        sketch.update(df[by].to_numpy(), df[column].to_numpy())
+        sketch.save(path)
+    return sketch
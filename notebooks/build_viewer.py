@@ -32,14 +32,21 @@ def build_viewer():
     csv_rels = [os.path.relpath(c, base) for c in csv_files]
 
     # ── Build chart cards ──────────────────────────────────────
+    # The grid shows the small thumbnail; the lightbox fetches the full
+    # variant (SVG when it was rendered) only when a chart is opened.
     chart_cards = ""
     for i, path in enumerate(chart_rels):
         name = Path(path).stem.replace("_", " ").title()
+        stem = Path(path).stem
+        thumbs = glob.glob(f"{base}/charts/thumbs/{stem}.*")
+        thumb = os.path.relpath(thumbs[0], base) if thumbs else path
+        svg = f"{base}/charts/svg/{stem}.svg"
+        full = os.path.relpath(svg, base) if os.path.exists(svg) else path
         chart_cards += f'''
             <div class="chart-card animate-in" style="animation-delay:{i*0.07}s"
-                 onclick="openLightbox('{path}','{name}')">
+                 onclick="openLightbox('{full}','{name}')">
                 <div class="chart-img-wrap">
-                    <img src="{path}" alt="{name}" loading="lazy">
+                    <img src="{thumb}" alt="{name}" loading="lazy" decoding="async">
                     <div class="chart-hover"><span class="expand-icon">⛶</span></div>
                 </div>
                 <div class="chart-label">{name}</div>
@@ -0,0 +1,77 @@
+"""
+chart_density.py - Large-N rendering for scatter / regression charts.
+
+Above DENSITY_MIN_ROWS points, charts draw a fixed-size 2D count grid
+instead of one marker per row, and the regression line and its
+confidence band are derived analytically from the sufficient statistics
+(n, sums, sums of squares and cross-products), so rendering cost no
+longer depends on the number of orders.
+"""
+
+from collections import namedtuple
+from statistics import NormalDist
+
+import numpy as np
+from matplotlib.colors import LogNorm
+
+DENSITY_MIN_ROWS = 20_000
+DENSITY_BINS = 200
+
+DensitySummary = namedtuple(
+    "DensitySummary", ["counts", "xedges", "yedges", "n", "sx", "sy", "sxx", "sxy", "syy"]
+)
+
+
+def summarize_density(x, y, bins=DENSITY_BINS):
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    counts, xedges, yedges = np.histogram2d(x, y, bins=bins)
+    return DensitySummary(
+        counts=counts.astype(np.float32),
+        xedges=xedges,
+        yedges=yedges,
+        n=len(x),
+        sx=x.sum(),
+        sy=y.sum(),
+        sxx=np.dot(x, x),
+        sxy=np.dot(x, y),
+        syy=np.dot(y, y),
+    )
+
+
+def correlation(summary):
+    n = summary.n
+    cov = summary.sxy - summary.sx * summary.sy / n
+    var_x = summary.sxx - summary.sx ** 2 / n
+    var_y = summary.syy - summary.sy ** 2 / n
+    return cov / np.sqrt(var_x * var_y)
+
+
+def regression_band(summary, x_grid, level=0.95):
+    """OLS fit of y on x with a confidence band for the mean response."""
+    n = summary.n
+    mean_x, mean_y = summary.sx / n, summary.sy / n
+    s_xx = summary.sxx - n * mean_x ** 2
+    s_xy = summary.sxy - n * mean_x * mean_y
+    s_yy = summary.syy - n * mean_y ** 2
+    slope = s_xy / s_xx
+    intercept = mean_y - slope * mean_x
+    residual_var = max(s_yy - slope * s_xy, 0.0) / (n - 2)
+
+    fitted = intercept + slope * x_grid
+    # n is large here, so the normal quantile stands in for Student's t
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    half_width = z * np.sqrt(residual_var * (1 / n + (x_grid - mean_x) ** 2 / s_xx))
+    return fitted, fitted - half_width, fitted + half_width
+
+
+def draw_density(ax, summary, cmap="Blues", line_color=None, line_width=2, regression=True):
+    counts = np.ma.masked_equal(summary.counts.T, 0)
+    mesh = ax.pcolormesh(summary.xedges, summary.yedges, counts, cmap=cmap,
+                         norm=LogNorm(vmin=1, vmax=max(1, counts.max())), shading="flat")
+    if regression:
+        x_grid = np.linspace(summary.xedges[0], summary.xedges[-1], 100)
+        fitted, low, high = regression_band(summary, x_grid)
+        ax.plot(x_grid, fitted, color=line_color, linewidth=line_width)
+        ax.fill_between(x_grid, low, high, color=line_color, alpha=0.2, linewidth=0)
+    return mesh
@@ -0,0 +1,143 @@
+"""
+chart_pool.py - Declarative chart specs rendered on a process pool.
+
+A ChartSpec bundles a plot function (module-level, so it can be pickled
+by reference), the small pre-aggregated data it draws, and the output
+path. The parent computes every aggregate once; workers only draw and
+save, each with the Agg backend and the shared theme already set up.
+Specs whose fingerprint is already in the render cache are not redrawn.
+
+Every chart is written as a full-resolution PNG plus a small thumbnail
+(WebP when Pillow supports it) downscaled from the same rasterization,
+and optionally as SVG when CHART_SVG=1. Plot functions may also return a
+plotly or folium figure, which is written as HTML.
+
+When a render service (render_service.py) is listening, specs are sent
+to it instead of paying library start-up in a fresh pool.
+"""
+
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import seaborn as sns
+from PIL import Image, features
+
+from render_cache import RenderCache, fingerprint
+from render_service import request_render
+
+THUMB_WIDTH = 480
+THUMB_FORMAT = "webp" if features.check("webp") else "png"
+
+ChartSpec = namedtuple("ChartSpec", ["name", "plot", "data", "path"])
+
+
+def setup_style():
+    matplotlib.use("Agg")
+    sns.set_theme(style="whitegrid", palette="muted")
+    plt.rcParams["figure.dpi"] = 150
+    plt.rcParams["figure.figsize"] = (12, 7)
+    plt.rcParams["font.size"] = 11
+
+
+def svg_enabled():
+    return os.environ.get("CHART_SVG", "0") == "1"
+
+
+def thumbnail_path(path):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, "thumbs", f"{os.path.splitext(name)[0]}.{THUMB_FORMAT}")
+
+
+def svg_path(path):
+    folder, name = os.path.split(path)
+    return os.path.join(folder, "svg", f"{os.path.splitext(name)[0]}.svg")
+
+
+def chart_outputs(path):
+    """Every file save_chart writes for a chart saved at ``path``."""
+    if not path.endswith(".png"):
+        return [path]
+    outputs = [path, thumbnail_path(path)]
+    if svg_enabled():
+        outputs.append(svg_path(path))
+    return outputs
+
+
+def save_chart(fig, path):
+    if hasattr(fig, "write_html"):  # plotly
+        fig.write_html(path)
+        return
+    if not hasattr(fig, "savefig"):  # folium
+        fig.save(path)
+        return
+
+    fig.savefig(path, bbox_inches="tight")
+    if svg_enabled():
+        os.makedirs(os.path.dirname(svg_path(path)), exist_ok=True)
+        fig.savefig(svg_path(path), bbox_inches="tight")
+    plt.close(fig)
+
+    thumb = thumbnail_path(path)
+    os.makedirs(os.path.dirname(thumb), exist_ok=True)
+    with Image.open(path) as image:
+        image.thumbnail((THUMB_WIDTH, THUMB_WIDTH * 4))
+        if THUMB_FORMAT == "webp":
+            image.save(thumb, "WEBP", quality=80, method=4)
+        else:
+            image.convert("P", palette=Image.ADAPTIVE).save(thumb, "PNG", optimize=True)
+
+
+def render_chart(spec):
+    start = time.perf_counter()
+    save_chart(spec.plot(spec.data), spec.path)
+    return spec.name, time.perf_counter() - start
+
+
+def render_charts(specs, n_workers=None, use_cache=True):
+    """Render every spec, in parallel when more than one core is available.
+
+    Returns {chart name: seconds spent rendering it}; charts served from
+    the render cache are reported as 0.
+    """
+    timings = {}
+    keys = {}
+    if use_cache:
+        cache = RenderCache()
+        for spec in specs:
+            keys[spec.name] = fingerprint(spec.plot, spec.data)
+            if cache.fetch(keys[spec.name], chart_outputs(spec.path)):
+                timings[spec.name] = 0.0
+                print(f"{spec.name} unchanged (cached)")
+        specs = [spec for spec in specs if spec.name not in timings]
+    if not specs:
+        return timings
+
+    rendered = {}
+    reply = request_render(specs)
+    if reply is not None:
+        rendered, errors = reply
+        print(f"Rendered {len(rendered)} of {len(specs)} charts on the render service")
+        for name, error in errors.items():
+            print(f"{name}: render service failed ({error}); rendering locally")
+    local = [spec for spec in specs if spec.name not in rendered]
+
+    if n_workers is None:
+        n_workers = min(len(local), os.cpu_count() or 1)
+    if local and n_workers <= 1:
+        setup_style()
+        rendered.update(render_chart(spec) for spec in local)
+    elif local:
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=setup_style) as pool:
+            rendered.update(pool.map(render_chart, local))
+
+    for spec in specs:
+        print(f"{spec.name} saved ({rendered[spec.name]:.2f}s)")
+        if use_cache:
+            cache.store(keys[spec.name], chart_outputs(spec.path))
+        timings[spec.name] = rendered[spec.name]
+    return timings
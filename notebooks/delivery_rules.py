@@ -0,0 +1,11 @@
+"""
+delivery_rules.py - Business definitions shared by the pipeline stages.
+
+The scripts are run directly and cannot import one another, so the rules
+that several of them and their helper modules apply to orders live here.
+"""
+
+# Lunch and dinner hours flagged as PeakHour
+PEAK_HOURS = [11, 12, 13, 18, 19, 20, 21]
+# Minutes after which a delivery counts as delayed
+DELAY_THRESHOLD = 40
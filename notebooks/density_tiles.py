@@ -0,0 +1,158 @@
+"""
+density_tiles.py - Static XYZ tile pyramid of order density for folium.
+
+Points are binned once into Web Mercator pixels at the deepest zoom, and
+every shallower zoom is aggregated from those bins by shifting pixel
+coordinates, so the cost of a pyramid depends on the number of occupied
+pixels, not on the number of orders. Each tile is splatted with a
+Gaussian (bins from a margin around the tile are included, so there are
+no seams), coloured, and written as PNG by a process pool; tiles without
+any density are never written. DENSITY_TILE_ZOOMS (env, e.g. "11-16")
+sets the zoom range.
+
+A pyramid is rebuilt only when its bins or zoom range change; the
+fingerprint of the last build is kept in the layer's manifest.json.
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import numpy as np
+from PIL import Image
+from scipy.ndimage import gaussian_filter
+
+from render_cache import fingerprint
+
+TILE_DIR = "output/maps/tiles"
+TILE_SIZE = 256
+DEFAULT_ZOOMS = "11-16"
+BLUR_PX = 4
+SATURATION_QUANTILE = 0.99
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def zoom_range():
+    low, _, high = os.environ.get("DENSITY_TILE_ZOOMS", DEFAULT_ZOOMS).partition("-")
+    low = int(low)
+    return low, int(high or low)
+
+
+def pixel_coords(lat, lon, zoom):
+    """Global Web Mercator pixel (x, y) of each point at ``zoom``."""
+    size = TILE_SIZE * 2 ** zoom
+    lat = np.radians(np.clip(np.asarray(lat, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT))
+    x = (np.asarray(lon, dtype=np.float64) + 180) / 360 * size
+    y = (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / np.pi) / 2 * size
+    return (np.clip(x, 0, size - 1).astype(np.int64),
+            np.clip(y, 0, size - 1).astype(np.int64))
+
+
+def _aggregate(px, py, weights, zoom):
+    size = TILE_SIZE * 2 ** zoom
+    keys, inverse = np.unique(px * size + py, return_inverse=True)
+    px, py = np.divmod(keys, size)
+    return px, py, np.bincount(inverse, weights=weights)
+
+
+def bin_pixels(lat, lon, weights=None, zooms=None):
+    """Occupied pixels per zoom as {zoom: (px, py, weight)}."""
+    low, high = zooms or zoom_range()
+    px, py = pixel_coords(lat, lon, high)
+    levels = {high: _aggregate(px, py, weights, high)}
+    for zoom in range(high - 1, low - 1, -1):
+        px, py, w = levels[zoom + 1]
+        levels[zoom] = _aggregate(px >> 1, py >> 1, w, zoom)
+    return levels
+
+
+def _tile_jobs(layer_dir, zoom, px, py, w, cmap):
+    # A bin within the blur margin of a tile edge also feeds the neighbour
+    margin = 3 * BLUR_PX
+    tx = np.stack([(px - margin) // TILE_SIZE, (px + margin) // TILE_SIZE])
+    ty = np.stack([(py - margin) // TILE_SIZE, (py + margin) // TILE_SIZE])
+    cand_x = np.concatenate([tx[0], tx[1], tx[0], tx[1]])
+    cand_y = np.concatenate([ty[0], ty[0], ty[1], ty[1]])
+    src = np.tile(np.arange(len(px)), 4)
+    keep = np.concatenate([
+        np.ones(len(px), dtype=bool), tx[1] != tx[0],
+        ty[1] != ty[0], (tx[1] != tx[0]) & (ty[1] != ty[0]),
+    ])
+    cand_x, cand_y, src = cand_x[keep], cand_y[keep], src[keep]
+    n_tiles = 2 ** zoom
+    inside = (cand_x >= 0) & (cand_x < n_tiles) & (cand_y >= 0) & (cand_y < n_tiles)
+    cand_x, cand_y, src = cand_x[inside], cand_y[inside], src[inside]
+
+    order = np.lexsort([cand_y, cand_x])
+    cand_x, cand_y, src = cand_x[order], cand_y[order], src[order]
+    bounds = np.flatnonzero(np.diff(cand_x * n_tiles + cand_y)) + 1
+
+    # One saturation level per zoom keeps neighbouring tiles consistent
+    peak = 1 / (2 * np.pi * BLUR_PX ** 2)
+    scale = 1 / (peak * np.quantile(w, SATURATION_QUANTILE))
+    for part in np.split(np.arange(len(src)), bounds):
+        x, y = int(cand_x[part[0]]), int(cand_y[part[0]])
+        s = src[part]
+        yield (
+            f"{layer_dir}/{zoom}/{x}/{y}.png",
+            px[s] - x * TILE_SIZE + margin, py[s] - y * TILE_SIZE + margin,
+            w[s], scale, margin, cmap,
+        )
+
+
+def render_tile(job):
+    path, lx, ly, w, scale, margin, cmap = job
+    side = TILE_SIZE + 2 * margin
+    grid = np.bincount(ly * side + lx, weights=w, minlength=side * side).reshape(side, side)
+    grid = gaussian_filter(grid, BLUR_PX, mode="constant")[margin:-margin, margin:-margin]
+    level = np.sqrt(np.clip(grid * scale, 0, 1))
+    if not (level >= 1 / 255).any():
+        return False
+
+    rgba = matplotlib.colormaps[cmap](level, bytes=True)
+    rgba[..., 3] = np.where(level >= 1 / 255, (60 + 170 * level).astype(np.uint8), 0)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.fromarray(rgba, "RGBA").save(path, compress_level=3)
+    return True
+
+
+def build_tile_pyramid(name, lat, lon, weights=None, cmap="YlOrRd", zooms=None,
+                       tile_dir=TILE_DIR, n_workers=None):
+    """Write the tile pyramid for one layer under ``tile_dir/name``.
+
+    Returns (url template relative to the maps folder, (min zoom, max
+    zoom), tiles written), with 0 tiles written when the existing
+    pyramid is still current.
+    """
+    zooms = zooms or zoom_range()
+    levels = bin_pixels(lat, lon, weights, zooms)
+    layer_dir = f"{tile_dir}/{name}"
+    url = f"{os.path.relpath(layer_dir, os.path.dirname(tile_dir))}/{{z}}/{{x}}/{{y}}.png"
+    key = fingerprint(render_tile, (levels[zooms[1]], zooms, cmap))
+
+    manifest_path = f"{layer_dir}/manifest.json"
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            if json.load(f).get("key") == key:
+                return url, zooms, 0
+    shutil.rmtree(layer_dir, ignore_errors=True)
+
+    jobs = [job for zoom, (px, py, w) in levels.items() if len(w)
+            for job in _tile_jobs(layer_dir, zoom, px, py, w, cmap)]
+    if n_workers is None:
+        n_workers = min(len(jobs), os.cpu_count() or 1)
+    if n_workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        written = sum(render_tile(job) for job in jobs)
+    else:
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            written = sum(pool.map(render_tile, jobs, chunksize=16))
+
+    os.makedirs(layer_dir, exist_ok=True)
+    with open(manifest_path, "w") as f:
+        json.dump({"key": key, "zooms": list(zooms), "tiles": written}, f)
+    return url, zooms, written
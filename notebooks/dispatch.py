@@ -0,0 +1,166 @@
+"""
+dispatch.py - Batch assignment of pending orders to delivery partners.
+
+Each order is offered only to the DISPATCH_CANDIDATES distinct partners
+closest to its restaurant (a KD-tree query over partner positions), and
+every candidate pair is costed as pickup ETA (straight-line distance at
+COURIER_KMH) plus the delivery time predicted for that order with that
+partner. A partner with capacity for several orders serves them one after
+another, so slot j of a partner is offered at that cost plus j mean trips
+of the batch. The batch is then solved as a sparse min-cost bipartite
+matching (LAPJVsp), and the reported ETAs chain each partner's orders in
+slot order: every order after the first is picked up from the previous
+drop-off once that delivery is done. Every order also gets a private
+"wait for the next batch" slot at UNASSIGNED_MINUTES, so a full matching
+always exists and orders with no free candidate are simply left
+unassigned.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_array
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+
+from geo_distance import equirectangular_km
+from spatial_index import SpatialIndex
+
+DISPATCH_CANDIDATES = 8
+DISPATCH_BATCH = 2000
+COURIER_KMH = 20
+UNASSIGNED_MINUTES = 240
+# Generator's base trip time: 10 min plus 4 min per km
+BASE_MINUTES, MINUTES_PER_KM = 10, 4
+
+
+def distance_minutes(orders, partners, order_pos, partner_pos):
+    """Delivery time from trip distance alone, for when no model is trained."""
+    return BASE_MINUTES + MINUTES_PER_KM * orders["DistanceKM"].to_numpy()[order_pos]
+
+
+def dispatch_batch(orders, partners, delivery_minutes=distance_minutes,
+                   k=DISPATCH_CANDIDATES, capacity=1):
+    """Assign a batch of orders to partners at minimum total ETA.
+
+    ``orders`` needs OrderID, RestaurantLat/Lon, DeliveryLat/Lon (when
+    ``capacity`` > 1) and whatever ``delivery_minutes`` reads;
+    ``partners`` needs PartnerID, Lat and Lon. Each partner takes at most
+    ``capacity`` orders. ``delivery_minutes`` gets the two frames and
+    aligned positional index arrays of the candidate pairs and returns
+    minutes per pair.
+
+    Returns one row per order with the chosen PartnerID (missing when
+    unassigned), pickup distance and the ETA components; QueueMin is the
+    time the partner spends on its earlier orders of the batch.
+    """
+    n_orders = len(orders)
+    n_slots = len(partners) * capacity
+    k = min(k, len(partners))
+    index = SpatialIndex(partners["Lat"].to_numpy(), partners["Lon"].to_numpy())
+    pickup_m, cand = index.knn(orders["RestaurantLat"], orders["RestaurantLon"], k=k)
+
+    order_pos = np.repeat(np.arange(n_orders), k)
+    partner_pos = cand.ravel()
+    pickup_min = pickup_m.ravel() / 1000 / COURIER_KMH * 60
+    delivery_min = np.asarray(delivery_minutes(orders, partners, order_pos, partner_pos), dtype=np.float64)
+    # Explicit zeros are not edges, so keep every weight strictly positive
+    cost = np.maximum(pickup_min + delivery_min, 1e-3)
+
+    # Slot j of a partner comes after j earlier orders, each about one
+    # mean trip of this batch
+    slot_cost = cost[:, None] + cost.mean() * np.arange(capacity)
+    slot_pos = (partner_pos[:, None] * capacity + np.arange(capacity)).ravel()
+    rows = np.concatenate([np.repeat(order_pos, capacity), np.arange(n_orders)])
+    cols = np.concatenate([slot_pos, n_slots + np.arange(n_orders)])
+    weights = np.concatenate([slot_cost.ravel(), np.full(n_orders, UNASSIGNED_MINUTES, dtype=np.float64)])
+    graph = csr_array((weights, (rows, cols)), shape=(n_orders, n_slots + n_orders))
+    matched_rows, matched_cols = min_weight_full_bipartite_matching(graph)
+
+    chosen = np.full(n_orders, -1, dtype=np.int64)
+    slot = np.full(n_orders, -1, dtype=np.int64)
+    on_partner = matched_cols < n_slots
+    chosen[matched_rows] = np.where(on_partner, matched_cols // capacity, -1)
+    slot[matched_rows] = np.where(on_partner, matched_cols % capacity, -1)
+    # Position of the chosen partner within each order's candidate list (-1: unassigned)
+    hit = cand == chosen[:, None]
+    pick = np.where(hit.any(axis=1), hit.argmax(axis=1), -1)
+    pair = np.arange(n_orders) * k + np.maximum(pick, 0)
+    assigned = pick >= 0
+
+    # Chain each partner's orders in slot order: the first is picked up
+    # from the partner's position, later ones from the previous drop-off
+    pickup_km = pickup_m.ravel()[pair] / 1000
+    queue_min = np.zeros(n_orders)
+    if capacity > 1:
+        rest_lat, rest_lon = orders["RestaurantLat"].to_numpy(), orders["RestaurantLon"].to_numpy()
+        drop_lat, drop_lon = orders["DeliveryLat"].to_numpy(), orders["DeliveryLon"].to_numpy()
+        free_at = np.zeros(len(partners))
+        at_lat = partners["Lat"].to_numpy(dtype=np.float64, copy=True)
+        at_lon = partners["Lon"].to_numpy(dtype=np.float64, copy=True)
+        served = np.flatnonzero(assigned)
+        served = served[np.lexsort((slot[served], chosen[served]))]
+        rank = np.arange(len(served)) - np.searchsorted(chosen[served], chosen[served])
+        for r in range(capacity):
+            now = served[rank == r]
+            p = chosen[now]
+            if r > 0:
+                pickup_km[now] = equirectangular_km(at_lat[p], at_lon[p], rest_lat[now], rest_lon[now])
+            queue_min[now] = free_at[p]
+            free_at[p] += pickup_km[now] / COURIER_KMH * 60 + delivery_min[pair[now]]
+            at_lat[p], at_lon[p] = drop_lat[now], drop_lon[now]
+    leg_min = pickup_km / COURIER_KMH * 60
+    eta = queue_min + leg_min + delivery_min[pair]
+
+    partner_ids = partners["PartnerID"].to_numpy()[partner_pos[pair]]
+    return pd.DataFrame({
+        "OrderID": orders["OrderID"].to_numpy(),
+        "PartnerID": np.where(assigned, partner_ids, None),
+        "PickupKM": np.where(assigned, pickup_km, np.nan).round(2),
+        "QueueMin": np.where(assigned, queue_min, np.nan).round(1),
+        "PickupMin": np.where(assigned, leg_min, np.nan).round(1),
+        "DeliveryMin": np.where(assigned, delivery_min[pair], np.nan).round(1),
+        "ETA": np.where(assigned, eta, np.nan).round(1),
+    })
+
+
+def fixed_batches(orders, batch_size=DISPATCH_BATCH):
+    return (orders.iloc[start:start + batch_size] for start in range(0, len(orders), batch_size))
+
+
+def dispatch_stream(batches, partners, delivery_minutes=distance_minutes, **kwargs):
+    """Dispatch each batch of orders against the same partner pool.
+
+    Returns (assignments, stats); stats holds throughput and the mean
+    per-batch assignment latency, i.e. how long an order waits for its
+    batch to be solved.
+    """
+    results, latencies = [], []
+    for batch in batches:
+        began = time.perf_counter()
+        results.append(dispatch_batch(batch, partners, delivery_minutes, **kwargs))
+        latencies.append(time.perf_counter() - began)
+
+    assignments = pd.concat(results, ignore_index=True)
+    elapsed = sum(latencies)
+    stats = {
+        "orders": len(assignments),
+        "assigned": int(assignments["PartnerID"].notna().sum()),
+        "batches": len(latencies),
+        "orders_per_s": len(assignments) / elapsed if elapsed else float("inf"),
+        "mean_latency_ms": 1000 * elapsed / max(len(latencies), 1),
+        "mean_eta": assignments["ETA"].mean(),
+    }
+    return assignments, stats
+
+
+def partner_positions(df):
+    """Each partner's last drop-off as their current position, with
+    their latest rating."""
+    last = df.groupby("PartnerID").last()
+    return pd.DataFrame({
+        "PartnerID": last.index,
+        "Lat": last["DeliveryLat"].to_numpy(),
+        "Lon": last["DeliveryLon"].to_numpy(),
+        "PartnerRating": last["PartnerRating"].to_numpy(),
+    })
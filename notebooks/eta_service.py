@@ -0,0 +1,229 @@
+"""
+eta_service.py - Low-latency delivery-time estimates from the registered model.
+
+The latest model artifact is loaded once. Single-order requests from any
+number of threads go onto one queue; a worker thread drains whatever has
+arrived, up to MAX_BATCH orders or MAX_WAIT_MS after the first, and
+scores the batch with one model call, so concurrent callers share the
+fixed per-call cost of the model. The same service is exposed in-process
+and over local HTTP:
+
+    python notebooks/eta_service.py serve       # start (foreground)
+    python notebooks/eta_service.py status
+
+    curl -s localhost:6012/eta -d '{"DistanceKM": 3.2, "PartnerRating": 4.1,
+        "OrderHour": 19, "OrderValue": 320, "Weather": "Rainy",
+        "FoodType": "Pizza", "CustomerArea": "Downtown", "DayType": "Weekday"}'
+
+    from eta_service import EtaService
+    with EtaService() as service:
+        minutes = service.predict(order)
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from model_registry import load_model
+
+SERVICE_HOST = "127.0.0.1"
+DEFAULT_PORT = 6012
+MAX_BATCH = 64
+MAX_WAIT_MS = 1.0
+
+
+def service_address():
+    return SERVICE_HOST, int(os.environ.get("ETA_SERVICE_PORT", DEFAULT_PORT))
+
+
+class EtaService:
+    """Micro-batching ETA predictor around one loaded EtaModel."""
+
+    def __init__(self, eta_model=None, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS):
+        if eta_model is None:
+            loaded = load_model()
+            if loaded is None:
+                raise FileNotFoundError("no registered ETA model; run predictive_model.py first")
+            self.version, eta_model = loaded
+        else:
+            self.version = None
+        self.eta_model = eta_model
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.scored = 0
+        self._queue = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._run, name="eta-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, order):
+        """Future of the predicted minutes for one order dict."""
+        future = Future()
+        self._queue.put((order, future))
+        return future
+
+    def predict(self, order, timeout=None):
+        return self.submit(order).result(timeout)
+
+    def predict_many(self, orders):
+        """Bulk scoring, bypassing the queue."""
+        return self.eta_model.predict(orders)
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._score(batch)
+                    return
+                batch.append(item)
+            self._score(batch)
+
+    def _score(self, batch):
+        orders = [order for order, _ in batch]
+        try:
+            minutes = self.eta_model.predict(orders)
+        except Exception:
+            # One bad order must not fail the others; score them one by one
+            for order, future in batch:
+                try:
+                    future.set_result(float(self.eta_model.predict([order])[0]))
+                except Exception as exc:
+                    future.set_exception(exc)
+        else:
+            for (_, future), value in zip(batch, minutes):
+                future.set_result(float(value))
+        self.batches += 1
+        self.scored += len(batch)
+
+
+def benchmark(service, orders, n_threads=16):
+    """Send ``orders`` as single requests from ``n_threads`` threads;
+    returns per-request latency percentiles and throughput."""
+    latencies = np.empty(len(orders))
+    batches_before, scored_before = service.batches, service.scored
+
+    def client(start):
+        for i in range(start, len(orders), n_threads):
+            began = time.perf_counter()
+            service.predict(orders[i])
+            latencies[i] = time.perf_counter() - began
+
+    began = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(t,)) for t in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - began
+    p50, p99 = np.percentile(latencies * 1000, [50, 99])
+    return {
+        "requests": len(orders),
+        "p50_ms": p50,
+        "p99_ms": p99,
+        "requests_per_s": len(orders) / elapsed,
+        "mean_batch": (service.scored - scored_before) / max(service.batches - batches_before, 1),
+    }
+
+
+def _handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "model": service.eta_model.name, "version": service.version})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/eta":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                if not isinstance(body, (dict, list)):
+                    raise ValueError("expected an order object or a list of orders")
+                if isinstance(body, list):
+                    minutes = [round(float(m), 1) for m in service.predict_many(body)]
+                else:
+                    minutes = round(service.predict(body), 1)
+            except KeyError as exc:
+                self._reply(400, {"error": f"missing field {exc}"})
+            except (ValueError, TypeError, AttributeError) as exc:
+                self._reply(400, {"error": str(exc)})
+            except Exception as exc:
+                self._reply(500, {"error": f"{type(exc).__name__}: {exc}"})
+            else:
+                self._reply(200, {"eta_minutes": minutes})
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def service_running():
+    host, port = service_address()
+    try:
+        with urllib.request.urlopen(f"http://{host}:{port}/health", timeout=1) as response:
+            return json.load(response).get("status") == "ok"
+    except (OSError, ValueError):
+        return False
+
+
+def serve():
+    with EtaService() as service:
+        server = ThreadingHTTPServer(service_address(), _handler(service))
+        host, port = service_address()
+        print(f"ETA service ready on {host}:{port} "
+              f"({service.eta_model.name}, model v{service.version})", flush=True)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+    print("ETA service stopped")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "serve":
+        serve()
+    elif command == "status":
+        print("running" if service_running() else "not running")
+    else:
+        sys.exit(f"usage: {sys.argv[0]} [serve|status]")
@@ -0,0 +1,226 @@
+"""
+fleet_sim.py - Discrete-event simulation of a delivery fleet over a day.
+
+Orders arrive in time order; partner "drop completed" and hourly shift
+changes are events on a heap. An arriving order goes to an idle partner
+(the nearest one, or any one, depending on the dispatch policy) or
+waits in a FIFO queue that partners drain as they finish. A partner
+rides to the restaurant, waits for the food if it is not ready, rides
+to the customer and becomes idle there. Coordinates are projected to km
+once, all per-order state lives in plain lists, and idle partners are
+kept in packed float32 arrays so the nearest-partner lookup is one
+vectorized argmin; scenario sweeps fan out over a process pool, one
+scenario per worker.
+"""
+
+import heapq
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from delivery_rules import DELAY_THRESHOLD
+from dispatch import COURIER_KMH
+from geo_distance import project_km
+
+# Straight-line km to road km
+DETOUR_FACTOR = 1.3
+PREP_MINUTES = {"Pizza": 5, "Chinese": 3, "Indian": 6, "Fast Food": 2, "Desserts": 1}
+POLICIES = ("nearest", "any")
+
+_FREE, _SHIFT = 0, 1
+
+
+def orders_from(df, n_orders=None, seed=0, jitter_km=0.2):
+    """Simulation input from recorded orders.
+
+    With ``n_orders`` unset every row is replayed; otherwise rows are
+    resampled to ``n_orders`` with drop-offs jittered by ``jitter_km``.
+    Arrival minutes are spread uniformly within each OrderHour.
+    """
+    rng = np.random.default_rng(seed)
+    rows = np.arange(len(df)) if n_orders is None else rng.integers(0, len(df), n_orders)
+    ref_lat = float(df["DeliveryLat"].mean())
+    rest = project_km(df["RestaurantLat"].to_numpy()[rows], df["RestaurantLon"].to_numpy()[rows], ref_lat)
+    drop = project_km(df["DeliveryLat"].to_numpy()[rows], df["DeliveryLon"].to_numpy()[rows], ref_lat)
+    if n_orders is not None:
+        drop += rng.normal(0, jitter_km, drop.shape)
+
+    orders = pd.DataFrame({
+        "arrival_min": df["OrderHour"].to_numpy()[rows] * 60 + rng.uniform(0, 60, len(rows)),
+        "rest_x": rest[:, 0], "rest_y": rest[:, 1],
+        "drop_x": drop[:, 0], "drop_y": drop[:, 1],
+        "prep_min": df["FoodType"].map(PREP_MINUTES).fillna(5).to_numpy()[rows],
+    })
+    return orders.sort_values("arrival_min", ignore_index=True)
+
+
+def simulate(orders, staffing, policy="nearest", speed_kmh=COURIER_KMH, seed=0):
+    """Run one day. ``staffing[h]`` partners are on shift during hour h.
+
+    Partners joining a shift start idle at a random restaurant; partners
+    leaving it finish their current order first, so utilization (busy
+    time over shift time) can pass 1 when a shift overruns. Orders still
+    queued after the last shift count as delayed. Returns a dict of
+    service metrics.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown dispatch policy: {policy!r}")
+    rng = np.random.default_rng(seed)
+    staffing = [int(s) for s in staffing]
+    nearest = policy == "nearest"
+    min_per_km = 60 * DETOUR_FACTOR / speed_kmh
+
+    arrival = orders["arrival_min"].tolist()
+    rest_x, rest_y = orders["rest_x"].tolist(), orders["rest_y"].tolist()
+    drop_x, drop_y = orders["drop_x"].tolist(), orders["drop_y"].tolist()
+    prep = orders["prep_min"].tolist()
+    n_orders = len(arrival)
+    delivered = [0.0] * n_orders
+    waited = [0.0] * n_orders
+    done = [False] * n_orders
+
+    # Idle partners never outnumber the largest shift. Their positions are
+    # kept as float32 offsets from the service area's corner, which halves
+    # the memory the nearest-partner scan streams through.
+    x0 = float(orders["rest_x"].min()) if n_orders else 0.0
+    y0 = float(orders["rest_y"].min()) if n_orders else 0.0
+    max_idle = max(staffing, default=0) + 1
+    idle_id = np.zeros(max_idle, dtype=np.int64)
+    idle_x = np.zeros(max_idle, dtype=np.float32)
+    idle_y = np.zeros(max_idle, dtype=np.float32)
+    n_idle = 0
+    pos_x, pos_y = [], []
+    on_shift = 0
+    leaving = 0
+    busy_min = 0.0
+
+    events = [(h * 60.0, _SHIFT, h) for h in range(len(staffing))]
+    heapq.heapify(events)
+    queue = deque()
+
+    def assign(p, o, now):
+        nonlocal busy_min
+        to_rest = ((pos_x[p] - rest_x[o]) ** 2 + (pos_y[p] - rest_y[o]) ** 2) ** 0.5 * min_per_km
+        ride = ((rest_x[o] - drop_x[o]) ** 2 + (rest_y[o] - drop_y[o]) ** 2) ** 0.5 * min_per_km
+        finish = max(now + to_rest, arrival[o] + prep[o]) + ride
+        delivered[o] = finish - arrival[o]
+        waited[o] = now - arrival[o]
+        done[o] = True
+        busy_min += finish - now
+        pos_x[p], pos_y[p] = drop_x[o], drop_y[o]
+        heapq.heappush(events, (finish, _FREE, p))
+
+    def make_idle(p):
+        nonlocal n_idle
+        idle_id[n_idle], idle_x[n_idle], idle_y[n_idle] = p, pos_x[p] - x0, pos_y[p] - y0
+        n_idle += 1
+
+    def take_idle(j):
+        nonlocal n_idle
+        p = int(idle_id[j])
+        n_idle -= 1
+        idle_id[j], idle_x[j], idle_y[j] = idle_id[n_idle], idle_x[n_idle], idle_y[n_idle]
+        return p
+
+    i = 0
+    restaurants = np.column_stack([orders["rest_x"].to_numpy(), orders["rest_y"].to_numpy()])
+    while i < n_orders or events:
+        if events and (i >= n_orders or events[0][0] <= arrival[i]):
+            now, kind, who = heapq.heappop(events)
+            if kind == _FREE:
+                if leaving:
+                    leaving -= 1
+                    on_shift -= 1
+                elif queue:
+                    assign(who, queue.popleft(), now)
+                else:
+                    make_idle(who)
+                continue
+
+            target = staffing[who]
+            if i >= n_orders and not queue:
+                continue
+            change = target - (on_shift - leaving)
+            cancel = min(max(change, 0), leaving)
+            leaving -= cancel
+            change -= cancel
+            for _ in range(max(change, 0)):
+                p = len(pos_x)
+                spawn = restaurants[rng.integers(0, len(restaurants))] if len(restaurants) else (0.0, 0.0)
+                pos_x.append(float(spawn[0]))
+                pos_y.append(float(spawn[1]))
+                on_shift += 1
+                if queue:
+                    assign(p, queue.popleft(), now)
+                else:
+                    make_idle(p)
+            while change < 0 and n_idle:
+                take_idle(n_idle - 1)
+                on_shift -= 1
+                change += 1
+            leaving += -change if change < 0 else 0
+            continue
+
+        now, o = arrival[i], i
+        i += 1
+        if not n_idle:
+            queue.append(o)
+            continue
+        if nearest and n_idle > 1:
+            dx, dy = idle_x[:n_idle] - (rest_x[o] - x0), idle_y[:n_idle] - (rest_y[o] - y0)
+            j = int((dx * dx + dy * dy).argmin())
+        else:
+            j = n_idle - 1
+        assign(take_idle(j), o, now)
+
+    done = np.asarray(done, dtype=bool)
+    delivered = np.asarray(delivered)[done]
+    waited = np.asarray(waited)[done]
+    shift_min = 60.0 * sum(staffing)
+    # Orders still queued when the last shift ends count as delayed
+    late = int((delivered > DELAY_THRESHOLD).sum()) + n_orders - len(delivered)
+    return {
+        "orders": n_orders,
+        "served": len(delivered),
+        "mean_delivery": float(delivered.mean()) if len(delivered) else np.nan,
+        "p90_delivery": float(np.percentile(delivered, 90)) if len(delivered) else np.nan,
+        "delay_rate": late / n_orders if n_orders else np.nan,
+        "mean_wait": float(waited.mean()) if len(waited) else np.nan,
+        "utilization": busy_min / shift_min if shift_min else np.nan,
+    }
+
+
+_sweep_orders = None
+
+
+def _run_scenario(scenario):
+    name, staffing, policy = scenario
+    return {"scenario": name, "policy": policy, **simulate(_sweep_orders, staffing, policy)}
+
+
+def sweep(orders, scenarios, n_workers=None):
+    """Simulate every (name, staffing, policy) scenario against the same
+    orders, one scenario per worker process. Returns one row per scenario.
+    """
+    global _sweep_orders
+    scenarios = list(scenarios)
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(scenarios))
+    _sweep_orders = orders
+    try:
+        # Forked workers inherit the orders instead of unpickling a copy each
+        if n_workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            rows = [_run_scenario(s) for s in scenarios]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                rows = list(pool.map(_run_scenario, scenarios))
+    finally:
+        _sweep_orders = None
+    return pd.DataFrame(rows).set_index("scenario")
@@ -1,7 +1,15 @@
+import json
+import os
+
 import pandas as pd
 import numpy as np
 import random
 
+from delivery_rules import PEAK_HOURS
+from geo_distance import haversine_km
+from memory_budget import report_stage
+from zones import ZONES_PATH, box_zones
+
 np.random.seed(42)
 random.seed(42)
 
@@ -63,13 +71,13 @@ for i in range(1, n_orders + 1):
         weights=[2, 3, 5, 8, 10, 5, 3, 3, 6, 9, 10, 8, 5, 3, 2]
     )[0]
 
-    is_peak = 1 if hour in [11, 12, 13, 18, 19, 20, 21] else 0
+    is_peak = 1 if hour in PEAK_HOURS else 0
 
     pid = random.choice(partner_ids)
     p_rating = partner_base_ratings[pid] + np.random.normal(0, 0.2)
     p_rating = round(max(1.0, min(5.0, p_rating)), 1)
 
-    distance = np.sqrt((rest_lat - del_lat)**2 + (rest_lon - del_lon)**2) * 111
+    distance = haversine_km(rest_lat, rest_lon, del_lat, del_lon)
     distance = round(max(0.5, distance + np.random.normal(0, 0.5)), 2)
 
     base_time = 10 + distance * 4
@@ -109,9 +117,18 @@ for i in range(1, n_orders + 1):
 df = pd.DataFrame(orders)
 df.to_csv("datas/delivery_data.csv", index=False)
 
+# Zone polygons used to assign CustomerArea at ingest; real zone
+# boundaries can replace this file and are then left alone
+if not os.path.exists(ZONES_PATH):
+    with open(ZONES_PATH, "w") as f:
+        json.dump(box_zones(area_coords), f, indent=2)
+    print(f"Zone polygons saved to {ZONES_PATH}")
+
 print(f"Generated {len(df)} orders")
 print(f"Columns: {list(df.columns)}")
 print(f"\nFirst 5 rows:")
 print(df.head())
 print(f"\nBasic stats:")
 print(df.describe())
+
+report_stage("generate_data")
@@ -1,6 +1,13 @@
+import os
+
 import pandas as pd
 import numpy as np
 
+from memory_budget import report_stage
+from partner_store import load_partner_store
+from scenario_engine import SCENARIO_PATH
+from staffing import OBSERVED, STAFFING_PATH
+
 df = pd.read_csv("datas/delivery_data_enriched.csv")
 
 total_orders = len(df)
@@ -16,20 +23,13 @@ weather_impact = df.groupby("Weather").agg(
     count=("OrderID", "count"),
 ).round(2)
 
-partner_tiers = df.groupby("PartnerID").agg(
-    avg_rating=("PartnerRating", "mean"),
-    avg_time=("ActualDeliveryTime", "mean"),
-    orders=("OrderID", "count"),
-).round(2)
+# Bootstrap CIs as computed by analytics.py
+weather_ci = pd.read_csv("output/reports/weather_impact.csv", index_col="Weather")
+weather_impact = weather_impact.join(weather_ci[["avg_delivery_time_ci_low", "avg_delivery_time_ci_high"]])
 
-def tier(r):
-    if r["avg_rating"] >= 4.0 and r["avg_time"] < 35:
-        return "Premium"
-    elif r["avg_rating"] >= 3.0 and r["avg_time"] < 45:
-        return "Standard"
-    return "Training"
-
-partner_tiers["tier"] = partner_tiers.apply(tier, axis=1)
+partner_tiers = load_partner_store(df).to_frame()[
+    ["avg_rating", "avg_time", "total_orders", "tier"]
+].rename(columns={"total_orders": "orders"}).round(2)
 tier_counts = partner_tiers["tier"].value_counts()
 
 area_perf = df.groupby("CustomerArea").agg(
@@ -37,6 +37,49 @@ area_perf = df.groupby("CustomerArea").agg(
     delay_pct=("IsDelayed", "mean"),
     total_rev=("OrderValue", "sum"),
 ).round(2)
+area_ci = pd.read_csv("output/reports/area_performance.csv", index_col="CustomerArea")
+area_perf = area_perf.join(area_ci[["delay_rate_ci_low", "delay_rate_ci_high"]])
+
+peak_ci = pd.read_csv("output/reports/peak_performance.csv", index_col="PeakHour")
+
+# Monte Carlo outcomes written by predictive_model.py
+if os.path.exists(SCENARIO_PATH):
+    outcomes = pd.read_csv(SCENARIO_PATH)
+    weather_outlook = outcomes[outcomes["peak_share"].isna() & outcomes["min_rating"].isna()]
+    if weather_outlook.empty:
+        weather_outlook = None
+    # The scenario grid can be narrowed with SCENARIO_* settings, so the
+    # storm cells may be missing
+    storm = outcomes[(outcomes["weather"] == "Storm") & outcomes["peak_share"].isna()]
+    storm_all = storm[storm["min_rating"].isna()]
+    storm_top = storm[storm["min_rating"].notna()]
+    if storm_all.empty or storm_top.empty:
+        contingency_impact = "No simulated storm day with and without a rating floor to compare"
+    else:
+        storm_day_saving = storm_all["revenue_at_risk"].iloc[0] - storm_top["revenue_at_risk"].iloc[0]
+        storm_days_per_month = 30 * (df["Weather"] == "Stormy").mean()
+        contingency_impact = (
+            f"Estimated Rs.{storm_day_saving * storm_days_per_month:,.0f} monthly savings "
+            f"(Rs.{storm_day_saving:,.0f} per storm day)"
+        )
+else:
+    weather_outlook = None
+    contingency_impact = "Run predictive_model.py for a simulated estimate"
+
+# Queueing staffing plan written by predictive_model.py, capped at the fleet
+if os.path.exists(STAFFING_PATH):
+    staffing = pd.read_csv(STAFFING_PATH)
+    staffing = staffing[staffing["Scenario"] == OBSERVED].groupby("OrderHour").agg(
+        partners=("partners", "sum"), shortfall=("shortfall", "first"))
+    needed = staffing["partners"] + staffing["shortfall"]
+    short = staffing[staffing["shortfall"] > 0]
+    staffing_note = (
+        f"Queueing model needs up to {needed.max()} partners ({needed.idxmax():02d}:00); "
+        f"the fleet of {df['PartnerID'].nunique()}\n"
+        f"            is short in {len(short)} of {len(staffing)} hours, by {short['shortfall'].sum()} partner-hours"
+    )
+else:
+    staffing_note = "Run predictive_model.py for a queueing staffing plan"
 
 report = f"""
 {'='*70}
@@ -71,9 +114,18 @@ partners are the primary contributors.
 """
 
 for weather, row in weather_impact.iterrows():
-    report += f"  {weather:10s} | Avg Time: {row['avg_time']:5.1f} min | "
+    report += f"  {weather:10s} | Avg Time: {row['avg_time']:5.1f} min "
+    report += f"[95% CI {row['avg_delivery_time_ci_low']:.1f}-{row['avg_delivery_time_ci_high']:.1f}] | "
     report += f"Revenue Loss: Rs.{row['loss']:8,.0f} | Orders: {row['count']}\n"
 
+if weather_outlook is not None:
+    report += f"\nSimulated daily outlook ({int(weather_outlook['orders'].iloc[0]):,} orders per weather mix):\n"
+    for _, row in weather_outlook.iterrows():
+        report += f"  {row['weather']:10s} | Delay Rate: {row['delay_rate']*100:5.1f}% "
+        report += f"[90% {row['delay_rate_p5']*100:.1f}-{row['delay_rate_p95']*100:.1f}%] | "
+        report += f"Revenue at Risk: Rs.{row['revenue_at_risk']:,.0f}/day "
+        report += f"[90% {row['revenue_at_risk_p5']:,.0f}-{row['revenue_at_risk_p95']:,.0f}]\n"
+
 report += f"""
 Recommendation: Implement dynamic pricing and extended delivery windows
 during Rainy and Stormy conditions. Consider surge partner deployment.
@@ -110,7 +162,9 @@ report += f"""
 
 for area, row in area_perf.iterrows():
     report += f"  {area:20s} | Avg Time: {row['avg_time']:5.1f} min | "
-    report += f"Delay Rate: {row['delay_pct']*100:5.1f}% | Revenue: Rs.{row['total_rev']:,.0f}\n"
+    report += f"Delay Rate: {row['delay_pct']*100:5.1f}% "
+    report += f"[95% CI {row['delay_rate_ci_low']:.1f}-{row['delay_rate_ci_high']:.1f}%] | "
+    report += f"Revenue: Rs.{row['total_rev']:,.0f}\n"
 
 report += f"""
 {'='*70}
@@ -136,8 +190,8 @@ report += f"""
 
 RECOMMENDATION 1: Weather Contingency Protocol
   Problem:  Stormy weather increases delivery time by ~15 minutes
-  Action:   Deploy 30% more partners during weather alerts
-  Impact:   Estimated Rs.{weather_impact.loc['Stormy','loss'] * 0.5:,.0f} monthly savings
+  Action:   Give storm-day orders to partners rated 4.0 and above
+  Impact:   {contingency_impact}
 
 RECOMMENDATION 2: Partner Training Program
   Problem:  {tier_counts.get('Training', 0)} partners below performance thresholds
@@ -145,8 +199,11 @@ RECOMMENDATION 2: Partner Training Program
   Impact:   Projected 15% improvement in delivery times for trained partners
 
 RECOMMENDATION 3: Peak Hour Optimization
-  Problem:  Peak hours show {df[df['PeakHour']==1]['ActualDeliveryTime'].mean():.1f} min avg vs
-            {df[df['PeakHour']==0]['ActualDeliveryTime'].mean():.1f} min off-peak
+  Problem:  Peak hours show {df[df['PeakHour']==1]['ActualDeliveryTime'].mean():.1f} min avg \
+[95% CI {peak_ci.loc[1, 'avg_delivery_time_ci_low']:.1f}-{peak_ci.loc[1, 'avg_delivery_time_ci_high']:.1f}] vs
+            {df[df['PeakHour']==0]['ActualDeliveryTime'].mean():.1f} min off-peak \
+[95% CI {peak_ci.loc[0, 'avg_delivery_time_ci_low']:.1f}-{peak_ci.loc[0, 'avg_delivery_time_ci_high']:.1f}]
+  Staffing: {staffing_note}
   Action:   Pre-position partners in high-demand zones 30 min before peak
   Impact:   Estimated 20% reduction in peak-hour delays
 
@@ -176,4 +233,6 @@ with open("output/reports/final_report.txt", "w") as f:
     f.write(report)
 
 print(report)
-print("\nReport saved to output/reports/final_report.txt")
\ No newline at end of file
+print("\nReport saved to output/reports/final_report.txt")
+
+report_stage("generate_report")
@@ -0,0 +1,82 @@
+"""
+geo_distance.py - Vectorized great-circle distances.
+
+All functions take NumPy arrays (or scalars) and broadcast, so a whole
+column of orders is one call. ``haversine_km`` is exact on the sphere;
+``equirectangular_km`` skips the trigonometry per pair and is within
+0.1% of it at city scale. ``distance_matrix`` builds a float32
+origins x destinations matrix in row blocks whose temporaries stay
+inside a fixed memory budget.
+"""
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+DEFAULT_BLOCK_BYTES = 64 * 1024 ** 2
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    h = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+
+def equirectangular_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    x = (lon2 - lon1) * np.cos((lat1 + lat2) / 2)
+    return EARTH_RADIUS_KM * np.hypot(x, lat2 - lat1)
+
+
+def project_km(lat, lon, ref_lat):
+    """Equirectangular (x, y) in km around ``ref_lat``; Euclidean distances
+    between projected points match equirectangular_km near ``ref_lat``."""
+    x = EARTH_RADIUS_KM * np.radians(np.asarray(lon, dtype=np.float64)) * np.cos(np.radians(ref_lat))
+    y = EARTH_RADIUS_KM * np.radians(np.asarray(lat, dtype=np.float64))
+    return np.column_stack([x, y])
+
+
+def iter_distance_blocks(lat_a, lon_a, lat_b, lon_b, method="haversine",
+                         block_bytes=DEFAULT_BLOCK_BYTES):
+    """Yield (row_start, block) with ``block`` a float32 distance matrix (km)
+    for a slice of the origins against every destination."""
+    lat_a = np.radians(np.asarray(lat_a, dtype=np.float32))
+    lon_a = np.radians(np.asarray(lon_a, dtype=np.float32))
+    lat_b = np.radians(np.asarray(lat_b, dtype=np.float32))
+    lon_b = np.radians(np.asarray(lon_b, dtype=np.float32))
+    cos_b = np.cos(lat_b)
+    # About four float32 temporaries of the block's shape are alive at once
+    rows = max(1, block_bytes // (16 * max(len(lat_b), 1)))
+
+    for start in range(0, len(lat_a), rows):
+        la = lat_a[start:start + rows, None]
+        lo = lon_a[start:start + rows, None]
+        if method == "haversine":
+            block = np.sin((lat_b - la) * np.float32(0.5))
+            np.square(block, out=block)
+            dlon = np.sin((lon_b - lo) * np.float32(0.5))
+            np.square(dlon, out=dlon)
+            dlon *= cos_b
+            dlon *= np.cos(la)
+            block += dlon
+            np.minimum(block, np.float32(1.0), out=block)
+            np.sqrt(block, out=block)
+            np.arcsin(block, out=block)
+            block *= np.float32(2 * EARTH_RADIUS_KM)
+        elif method == "equirectangular":
+            # Scale longitude by the origin's latitude only: one cosine per row
+            block = lon_b - lo
+            block *= np.cos(la)
+            block = np.hypot(block, lat_b - la, out=block)
+            block *= np.float32(EARTH_RADIUS_KM)
+        else:
+            raise ValueError(f"unknown distance method: {method!r}")
+        yield start, block
+
+
+def distance_matrix(lat_a, lon_a, lat_b, lon_b, method="haversine",
+                    block_bytes=DEFAULT_BLOCK_BYTES):
+    """Full float32 origins x destinations distance matrix in km."""
+    out = np.empty((np.size(lat_a), np.size(lat_b)), dtype=np.float32)
+    for start, block in iter_distance_blocks(lat_a, lon_a, lat_b, lon_b, method, block_bytes):
+        out[start:start + len(block)] = block
+    return out
@@ -0,0 +1,59 @@
+"""
+geo_grid.py - Fixed-resolution spatial binning for map layers.
+
+Points are snapped to a square grid of roughly ``cell_m`` metres and
+counted (or weight-summed) per cell with one bincount, so a heatmap is
+fed one weighted point per occupied cell instead of one per order. The
+grid never exceeds MAX_CELLS_PER_AXIS cells per side; on a very large
+extent the cells are widened instead, which keeps the map HTML bounded
+whatever the number of orders.
+"""
+
+import numpy as np
+
+METRES_PER_DEGREE = 111_320
+DEFAULT_CELL_M = 100
+MAX_CELLS_PER_AXIS = 400
+
+
+def grid_index(lat, lon, cell_m=DEFAULT_CELL_M, max_cells=MAX_CELLS_PER_AXIS):
+    """Flat grid cell of every point, and the (lat, lon) centre of every
+    cell of the grid as an (n_cells, 2) array indexed by that cell."""
+    lat = np.asarray(lat, dtype=np.float64)
+    lon = np.asarray(lon, dtype=np.float64)
+
+    lat_step = cell_m / METRES_PER_DEGREE
+    lon_step = lat_step / np.cos(np.radians(lat.mean()))
+    lat0, lon0 = lat.min(), lon.min()
+    n_lat = min(int((lat.max() - lat0) / lat_step) + 1, max_cells)
+    n_lon = min(int((lon.max() - lon0) / lon_step) + 1, max_cells)
+    lat_step = max(lat_step, (lat.max() - lat0) / n_lat * (1 + 1e-9))
+    lon_step = max(lon_step, (lon.max() - lon0) / n_lon * (1 + 1e-9))
+
+    i = np.minimum(((lat - lat0) / lat_step).astype(np.int64), n_lat - 1)
+    j = np.minimum(((lon - lon0) / lon_step).astype(np.int64), n_lon - 1)
+    ci, cj = np.divmod(np.arange(n_lat * n_lon), n_lon)
+    centres = np.column_stack([lat0 + (ci + 0.5) * lat_step, lon0 + (cj + 0.5) * lon_step])
+    return i * n_lon + j, centres
+
+
+def grid_bin(lat, lon, weights=None, cell_m=DEFAULT_CELL_M, max_cells=MAX_CELLS_PER_AXIS):
+    """Weighted cell centres as an (n_cells, 3) array of [lat, lon, weight].
+
+    Weights are scaled so the busiest cell is 1.0, which is the default
+    saturation point of Leaflet.heat; cells get 0 when no weight is
+    positive.
+    """
+    if len(lat) == 0:
+        return np.zeros((0, 3))
+
+    cell, centres = grid_index(lat, lon, cell_m, max_cells)
+    totals = np.bincount(cell, weights=weights, minlength=len(centres))
+
+    cells = np.flatnonzero(totals)
+    peak = totals[cells].max() if cells.size else 0
+    intensity = totals[cells] / peak if peak > 0 else np.zeros(cells.size)
+    return np.column_stack([
+        np.round(centres[cells], 5),
+        np.round(intensity, 3),
+    ])
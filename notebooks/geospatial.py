@@ -1,177 +1,337 @@
+import html
+import json
+import os
+
 import pandas as pd
 import numpy as np
 import folium
-from folium.plugins import HeatMap, MarkerCluster
-
-df = pd.read_csv("datas/delivery_data_enriched.csv")
-
-center_lat = df["RestaurantLat"].mean()
-center_lon = df["RestaurantLon"].mean()
-
-
-# Map 1: Delivery Performance Heatmap
-m1 = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="cartodbpositron")
-
-delayed = df[df["IsDelayed"] == True]
-on_time = df[df["IsDelayed"] == False]
+from folium.plugins import FastMarkerCluster, HeatMap
+from folium.utilities import JsCode
 
-heat_data_delayed = delayed[["DeliveryLat", "DeliveryLon"]].values.tolist()
-heat_data_ontime = on_time[["DeliveryLat", "DeliveryLon"]].values.tolist()
+from density_tiles import build_tile_pyramid
+from geo_distance import haversine_km
+from geo_grid import grid_bin
+from hotspots import HOTSPOTS_PATH, detect_hotspots
+from map_layers import CanvasMarkerLayer, marker_rows
+from memory_budget import report_stage
+from render_cache import RenderCache
+from spatial_index import build_order_indexes
+from tier_rules import DELIVERY_SPEED
+from zones import ZONES_PATH
 
-HeatMap(
-    heat_data_delayed,
-    name="Delayed Deliveries (Red)",
-    gradient={0.4: "yellow", 0.65: "orange", 1: "red"},
-    radius=20, blur=15, max_zoom=15
-).add_to(m1)
+MAP_DIR = "output/maps"
+NEARBY_KM = 2
+ROUTE_TOP_K = int(os.environ.get("ROUTE_TOP_K", 5000))
 
-folium.LayerControl().add_to(m1)
 
-legend_html = """
-<div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000;
-     background-color: white; padding: 15px; border-radius: 5px;
-     border: 2px solid grey; font-size: 13px;">
-     <b>Delivery Performance Heatmap</b><br>
-     <span style="color: red;">Red zones</span> = High delay concentration<br>
-     <span style="color: yellow;">Yellow zones</span> = Moderate delays<br>
-</div>
-"""
-m1.get_root().html.add_child(folium.Element(legend_html))
+def save_map(m, path):
+    m.save(path)
 
-m1.save("output/maps/01_delivery_heatmap.html")
-print("Map 1 saved: Delivery Heatmap")
 
+def add_density_tiles(m, tiles, name):
+    url, (min_zoom, max_zoom), bounds = tiles
+    folium.TileLayer(
+        tiles=url, attr="Order density", name=name, overlay=True, opacity=0.8,
+        min_zoom=min_zoom, min_native_zoom=min_zoom, max_native_zoom=max_zoom,
+        bounds=bounds,
+    ).add_to(m)
 
-# Map 2: Partner Performance Map
-m2 = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="cartodbpositron")
 
-restaurants = df.groupby("RestaurantName").agg(
-    lat=("RestaurantLat", "mean"),
-    lon=("RestaurantLon", "mean"),
-    avg_time=("ActualDeliveryTime", "mean"),
-    avg_rating=("PartnerRating", "mean"),
-    total_orders=("OrderID", "count"),
-    avg_value=("OrderValue", "mean"),
-    food_type=("FoodType", "first"),
-).round(2)
-
-for name, row in restaurants.iterrows():
-    if row["avg_time"] < 30:
-        color = "green"
-        status = "Fast"
-    elif row["avg_time"] < 40:
-        color = "orange"
-        status = "Normal"
-    else:
-        color = "red"
-        status = "Slow"
-
-    popup_html = f"""
-    <div style="font-family: Arial; width: 200px;">
-        <h4 style="margin: 0; color: {color};">{name}</h4>
-        <hr style="margin: 3px 0;">
-        <b>Food Type:</b> {row['food_type']}<br>
-        <b>Avg Delivery:</b> {row['avg_time']:.1f} min ({status})<br>
-        <b>Avg Rating:</b> {row['avg_rating']:.1f}/5.0<br>
-        <b>Total Orders:</b> {row['total_orders']}<br>
-        <b>Avg Order Value:</b> Rs.{row['avg_value']:.0f}<br>
+# Map 1: Delivery Performance Heatmap
+def build_delivery_heatmap(data):
+    center, delayed_cells, delay_tiles, zone_layer = data
+    m1 = folium.Map(location=list(center), zoom_start=13, tiles="cartodbpositron")
+
+    if zone_layer is not None:
+        folium.GeoJson(
+            zone_layer, name="Delivery Zones",
+            style_function=lambda feature: {"color": "#34495e", "weight": 2, "fillOpacity": 0.05},
+            tooltip=folium.GeoJsonTooltip(
+                fields=["name", "orders", "delay_rate"],
+                aliases=["Zone", "Orders", "Delay rate (%)"],
+            ),
+        ).add_to(m1)
+    add_density_tiles(m1, delay_tiles, "Delayed Deliveries (tiles)")
+    HeatMap(
+        delayed_cells.tolist(),
+        name="Delayed Deliveries (Red)",
+        gradient={0.4: "yellow", 0.65: "orange", 1: "red"},
+        radius=20, blur=15, max_zoom=15, show=False
+    ).add_to(m1)
+
+    folium.LayerControl().add_to(m1)
+
+    legend_html = """
+    <div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000;
+         background-color: white; padding: 15px; border-radius: 5px;
+         border: 2px solid grey; font-size: 13px;">
+         <b>Delivery Performance Heatmap</b><br>
+         <span style="color: red;">Red zones</span> = High delay concentration<br>
+         <span style="color: yellow;">Yellow zones</span> = Moderate delays<br>
     </div>
     """
+    m1.get_root().html.add_child(folium.Element(legend_html))
+    return m1
 
-    folium.CircleMarker(
-        location=[row["lat"], row["lon"]],
-        radius=row["total_orders"] / 8,
-        color=color,
-        fill=True,
-        fill_color=color,
-        fill_opacity=0.7,
-        popup=folium.Popup(popup_html, max_width=250),
-        tooltip=f"{name} | {row['avg_time']:.0f}min | {row['avg_rating']:.1f}*"
-    ).add_to(m2)
 
-m2.save("output/maps/02_partner_performance_map.html")
-print("Map 2 saved: Partner Performance Map")
+# Map 2: Partner Performance Map
+def build_partner_map(data):
+    center, restaurants = data
+    m2 = folium.Map(location=list(center), zoom_start=13, tiles="cartodbpositron")
+
+    speed_colors = {"Fast": "green", "Normal": "orange", "Slow": "red"}
+    # Markers and popups are built in the browser from one row per restaurant
+    marker_js = """function(row, renderer) {
+        return L.circleMarker([row.lat, row.lon], {
+            renderer: renderer, radius: row.total_orders / 8, color: row.color,
+            fill: true, fillColor: row.color, fillOpacity: 0.7
+        }).bindTooltip(`${row.name} | ${Math.round(row.avg_time)}min | ${row.avg_rating.toFixed(1)}*`);
+    }"""
+    popup_js = """function(row) {
+        return `<div style="font-family: Arial; width: 200px;">
+            <h4 style="margin: 0; color: ${row.color};">${row.name}</h4>
+            <hr style="margin: 3px 0;">
+            <b>Food Type:</b> ${row.food_type}<br>
+            <b>Avg Delivery:</b> ${row.avg_time.toFixed(1)} min (${row.status})<br>
+            <b>Avg Rating:</b> ${row.avg_rating.toFixed(1)}/5.0<br>
+            <b>Total Orders:</b> ${row.total_orders}<br>
+            <b>Avg Order Value:</b> Rs.${row.avg_value.toFixed(0)}<br>
+            <b>Drops within """ + f"{NEARBY_KM:g}" + """ km:</b> ${row.nearby_drops}<br>
+            <b>Nearest rival:</b> ${row.nearest_rival} (${row.rival_km.toFixed(1)} km)<br>
+        </div>`;
+    }"""
+
+    partners = restaurants.rename_axis("name").reset_index()
+    partners["color"] = partners["status"].map(speed_colors)
+    CanvasMarkerLayer(
+        partners,
+        ["name", "lat", "lon", "color", "status", "food_type", "avg_time", "avg_rating",
+         "total_orders", "avg_value", "nearby_drops", "nearest_rival", "rival_km"],
+        marker=marker_js,
+        popup=popup_js,
+        name="Restaurants",
+    ).add_to(m2)
+    return m2
 
 
 # Map 3: Route Analysis - Longest Routes
-m3 = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="cartodbpositron")
-
-longest_routes = df.nlargest(50, "ActualDeliveryTime")
-
-for _, row in longest_routes.iterrows():
-    time_norm = (row["ActualDeliveryTime"] - 40) / (df["ActualDeliveryTime"].max() - 40)
-    time_norm = max(0, min(1, time_norm))
+def feature_collection(geometry_type, coordinates, properties):
+    """FeatureCollection with one feature per row of ``properties``; string
+    properties are HTML-escaped for the tooltips and popups."""
+    columns = list(properties)
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {"type": "Feature", "geometry": {"type": geometry_type, "coordinates": coords},
+             "properties": dict(zip(columns, values))}
+            for coords, values in zip(coordinates, marker_rows(properties, columns))
+        ],
+    }
 
-    r = int(255 * time_norm)
-    g = int(255 * (1 - time_norm))
-    color = f"#{r:02x}{g:02x}00"
 
-    folium.PolyLine(
-        locations=[
-            [row["RestaurantLat"], row["RestaurantLon"]],
-            [row["DeliveryLat"], row["DeliveryLon"]]
-        ],
-        weight=3,
-        color=color,
-        opacity=0.7,
-        tooltip=f"Order: {row['OrderID']} | Time: {row['ActualDeliveryTime']}min | Dist: {row['DistanceKM']}km"
+def build_route_map(data):
+    center, longest_routes, max_time = data
+    m3 = folium.Map(location=list(center), zoom_start=13, tiles="cartodbpositron", prefer_canvas=True)
+
+    # Styles are read from each feature's properties in the browser
+    route_style = JsCode("function(f) { return {color: f.properties.color, weight: 3, opacity: 0.7}; }")
+    route_point = JsCode(
+        "function(f, latlng) { return L.circleMarker(latlng, "
+        "{radius: 4, color: f.properties.color, fillOpacity: 0.8}); }"
+    )
+
+    time_norm = np.clip((longest_routes["ActualDeliveryTime"].to_numpy() - 40) / (max_time - 40), 0, 1)
+    level = (255 * time_norm).astype(np.int64)
+    colors = pd.Series(np.array([f"#{r:02x}{255 - r:02x}00" for r in range(256)])[level],
+                       index=longest_routes.index)
+
+    rest = longest_routes[["RestaurantLon", "RestaurantLat"]].round(5).to_numpy().tolist()
+    drop = longest_routes[["DeliveryLon", "DeliveryLat"]].round(5).to_numpy().tolist()
+    route_props = longest_routes[["OrderID", "ActualDeliveryTime", "DistanceKM"]].assign(
+        StraightKM=longest_routes["StraightKM"].round(2), color=colors
+    )
+
+    folium.GeoJson(
+        feature_collection("LineString", zip(rest, drop), route_props),
+        name="Routes", style=route_style,
+        tooltip=folium.GeoJsonTooltip(
+            fields=["OrderID", "ActualDeliveryTime", "DistanceKM", "StraightKM"],
+            aliases=["Order", "Time (min)", "Dist (km)", "Straight line (km)"],
+        ),
     ).add_to(m3)
 
-    folium.CircleMarker(
-        location=[row["RestaurantLat"], row["RestaurantLon"]],
-        radius=4, color="blue", fill=True, fill_opacity=0.8
+    sites = longest_routes.groupby("RestaurantName")[["RestaurantLon", "RestaurantLat"]].first().round(5)
+    folium.GeoJson(
+        feature_collection("Point", sites.to_numpy().tolist(),
+                           pd.DataFrame({"name": sites.index, "color": "blue"})),
+        name="Restaurants", point_to_layer=route_point,
+        tooltip=folium.GeoJsonTooltip(fields=["name"], labels=False),
     ).add_to(m3)
-
-    folium.CircleMarker(
-        location=[row["DeliveryLat"], row["DeliveryLon"]],
-        radius=4, color=color, fill=True, fill_opacity=0.8
+    folium.GeoJson(
+        feature_collection("Point", drop, route_props[["OrderID", "color"]]),
+        name="Drops", point_to_layer=route_point,
     ).add_to(m3)
 
-route_legend = """
-<div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000;
-     background-color: white; padding: 15px; border-radius: 5px;
-     border: 2px solid grey; font-size: 13px;">
-     <b>Top 50 Longest Delivery Routes</b><br>
-     <span style="color: blue;">Blue dots</span> = Restaurants<br>
-     <span style="color: red;">Red lines</span> = Slowest deliveries<br>
-     <span style="color: green;">Green lines</span> = Relatively faster<br>
-</div>
-"""
-m3.get_root().html.add_child(folium.Element(route_legend))
-m3.save("output/maps/03_route_analysis.html")
-print("Map 3 saved: Route Analysis")
+    folium.LayerControl().add_to(m3)
+
+    route_legend = f"""
+    <div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000;
+         background-color: white; padding: 15px; border-radius: 5px;
+         border: 2px solid grey; font-size: 13px;">
+         <b>Top {len(longest_routes):,} Longest Delivery Routes</b><br>
+         <span style="color: blue;">Blue dots</span> = Restaurants<br>
+         <span style="color: red;">Red lines</span> = Slowest deliveries<br>
+         <span style="color: green;">Green lines</span> = Relatively faster<br>
+    </div>
+    """
+    m3.get_root().html.add_child(folium.Element(route_legend))
+    return m3
 
 
 # Map 4: Restaurant Clustering with Density
-m4 = folium.Map(location=[center_lat, center_lon], zoom_start=13, tiles="cartodbpositron")
-
-marker_cluster = MarkerCluster(name="Restaurant Clusters").add_to(m4)
+def build_cluster_map(data):
+    center, restaurants, delivery_cells, delivery_tiles, hotspots = data
+    m4 = folium.Map(location=list(center), zoom_start=13, tiles="cartodbpositron")
 
-for name, row in restaurants.iterrows():
-    food_icons = {
-        "Pizza": "cutlery", "Chinese": "cutlery", "Indian": "cutlery",
-        "Fast Food": "cutlery", "Desserts": "cutlery"
-    }
     food_colors_map = {
         "Pizza": "red", "Chinese": "orange", "Indian": "green",
         "Fast Food": "blue", "Desserts": "pink"
     }
+    marker_js = """function(row) {
+        var [lat, lon, name, foodType, orders, color] = row;
+        var icon = L.AwesomeMarkers.icon({icon: "cutlery", prefix: "fa", markerColor: color, iconColor: "white"});
+        return L.marker([lat, lon], {icon: icon}).bindPopup(function() {
+            return `${name}<br>${foodType}<br>Orders: ${orders}`;
+        });
+    }"""
+
+    sites = restaurants.rename_axis("name").reset_index()
+    sites["color"] = sites["food_type"].map(food_colors_map).fillna("gray")
+    FastMarkerCluster(
+        marker_rows(sites, ["lat", "lon", "name", "food_type", "total_orders", "color"]),
+        callback=marker_js, name="Restaurant Clusters",
+    ).add_to(m4)
+
+    add_density_tiles(m4, delivery_tiles, "Delivery Density (tiles)")
+
+    # One feature per hotspot; circles are sized and colored in the browser
+    overall_delay = np.average(hotspots["delay_rate"], weights=hotspots["orders"])
+    hotspot_props = pd.DataFrame({
+        "hotspot": hotspots.index.astype(str),
+        "orders": hotspots["orders"].astype(int).map("{:,}".format),
+        "share": (hotspots["order_share"] * 100).round(1),
+        "delay_rate": (hotspots["delay_rate"] * 100).round(1),
+        "revenue_at_risk": hotspots["revenue_at_risk"].map("Rs.{:,.0f}".format),
+        "radius_m": np.maximum(hotspots["radius_km"].to_numpy(), 0.1) * 1000,
+        "color": np.where(hotspots["delay_rate"].to_numpy() > overall_delay, "red", "green"),
+    })
+    hotspot_circle = JsCode(
+        "function(f, latlng) { return L.circle(latlng, {radius: f.properties.radius_m, "
+        "color: f.properties.color, weight: 2, fill: true, fillOpacity: 0.15}); }"
+    )
+    folium.GeoJson(
+        feature_collection("Point", hotspots[["lon", "lat"]].round(5).to_numpy().tolist(), hotspot_props),
+        name="Demand Hotspots", point_to_layer=hotspot_circle,
+        popup=folium.GeoJsonPopup(
+            fields=["hotspot", "orders", "share", "delay_rate", "revenue_at_risk"],
+            aliases=["Hotspot", "Orders", "Order share (%)", "Delay rate (%)", "Revenue at risk"],
+            max_width=220,
+        ),
+        tooltip=folium.GeoJsonTooltip(fields=["hotspot", "orders", "delay_rate"],
+                                      aliases=["Hotspot", "Orders", "Delayed (%)"]),
+    ).add_to(m4)
+    HeatMap(delivery_cells.tolist(), name="Delivery Density", radius=15, blur=10, show=False).add_to(m4)
+
+    folium.LayerControl().add_to(m4)
+    return m4
 
-    folium.Marker(
-        location=[row["lat"], row["lon"]],
-        popup=f"{name}<br>{row['food_type']}<br>Orders: {row['total_orders']}",
-        icon=folium.Icon(
-            color=food_colors_map.get(row["food_type"], "gray"),
-            icon=food_icons.get(row["food_type"], "cutlery"),
-            prefix="fa"
-        )
-    ).add_to(marker_cluster)
 
-delivery_heat = df[["DeliveryLat", "DeliveryLon"]].values.tolist()
-HeatMap(delivery_heat, name="Delivery Density", radius=15, blur=10).add_to(m4)
+df = pd.read_csv("datas/delivery_data_enriched.csv")
 
-folium.LayerControl().add_to(m4)
-m4.save("output/maps/04_restaurant_clusters.html")
-print("Map 4 saved: Restaurant Clustering")
+center = (df["RestaurantLat"].mean(), df["RestaurantLon"].mean())
 
-print("\nAll maps saved to output/maps/")
\ No newline at end of file
+restaurants = df.groupby("RestaurantName").agg(
+    lat=("RestaurantLat", "mean"),
+    lon=("RestaurantLon", "mean"),
+    avg_time=("ActualDeliveryTime", "mean"),
+    avg_rating=("PartnerRating", "mean"),
+    total_orders=("OrderID", "count"),
+    avg_value=("OrderValue", "mean"),
+    food_type=("FoodType", "first"),
+).round(2)
+restaurants["status"] = DELIVERY_SPEED.evaluate(restaurants)
+
+sites, restaurant_index, delivery_index = build_order_indexes(df)
+restaurants["nearby_drops"] = delivery_index.count_within(
+    sites["RestaurantLat"], sites["RestaurantLon"], NEARBY_KM * 1000
+)
+# The nearest indexed site to a restaurant is itself, so take the second
+rival_m, rival_pos = restaurant_index.knn(sites["RestaurantLat"], sites["RestaurantLon"], k=2)
+restaurants["nearest_rival"] = sites.index[rival_pos[:, 1]]
+restaurants["rival_km"] = (rival_m[:, 1] / 1000).round(2)
+
+# Heatmaps get one weighted point per grid cell, not one per order
+delayed = df[df["IsDelayed"] == True]
+delayed_cells = grid_bin(delayed["DeliveryLat"], delayed["DeliveryLon"])
+delivery_cells = grid_bin(df["DeliveryLat"], df["DeliveryLon"])
+
+hotspots = detect_hotspots(df["DeliveryLat"], df["DeliveryLon"], df["IsDelayed"], df["RevenueLossContribution"])
+hotspots.to_csv(HOTSPOTS_PATH)
+print(f"Demand hotspots saved to {HOTSPOTS_PATH}")
+print(hotspots[["orders", "delay_rate", "revenue_at_risk"]].head(5).to_string())
+
+# Zone outlines with the per-zone stats of the orders analytics assigned to them
+zone_layer = None
+if os.path.exists(ZONES_PATH):
+    with open(ZONES_PATH) as f:
+        zone_layer = json.load(f)
+    zone_stats = df.groupby("CustomerArea").agg(orders=("OrderID", "count"), delay_rate=("IsDelayed", "mean"))
+    for feature in zone_layer["features"]:
+        name = feature["properties"]["name"]
+        orders, delay_rate = zone_stats.loc[name] if name in zone_stats.index else (0, 0.0)
+        feature["properties"].update(name=html.escape(name), orders=int(orders),
+                                     delay_rate=round(float(delay_rate) * 100, 1))
+
+# Street-level density comes from pre-rendered XYZ tiles next to the maps
+tile_bounds = [[df["DeliveryLat"].min(), df["DeliveryLon"].min()],
+               [df["DeliveryLat"].max(), df["DeliveryLon"].max()]]
+tile_layers = {}
+for layer, points, cmap in [("delayed", delayed, "YlOrRd"), ("deliveries", df, "viridis")]:
+    url, zooms, written = build_tile_pyramid(layer, points["DeliveryLat"], points["DeliveryLon"], cmap=cmap)
+    tile_layers[layer] = (url, zooms, tile_bounds)
+    print(f"Density tiles '{layer}' (zoom {zooms[0]}-{zooms[1]}): "
+          f"{f'{written} written' if written else 'unchanged'}")
+
+maps = [
+    ("Map 1", "Delivery Heatmap", build_delivery_heatmap, (center, delayed_cells, tile_layers["delayed"], zone_layer),
+     f"{MAP_DIR}/01_delivery_heatmap.html"),
+    ("Map 2", "Partner Performance Map", build_partner_map, (center, restaurants),
+     f"{MAP_DIR}/02_partner_performance_map.html"),
+]
+# Partial sort: only the top K are ordered, slowest drawn last (on top)
+delivery_times = df["ActualDeliveryTime"].to_numpy()
+top_k = min(ROUTE_TOP_K, len(df))
+if top_k > 0:
+    top = np.argpartition(delivery_times, len(df) - top_k)[len(df) - top_k:]
+    longest_routes = df.iloc[top[np.argsort(delivery_times[top], kind="stable")]].copy()
+    longest_routes["StraightKM"] = haversine_km(
+        longest_routes["RestaurantLat"], longest_routes["RestaurantLon"],
+        longest_routes["DeliveryLat"], longest_routes["DeliveryLon"],
+    )
+    maps.append(("Map 3", "Route Analysis", build_route_map,
+                 (center, longest_routes, df["ActualDeliveryTime"].max()),
+                 f"{MAP_DIR}/03_route_analysis.html"))
+else:
+    print("Map 3 skipped: no routes to rank")
+maps.append(("Map 4", "Restaurant Clustering", build_cluster_map,
+             (center, restaurants, delivery_cells, tile_layers["deliveries"], hotspots),
+             f"{MAP_DIR}/04_restaurant_clusters.html"))
+
+render_cache = RenderCache()
+for label, title, build, data, path in maps:
+    rendered = render_cache.render(build, data, path, save=save_map)
+    print(f"{label} {'saved' if rendered else 'unchanged (cached)'}: {title}")
+
+print(f"\nAll maps saved to {MAP_DIR}/")
+
+report_stage("geospatial")
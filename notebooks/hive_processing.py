@@ -1,17 +1,16 @@
 import pandas as pd
 
-df = pd.read_csv("data/delivery_data.csv")
-
-
-def rating_tier(r):
-    if r >= 4.0:
-        return "High"
-    elif r >= 3.0:
-        return "Medium"
-    return "Low"
+from delivery_rules import DELAY_THRESHOLD
+from memory_budget import report_stage
+from parallel_groupby import parallel_groupby
+from tier_rules import DISTANCE_BUCKET, PERFORMANCE_TIER, RATING_TIER
+from zones import apply_zones, load_zones
 
+df = pd.read_csv("data/delivery_data.csv")
+# Areas are the zone polygons the orders fall in, as in analytics
+apply_zones(df, load_zones())
 
-df["RatingTier"] = df["PartnerRating"].apply(rating_tier)
+df["RatingTier"] = RATING_TIER.evaluate(df)
 
 print("=" * 60)
 print("QUERY 1: Avg Delivery Time by Weather and Rating Tier")
@@ -27,7 +26,7 @@ q1.to_csv("output/reports/q1_weather_rating.csv")
 print("\n" + "=" * 60)
 print("QUERY 2: Revenue at Risk from Delayed Orders")
 print("=" * 60)
-df["IsDelayed"] = df["ActualDeliveryTime"] > 40
+df["IsDelayed"] = df["ActualDeliveryTime"] > DELAY_THRESHOLD
 q2 = df.groupby("CustomerArea").agg(
     DelayedOrders=("IsDelayed", "sum"),
     TotalOrders=("OrderID", "count"),
@@ -41,22 +40,13 @@ q2.to_csv("output/reports/q2_revenue_at_risk.csv")
 print("\n" + "=" * 60)
 print("QUERY 3: Partner Performance Tiers")
 print("=" * 60)
-q3 = df.groupby("PartnerID").agg(
+q3 = parallel_groupby(
+    df, "PartnerID",
     TotalDeliveries=("OrderID", "count"),
     AvgTime=("ActualDeliveryTime", "mean"),
     AvgRating=("PartnerRating", "mean"),
 ).round(2)
-
-
-def perf_tier(row):
-    if row["AvgRating"] >= 4.0 and row["AvgTime"] < 35:
-        return "Premium"
-    elif row["AvgRating"] >= 3.0 and row["AvgTime"] < 45:
-        return "Standard"
-    return "Training"
-
-
-q3["PerformanceTier"] = q3.apply(perf_tier, axis=1)
+q3["PerformanceTier"] = PERFORMANCE_TIER.evaluate(q3)
 q3 = q3.sort_values("AvgRating", ascending=False)
 print(q3)
 q3.to_csv("output/reports/q3_partner_tiers.csv")
@@ -93,16 +83,7 @@ print("\n" + "=" * 60)
 print("QUERY 6: Distance vs Delivery Time by Area")
 print("=" * 60)
 
-
-def dist_bucket(d):
-    if d < 3:
-        return "Short"
-    elif d < 6:
-        return "Medium"
-    return "Long"
-
-
-df["DistanceBucket"] = df["DistanceKM"].apply(dist_bucket)
+df["DistanceBucket"] = DISTANCE_BUCKET.evaluate(df)
 q6 = df.groupby(["CustomerArea", "DistanceBucket"]).agg(
     AvgTime=("ActualDeliveryTime", "mean"),
     AvgDistance=("DistanceKM", "mean"),
@@ -111,4 +92,6 @@ q6 = df.groupby(["CustomerArea", "DistanceBucket"]).agg(
 print(q6)
 q6.to_csv("output/reports/q6_distance_analysis.csv")
 
-print("\nAll query results saved to output/reports/")
\ No newline at end of file
+print("\nAll query results saved to output/reports/")
+
+report_stage("hive_processing")
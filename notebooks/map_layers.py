@@ -0,0 +1,70 @@
+"""
+map_layers.py - Marker layers created in the browser from row arrays.
+
+Instead of one folium object (and one JS variable plus popup HTML) per
+point, a layer carries its points as a single JSON array and one JS
+function turns each row into a marker. Markers share a canvas renderer,
+and popups are built from the row only when one is opened, so the HTML
+grows by a few dozen bytes per point and the map stays responsive with
+thousands of them.
+"""
+
+import html
+
+from folium.map import FeatureGroup
+from folium.template import Template
+
+
+def marker_rows(frame, columns):
+    """``frame[columns]`` as a list of plain-Python rows (JSON-ready).
+
+    String cells are HTML-escaped, since the marker and popup functions
+    interpolate them into tooltip and popup HTML.
+    """
+    return [
+        [html.escape(value) if isinstance(value, str) else value for value in row]
+        for row in zip(*(frame[column].tolist() for column in columns))
+    ]
+
+
+class CanvasMarkerLayer(FeatureGroup):
+    """Overlay of canvas markers built client-side.
+
+    ``marker`` is a JS function ``(row, renderer) -> L.Layer`` and
+    ``popup`` an optional JS function ``(row) -> html``; ``row`` is an
+    object keyed by ``columns``.
+    """
+
+    _template = Template(
+        """
+        {% macro script(this, kwargs) %}
+            var {{ this.get_name() }} = (function() {
+                var layer = L.featureGroup({{ this.options|tojavascript }});
+                var renderer = L.canvas({padding: 0.5});
+                var columns = {{ this.columns|tojson }};
+                var rows = {{ this.rows|tojson }};
+                var marker = {{ this.marker }};
+                var popup = {{ this.popup or "null" }};
+                rows.forEach(function(values) {
+                    var row = {};
+                    columns.forEach(function(column, j) { row[column] = values[j]; });
+                    var m = marker(row, renderer);
+                    if (popup) {
+                        m.bindPopup(function() { return popup(row); }, {{ this.popup_options|tojson }});
+                    }
+                    m.addTo(layer);
+                });
+                return layer;
+            })();
+        {% endmacro %}
+        """
+    )
+
+    def __init__(self, frame, columns, marker, popup=None, popup_max_width=250, name=None, **kwargs):
+        super().__init__(name=name, **kwargs)
+        self._name = "CanvasMarkerLayer"
+        self.columns = list(columns)
+        self.rows = marker_rows(frame, self.columns)
+        self.marker = marker
+        self.popup = popup
+        self.popup_options = {"maxWidth": popup_max_width}
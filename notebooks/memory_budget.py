@@ -0,0 +1,112 @@
+"""
+memory_budget.py - Global RAM budget shared by every pipeline stage.
+
+The budget comes from the PIPELINE_MEMORY_MB environment variable (set
+by ``run_all.py --memory-mb``). Stages use it to size chunks, choose
+between in-memory and out-of-core code paths, spill intermediate
+aggregates to disk, and report their peak usage against the budget.
+"""
+
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_BUDGET_MB = 2048
+SPILL_DIR = "datas/spill"
+# Rows read up front to measure the in-memory size of a table's rows
+SAMPLE_ROWS = 1_000
+
+
+def budget_bytes():
+    return int(float(os.environ.get("PIPELINE_MEMORY_MB", DEFAULT_BUDGET_MB)) * 1024 ** 2)
+
+
+def row_bytes(frame):
+    """Measured bytes per row of ``frame``, strings included."""
+    return max(int(frame.memory_usage(deep=True).sum() / max(len(frame), 1)), 1)
+
+
+def rows_within_budget(bytes_per_row, fraction=0.5):
+    """How many rows fit at once within ``fraction`` of the budget."""
+    return int(budget_bytes() * fraction // bytes_per_row)
+
+
+def fits_in_memory(n_rows, bytes_per_row, fraction=0.5):
+    return n_rows <= rows_within_budget(bytes_per_row, fraction)
+
+
+def chunk_rows(bytes_per_row, fraction=0.1, minimum=1_000):
+    """Rows per chunk so one chunk uses at most ``fraction`` of the budget."""
+    return max(minimum, int(budget_bytes() * fraction // bytes_per_row))
+
+
+def peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def report_stage(stage):
+    peak, budget = peak_rss_bytes(), budget_bytes()
+    if peak is None:
+        print(f"\n[memory] {stage}: peak usage unavailable on this platform "
+              f"(budget {budget / 1024 ** 2:,.0f} MB)")
+        return
+    flag = "  ** OVER BUDGET **" if peak > budget else ""
+    print(f"\n[memory] {stage}: peak {peak / 1024 ** 2:,.0f} MB of "
+          f"{budget / 1024 ** 2:,.0f} MB budget ({peak / budget:.0%}){flag}")
+
+
+class SpillBuffer:
+    """Collects partial aggregate frames per name, spilling them to disk
+    once their combined size exceeds ``fraction`` of the budget."""
+
+    def __init__(self, fraction=0.1, spill_dir=SPILL_DIR):
+        self.limit = budget_bytes() * fraction
+        self.spill_dir = spill_dir
+        self.held = {}
+        self.held_bytes = 0
+        self.spilled = {}
+        self._tmp = None
+
+    def add(self, name, frame):
+        self.held.setdefault(name, []).append(frame)
+        self.held_bytes += int(frame.memory_usage(deep=True).sum())
+        if self.held_bytes > self.limit:
+            self._spill()
+
+    def _spill(self):
+        if self._tmp is None:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self._tmp = tempfile.mkdtemp(dir=self.spill_dir)
+        for name, frames in self.held.items():
+            path = os.path.join(self._tmp, f"{name}_{len(self.spilled.get(name, []))}.pkl")
+            with open(path, "wb") as f:
+                pickle.dump(pd.concat(frames), f)
+            self.spilled.setdefault(name, []).append(path)
+        self.held = {}
+        self.held_bytes = 0
+
+    def collect(self, name):
+        """All partials for ``name`` summed per index key."""
+        frames = list(self.held.get(name, []))
+        for path in self.spilled.get(name, []):
+            with open(path, "rb") as f:
+                frames.append(pickle.load(f))
+        return pd.concat(frames).groupby(level=0).sum()
+
+    def close(self):
+        if self._tmp is not None:
+            shutil.rmtree(self._tmp, ignore_errors=True)
+            self._tmp = None
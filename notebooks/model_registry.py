@@ -0,0 +1,153 @@
+"""
+model_registry.py - Versioned ETA model artifacts.
+
+An artifact bundles everything needed to turn a raw order into a
+delivery-time estimate: the fitted model, the label encodings of its
+categorical inputs, a snapshot of per-partner history features and the
+evaluation results of the training run. Artifacts are pickled to
+MODEL_DIR as numbered versions and listed in a JSON registry together
+with a key of the training data, so an unchanged dataset reuses the
+registered model instead of retraining it.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import time
+
+import numpy as np
+import pandas as pd
+
+from delivery_rules import PEAK_HOURS
+
+MODEL_DIR = "datas/models"
+REGISTRY_PATH = os.path.join(MODEL_DIR, "registry.json")
+
+
+def training_key(df, features, target, spec=""):
+    """Key of the training data and model specification."""
+    h = hashlib.sha256(f"{list(features)}|{target}|{spec}".encode())
+    h.update(pd.util.hash_pandas_object(df[list(features) + [target]], index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def _values(orders, name):
+    """Column ``name`` of a DataFrame or list of dicts; every order must
+    have it."""
+    if isinstance(orders, pd.DataFrame):
+        return orders[name].to_numpy()
+    values = [order.get(name) for order in orders]
+    if any(v is None for v in values):
+        raise KeyError(name)
+    return np.asarray(values)
+
+
+def _optional_values(orders, name, fill):
+    """(values, known) of an optional column: orders without a value for
+    ``name`` get ``fill`` and False in the ``known`` mask."""
+    if isinstance(orders, pd.DataFrame):
+        values = orders[name] if name in orders else pd.Series(None, index=orders.index, dtype=object)
+    else:
+        values = pd.Series([order.get(name) for order in orders], dtype=object)
+    known = values.notna().to_numpy()
+    return values.where(known, fill).to_numpy(), known
+
+
+class EtaModel:
+    """A fitted delivery-time model that scores raw orders.
+
+    ``encoders`` maps each raw categorical column to its fitted
+    LabelEncoder (feature ``<column>_enc``) and ``partners`` holds
+    avg_rating and total_orders per PartnerID. Orders are dicts or a
+    DataFrame with the model's raw inputs; PartnerID and PeakHour are
+    optional, unknown partners are scored like the scenario partners of
+    the training run (long-run rating equal to today's, median workload).
+    """
+
+    def __init__(self, model, name, features, encoders, partners, evaluation=None):
+        self.model = model
+        self.name = name
+        self.features = list(features)
+        self.classes = {col: pd.Index(enc.classes_) for col, enc in encoders.items()}
+        self.partners = partners[["avg_rating", "total_orders"]].copy()
+        self.median_orders = float(self.partners["total_orders"].median())
+        self.evaluation = evaluation or {}
+
+    def feature_matrix(self, orders):
+        columns = {}
+        for feature in self.features:
+            if feature.endswith("_enc") and feature[:-4] in self.classes:
+                col = feature[:-4]
+                raw = _values(orders, col)
+                codes = self.classes[col].get_indexer(raw)
+                if (codes < 0).any():
+                    unknown = sorted({str(v) for v in raw[codes < 0]})
+                    raise ValueError(f"unknown {col}: {unknown}")
+                columns[feature] = codes
+            elif feature in ("PartnerAvgRating", "PartnerOrders"):
+                continue
+            elif feature == "PeakHour":
+                peak, known = _optional_values(orders, "PeakHour", 0)
+                if not known.all():
+                    peak = np.where(known, peak, np.isin(_values(orders, "OrderHour"), PEAK_HOURS))
+                columns[feature] = peak
+            else:
+                columns[feature] = _values(orders, feature)
+
+        ids, _ = _optional_values(orders, "PartnerID", None)
+        slots = self.partners.index.get_indexer(ids)
+        known = slots >= 0
+        rating = np.asarray(_values(orders, "PartnerRating"), dtype=np.float64)
+        columns["PartnerAvgRating"] = np.where(
+            known, self.partners["avg_rating"].to_numpy()[np.maximum(slots, 0)], rating)
+        columns["PartnerOrders"] = np.where(
+            known, self.partners["total_orders"].to_numpy()[np.maximum(slots, 0)], self.median_orders)
+        return pd.DataFrame({f: np.asarray(columns[f], dtype=np.float64) for f in self.features})
+
+    def predict(self, orders):
+        """Predicted delivery minutes, one per order."""
+        return self.model.predict(self.feature_matrix(orders))
+
+
+def _read_registry():
+    if not os.path.exists(REGISTRY_PATH):
+        return []
+    with open(REGISTRY_PATH) as f:
+        return json.load(f)["versions"]
+
+
+def save_model(eta_model, key, metrics=None):
+    """Register ``eta_model`` as the next version; returns the version."""
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    versions = _read_registry()
+    version = max((v["version"] for v in versions), default=0) + 1
+    path = os.path.join(MODEL_DIR, f"eta_model_v{version:03d}.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(eta_model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    versions.append({
+        "version": version,
+        "path": path,
+        "model": eta_model.name,
+        "key": key,
+        "metrics": metrics or {},
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    with open(REGISTRY_PATH, "w") as f:
+        json.dump({"versions": versions}, f, indent=2)
+    return version
+
+
+def load_model(version=None, key=None):
+    """(version, EtaModel) for ``version``, or the latest version
+    (trained on data with ``key``, if given); None when there is none."""
+    versions = [
+        v for v in _read_registry()
+        if (version is None or v["version"] == version) and (key is None or v["key"] == key)
+        and os.path.exists(v["path"])
+    ]
+    if not versions:
+        return None
+    entry = max(versions, key=lambda v: v["version"])
+    with open(entry["path"], "rb") as f:
+        return entry["version"], pickle.load(f)
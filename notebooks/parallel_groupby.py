@@ -0,0 +1,144 @@
+"""
+parallel_groupby.py - Hash-partitioned group-by that spreads large
+aggregations (e.g. per-PartnerID stats) across a process pool.
+
+Rows are scattered into shared-memory blocks ordered by the hash
+partition of their key, so every worker aggregates a contiguous slice
+without copying the whole frame through pickling. Integer and boolean
+columns go into an int64 block and everything else into a float64 one,
+so integers above 2**53 keep their exact value. Small inputs fall back
+to a plain pandas group-by. hive_processing uses it for the per-partner
+tiers query, whose group count grows with the fleet.
+"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+PARALLEL_MIN_ROWS = 200_000
+PARTITIONS_PER_WORKER = 4
+SUPPORTED_FUNCS = ("count", "nunique", "mean", "sum", "min", "max", "first")
+
+
+def _aggregate_partition(blocks, start, stop, spec):
+    columns = {}
+    for shm_name, shape, dtype, names in blocks:
+        shm = shared_memory.SharedMemory(name=shm_name)
+        try:
+            block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            for row, name in enumerate(names):
+                columns[name] = block[row, start:stop].copy()
+        finally:
+            shm.close()
+    part = pd.DataFrame(columns)
+    return part.groupby("key").agg(**{out: (name, func) for out, name, func in spec})
+
+
+def _is_exact_integer(series):
+    dtype = series.dtype
+    # uint64 can exceed int64; integers with missing values need NaN
+    return (dtype.kind in "bi" or (dtype.kind == "u" and dtype.itemsize < 8)) and not series.hasnans
+
+
+def _encode_column(series):
+    if _is_exact_integer(series):
+        return series.to_numpy(dtype=np.int64), None
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        return series.to_numpy(dtype=np.float64, na_value=np.nan), None
+    codes, uniques = pd.factorize(series, sort=True)
+    values = codes.astype(np.float64)
+    values[codes < 0] = np.nan
+    return values, uniques
+
+
+def _restore_column(values, func, source, uniques):
+    if func in ("count", "nunique"):
+        return values.astype(np.int64)
+    if uniques is not None and func in ("min", "max", "first"):
+        codes = np.nan_to_num(values.to_numpy(), nan=-1).astype(np.int64)
+        restored = pd.Index(uniques).take(codes, allow_fill=True, fill_value=np.nan)
+        return pd.Series(restored, index=values.index)
+    is_integral = pd.api.types.is_bool_dtype(source) or pd.api.types.is_integer_dtype(source)
+    if is_integral and func == "sum":
+        return values.astype(np.int64)
+    exact = _is_exact_integer(source)
+    if is_integral and (exact or not pd.api.types.is_bool_dtype(source)) and func in ("min", "max", "first"):
+        return values.astype(source.dtype)
+    return values
+
+
+def parallel_groupby(df, key, n_workers=None, min_rows=PARALLEL_MIN_ROWS, **named_aggs):
+    """Equivalent of ``df.groupby(key).agg(**named_aggs)`` run on a process pool.
+
+    Only the reductions in SUPPORTED_FUNCS are accepted, since they can be
+    computed independently per key partition and concatenated unchanged.
+    """
+    for out, (_, func) in named_aggs.items():
+        if func not in SUPPORTED_FUNCS:
+            raise ValueError(f"Unsupported aggregation {func!r} for column {out!r}")
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    # The pipeline stages are flat scripts, so workers must be forked rather
+    # than spawned (spawning would re-run the calling script in every child).
+    fork_available = "fork" in multiprocessing.get_all_start_methods()
+    if len(df) < min_rows or n_workers < 2 or not fork_available:
+        return df.groupby(key).agg(**named_aggs)
+
+    key_codes, key_uniques = pd.factorize(df[key], sort=True)
+    source_cols = list(dict.fromkeys(col for col, _ in named_aggs.values()))
+    names = {col: f"c{i}" for i, col in enumerate(source_cols)}
+    int_names = ["key"] + [names[col] for col in source_cols if _is_exact_integer(df[col])]
+    float_names = [names[col] for col in source_cols if names[col] not in int_names]
+
+    # Stable hash of each distinct key, broadcast to rows through the codes
+    n_parts = n_workers * PARTITIONS_PER_WORKER
+    key_parts = (pd.util.hash_array(np.asarray(key_uniques, dtype=object)) % n_parts).astype(np.int64)
+    valid = key_codes >= 0
+    row_parts = np.where(valid, key_parts[np.where(valid, key_codes, 0)], n_parts)
+    order = np.argsort(row_parts, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(row_parts, minlength=n_parts + 1))])
+
+    segments, blocks = [], []
+    try:
+        arrays = {}
+        for dtype, block_names in ((np.int64, int_names), (np.float64, float_names)):
+            if not block_names:
+                continue
+            shape = (len(block_names), len(df))
+            shm = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * 8))
+            segments.append(shm)
+            blocks.append((shm.name, shape, np.dtype(dtype).str, block_names))
+            block = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+            arrays.update((name, block[row]) for row, name in enumerate(block_names))
+        arrays["key"][:] = key_codes[order]
+        col_uniques = {}
+        for col in source_cols:
+            values, col_uniques[col] = _encode_column(df[col])
+            arrays[names[col]][:] = values[order]
+        del arrays, block
+
+        spec = [(out, names[col], func) for out, (col, func) in named_aggs.items()]
+        with ProcessPoolExecutor(
+            max_workers=n_workers, mp_context=multiprocessing.get_context("fork")
+        ) as pool:
+            futures = [
+                pool.submit(_aggregate_partition, blocks, bounds[p], bounds[p + 1], spec)
+                for p in range(n_parts)
+                if bounds[p + 1] > bounds[p]
+            ]
+            parts = [f.result() for f in futures]
+    finally:
+        for shm in segments:
+            shm.close()
+            shm.unlink()
+
+    result = pd.concat(parts).sort_index()
+    for out, (col, func) in named_aggs.items():
+        result[out] = _restore_column(result[out], func, df[col], col_uniques[col])
+    result.index = pd.Index(key_uniques).take(result.index.to_numpy(dtype=np.int64)).rename(key)
+    return result
@@ -0,0 +1,199 @@
+"""
+partner_store.py - Persistent per-partner feature store.
+
+Keeps running sums per PartnerID in flat NumPy arrays backed by a hash
+index, so new order batches are folded in incrementally and features
+can be read back for one partner (O(1)) or for a whole column of IDs
+at once without regrouping the raw orders. Sums are compensated like
+pandas' group-by mean, so averages round the same way as the group-by
+they replace.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from tier_rules import PERFORMANCE_TIER
+
+STORE_PATH = "datas/partner_store.npz"
+HOURS_PER_DAY = 24
+SOURCE_COLUMNS = ["OrderID", "PartnerID", "OrderHour", "PartnerRating", "ActualDeliveryTime"]
+
+
+def _fingerprint(rows):
+    """Wrapping sum of the row hashes of every ingested column; adding a
+    batch adds its sum, so the fingerprint of the rows seen so far is kept
+    up to date without rehashing them."""
+    hashes = pd.util.hash_pandas_object(rows[SOURCE_COLUMNS].astype({
+        "OrderHour": np.int64, "PartnerRating": np.float64, "ActualDeliveryTime": np.float64,
+    }), index=False)
+    return int(hashes.to_numpy().sum(dtype=np.uint64))
+
+
+def _add_compensated(total, error, slots, values):
+    """Kahan-add ``values`` into ``total[slots]``, keeping the lost low
+    bits in ``error``."""
+    y = values - error[slots]
+    t = total[slots] + y
+    error[slots] = (t - total[slots]) - y
+    total[slots] = t
+
+
+class PartnerStore:
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.ids = pd.Index([], dtype=object, name="PartnerID")
+        self.order_count = np.zeros(0, dtype=np.int64)
+        self.time_sum = np.zeros(0, dtype=np.float64)
+        self.rating_sum = np.zeros(0, dtype=np.float64)
+        self.time_error = np.zeros(0, dtype=np.float64)
+        self.rating_error = np.zeros(0, dtype=np.float64)
+        self.hour_mask = np.zeros(0, dtype=np.int64)
+        self.n_rows = 0
+        self.fingerprint = 0
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _grow(self, new_ids):
+        self.ids = self.ids.append(pd.Index(new_ids, dtype=object)).rename("PartnerID")
+        pad = len(new_ids)
+        self.order_count = np.concatenate([self.order_count, np.zeros(pad, dtype=np.int64)])
+        self.time_sum = np.concatenate([self.time_sum, np.zeros(pad)])
+        self.rating_sum = np.concatenate([self.rating_sum, np.zeros(pad)])
+        self.time_error = np.concatenate([self.time_error, np.zeros(pad)])
+        self.rating_error = np.concatenate([self.rating_error, np.zeros(pad)])
+        self.hour_mask = np.concatenate([self.hour_mask, np.zeros(pad, dtype=np.int64)])
+
+    def update(self, batch):
+        if batch.empty:
+            return
+        codes, uniques = pd.factorize(batch["PartnerID"])
+        slots = self.ids.get_indexer(uniques)
+        unseen = slots < 0
+        if unseen.any():
+            slots[unseen] = np.arange(len(self.ids), len(self.ids) + unseen.sum())
+            self._grow(np.asarray(uniques)[unseen])
+
+        rows = slots[codes]
+        n = len(self.ids)
+        self.order_count += np.bincount(rows, minlength=n)
+        # Per-batch sums from pandas, which compensates them as its mean does
+        sums = pd.DataFrame({
+            "time": batch["ActualDeliveryTime"].to_numpy(float),
+            "rating": batch["PartnerRating"].to_numpy(float),
+        }).groupby(rows).sum()
+        batch_slots = sums.index.to_numpy()
+        _add_compensated(self.time_sum, self.time_error, batch_slots, sums["time"].to_numpy())
+        _add_compensated(self.rating_sum, self.rating_error, batch_slots, sums["rating"].to_numpy())
+        hour_bits = np.left_shift(1, batch["OrderHour"].to_numpy(np.int64))
+        np.bitwise_or.at(self.hour_mask, rows, hour_bits)
+
+        self.n_rows += len(batch)
+        self.fingerprint = (self.fingerprint + _fingerprint(batch)) % 2**64
+
+    def sync(self, df):
+        """Fold in rows of an append-only order table not yet ingested.
+
+        Returns True when the store changed. If the table no longer starts
+        with the rows seen so far (any of them changed, e.g. the dataset was
+        regenerated), the store is rebuilt from scratch.
+        """
+        stale = self.n_rows > len(df) or (
+            self.n_rows > 0 and _fingerprint(df.iloc[:self.n_rows]) != self.fingerprint
+        )
+        if stale:
+            self.reset()
+        if self.n_rows == len(df):
+            return stale
+        self.update(df.iloc[self.n_rows:])
+        return True
+
+    def _features(self, slots):
+        found = slots >= 0
+        safe = np.where(found, slots, 0)
+        count = np.where(found, self.order_count[safe], 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            avg_time = np.where(found, self.time_sum[safe] / count, np.nan)
+            avg_rating = np.where(found, self.rating_sum[safe] / count, np.nan)
+        mask = np.where(found, self.hour_mask[safe], 0)
+        unique_hours = sum((mask >> h) & 1 for h in range(HOURS_PER_DAY))
+
+        # Tiers are assigned on the 2-dp figures shown in the reports
+        tier = PERFORMANCE_TIER.evaluate(
+            {"avg_rating": np.round(avg_rating, 2), "avg_time": np.round(avg_time, 2)},
+            columns={"rating": "avg_rating", "time": "avg_time"},
+        )
+        tier[~found] = None
+
+        return pd.DataFrame({
+            "total_orders": count,
+            "unique_hours": unique_hours,
+            "avg_rating": avg_rating,
+            "avg_time": avg_time,
+            "utilization": np.where(unique_hours > 0, count / np.maximum(unique_hours, 1), np.nan),
+            "tier": tier,
+        })
+
+    def lookup(self, partner_id):
+        """Features of a single partner as a dict, or None if unknown."""
+        try:
+            slot = self.ids.get_loc(partner_id)
+        except KeyError:
+            return None
+        return self._features(np.array([slot])).iloc[0].to_dict()
+
+    def bulk(self, partner_ids):
+        """Features aligned row-for-row with ``partner_ids``."""
+        partner_ids = pd.Index(partner_ids)
+        frame = self._features(self.ids.get_indexer(partner_ids))
+        frame.index = partner_ids.rename("PartnerID")
+        return frame
+
+    def to_frame(self):
+        """Features of every partner, sorted by PartnerID like a group-by."""
+        frame = self._features(np.arange(len(self.ids)))
+        frame.index = self.ids
+        return frame.sort_index()
+
+    def save(self, path=STORE_PATH):
+        np.savez(
+            path,
+            ids=np.asarray(self.ids, dtype=str),
+            order_count=self.order_count,
+            time_sum=self.time_sum,
+            rating_sum=self.rating_sum,
+            time_error=self.time_error,
+            rating_error=self.rating_error,
+            hour_mask=self.hour_mask,
+            n_rows=self.n_rows,
+            fingerprint=np.uint64(self.fingerprint),
+        )
+
+    @classmethod
+    def load(cls, path=STORE_PATH):
+        store = cls()
+        if not os.path.exists(path):
+            return store
+        with np.load(path) as data:
+            store.ids = pd.Index(data["ids"].astype(object), name="PartnerID")
+            store.order_count = data["order_count"]
+            store.time_sum = data["time_sum"]
+            store.rating_sum = data["rating_sum"]
+            store.time_error = data["time_error"]
+            store.rating_error = data["rating_error"]
+            store.hour_mask = data["hour_mask"]
+            store.n_rows = int(data["n_rows"])
+            store.fingerprint = int(data["fingerprint"])
+        return store
+
+
+def load_partner_store(df=None, path=STORE_PATH):
+    """Open the persisted store, first catching it up with ``df`` if given."""
+    store = PartnerStore.load(path)
+    if df is not None and store.sync(df):
+        store.save(path)
+    return store
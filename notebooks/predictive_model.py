@@ -1,16 +1,56 @@
+import os
+
 import pandas as pd
 import numpy as np
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
-import seaborn as sns
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import LabelEncoder
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
 
-df = pd.read_csv("datas/delivery_data_enriched.csv")
+from chart_pool import ChartSpec, render_charts
+from delivery_rules import PEAK_HOURS
+from dispatch import dispatch_stream, partner_positions
+from eta_service import EtaService, benchmark
+from fleet_sim import orders_from, sweep
+from memory_budget import SAMPLE_ROWS, chunk_rows, fits_in_memory, report_stage, row_bytes, rows_within_budget
+from model_registry import MODEL_DIR, EtaModel, load_model, save_model, training_key
+from partner_store import load_partner_store
+from route_batching import ROUTES_PATH, batch_orders
+from scenario_engine import SCENARIO_PATH, ScenarioEngine, run_scenarios, scenario_grid
+from staffing import OBSERVED, STAFFING_PATH, staffing_plan
+from visualizations import plot_feature_importance, plot_model_comparison
+
+ENRICHED_PATH = "datas/delivery_data_enriched.csv"
+MODEL_COLUMNS = [
+    "OrderID", "PartnerID", "DistanceKM", "PartnerRating", "OrderHour", "PeakHour",
+    "OrderValue", "Weather", "FoodType", "CustomerArea", "DayType", "ActualDeliveryTime",
+    "RestaurantLat", "RestaurantLon", "DeliveryLat", "DeliveryLon",
+]
+# Training working set relative to the raw rows: encodings, feature matrix
+# and the copies the models make
+TRAIN_WORKING_SET = 2
+
+# Row count and per-row footprint, measured on the first rows of the file
+with open(ENRICHED_PATH, "rb") as f:
+    head_bytes = sum(len(line) for _, line in zip(range(SAMPLE_ROWS + 1), f))
+sample = pd.read_csv(ENRICHED_PATH, usecols=MODEL_COLUMNS, nrows=SAMPLE_ROWS)
+estimated_rows = int(os.path.getsize(ENRICHED_PATH) / (head_bytes / (len(sample) + 1)))
+train_row_bytes = row_bytes(sample) * TRAIN_WORKING_SET
+del sample
+in_memory = fits_in_memory(estimated_rows, train_row_bytes)
+if in_memory:
+    df = pd.read_csv(ENRICHED_PATH, usecols=MODEL_COLUMNS)
+else:
+    # Out-of-core: stream the file and keep a uniform sample that fits the budget
+    keep_fraction = rows_within_budget(train_row_bytes) / estimated_rows
+    df = pd.concat(
+        chunk.sample(frac=keep_fraction, random_state=i)
+        for i, chunk in enumerate(pd.read_csv(
+            ENRICHED_PATH, usecols=MODEL_COLUMNS, chunksize=chunk_rows(train_row_bytes)
+        ))
+    ).reset_index(drop=True)
+    print(f"Training on a {keep_fraction:.1%} sample ({len(df):,} rows) to stay within the memory budget")
 
 le_weather = LabelEncoder()
 le_food = LabelEncoder()
@@ -22,10 +62,17 @@ df["FoodType_enc"] = le_food.fit_transform(df["FoodType"])
 df["CustomerArea_enc"] = le_area.fit_transform(df["CustomerArea"])
 df["DayType_enc"] = le_day.fit_transform(df["DayType"])
 
+# A sampled frame must not be synced into the store, which expects the full table
+partner_store = load_partner_store(df if in_memory else None)
+partner_features = partner_store.bulk(df["PartnerID"])
+df["PartnerAvgRating"] = partner_features["avg_rating"].to_numpy()
+df["PartnerOrders"] = partner_features["total_orders"].to_numpy()
+
 features = [
     "DistanceKM", "PartnerRating", "OrderHour", "PeakHour",
     "OrderValue", "Weather_enc", "FoodType_enc",
-    "CustomerArea_enc", "DayType_enc"
+    "CustomerArea_enc", "DayType_enc",
+    "PartnerAvgRating", "PartnerOrders",
 ]
 target = "ActualDeliveryTime"
 
@@ -40,66 +87,64 @@ models = {
     "Gradient Boosting": GradientBoostingRegressor(n_estimators=100, random_state=42),
 }
 
-results = {}
-
 print("=" * 60)
 print("MODEL TRAINING AND EVALUATION")
 print("=" * 60)
 
-for name, model in models.items():
-    model.fit(X_train, y_train)
-    y_pred = model.predict(X_test)
-
-    mae = mean_absolute_error(y_test, y_pred)
-    rmse = np.sqrt(mean_squared_error(y_test, y_pred))
-    r2 = r2_score(y_test, y_pred)
-
-    results[name] = {"MAE": mae, "RMSE": rmse, "R2": r2, "predictions": y_pred}
+# An artifact registered for identical data and models is reused as is
+data_key = training_key(df, features, target, spec=repr(models))
+registered = load_model(key=data_key)
+if registered is None:
+    results = {}
+    for name, model in models.items():
+        model.fit(X_train, y_train)
+        y_pred = model.predict(X_test)
+        results[name] = {
+            "MAE": mean_absolute_error(y_test, y_pred),
+            "RMSE": np.sqrt(mean_squared_error(y_test, y_pred)),
+            "R2": r2_score(y_test, y_pred),
+            "predictions": y_pred,
+        }
+    best_model_name = max(results, key=lambda k: results[k]["R2"])
+    eta_model = EtaModel(
+        models[best_model_name], best_model_name, features,
+        {"Weather": le_weather, "FoodType": le_food, "CustomerArea": le_area, "DayType": le_day},
+        partner_store.to_frame(), evaluation={"results": results},
+    )
+    model_version = save_model(eta_model, data_key, metrics={
+        name: {k: float(v) for k, v in r.items() if k != "predictions"} for name, r in results.items()
+    })
+else:
+    model_version, eta_model = registered
+    results = eta_model.evaluation["results"]
+    print(f"\nData unchanged: reusing registered model v{model_version}")
 
+for name, r in results.items():
     print(f"\n{name}:")
-    print(f"  MAE:  {mae:.2f} minutes")
-    print(f"  RMSE: {rmse:.2f} minutes")
-    print(f"  R2:   {r2:.4f}")
+    print(f"  MAE:  {r['MAE']:.2f} minutes")
+    print(f"  RMSE: {r['RMSE']:.2f} minutes")
+    print(f"  R2:   {r['R2']:.4f}")
 
-best_model_name = max(results, key=lambda k: results[k]["R2"])
-best_model = models[best_model_name]
+best_model_name = eta_model.name
+best_model = eta_model.model
 print(f"\nBest Model: {best_model_name} (R2 = {results[best_model_name]['R2']:.4f})")
+print(f"Model artifact: v{model_version} in {MODEL_DIR}")
 
-
-# Feature Importance
+chart_specs = []
 if hasattr(best_model, "feature_importances_"):
     importance = pd.DataFrame({
         "Feature": features,
         "Importance": best_model.feature_importances_
     }).sort_values("Importance", ascending=True)
+    chart_specs.append(ChartSpec("Feature Importance chart", plot_feature_importance,
+                                 (best_model_name, importance),
+                                 "output/charts/09_feature_importance.png"))
 
-    fig, ax = plt.subplots(figsize=(10, 6))
-    bars = ax.barh(importance["Feature"], importance["Importance"], color="#3498db", edgecolor="black", linewidth=0.5)
-    ax.set_title(f"Feature Importance ({best_model_name})", fontsize=15, fontweight="bold")
-    ax.set_xlabel("Importance", fontsize=13)
-    plt.tight_layout()
-    plt.savefig("output/charts/09_feature_importance.png", bbox_inches="tight")
-    plt.close()
-    print("\nFeature Importance chart saved")
-
-
-# Actual vs Predicted scatter
-fig, axes = plt.subplots(1, 3, figsize=(18, 5))
-
-for i, (name, res) in enumerate(results.items()):
-    axes[i].scatter(y_test, res["predictions"], alpha=0.3, s=15, color="#3498db")
-    axes[i].plot([y_test.min(), y_test.max()], [y_test.min(), y_test.max()],
-                 "r--", linewidth=2, label="Perfect Prediction")
-    axes[i].set_title(f"{name}\nR2={res['R2']:.3f}, MAE={res['MAE']:.1f}", fontsize=12, fontweight="bold")
-    axes[i].set_xlabel("Actual Time (min)")
-    axes[i].set_ylabel("Predicted Time (min)")
-    axes[i].legend()
-
-plt.suptitle("Model Comparison: Actual vs Predicted Delivery Time", fontsize=15, fontweight="bold")
-plt.tight_layout()
-plt.savefig("output/charts/10_model_comparison.png", bbox_inches="tight")
-plt.close()
-print("Model Comparison chart saved")
+chart_specs.append(ChartSpec("Model Comparison chart", plot_model_comparison,
+                             (y_test.to_numpy(), results),
+                             "output/charts/10_model_comparison.png"))
+print()
+render_charts(chart_specs, n_workers=1)
 
 
 # Prediction examples
@@ -107,32 +152,17 @@ print("\n" + "=" * 60)
 print("SAMPLE PREDICTIONS")
 print("=" * 60)
 
+# Hypothetical partners (no PartnerID): long-run rating equal to today's, typical workload
 scenarios = pd.DataFrame({
     "DistanceKM": [2.0, 5.0, 8.0, 3.0, 6.0],
     "PartnerRating": [4.5, 3.5, 2.5, 4.0, 3.0],
     "OrderHour": [12, 19, 20, 10, 15],
     "PeakHour": [1, 1, 1, 0, 0],
     "OrderValue": [350, 280, 200, 400, 150],
-    "Weather_enc": [le_weather.transform(["Sunny"])[0],
-                    le_weather.transform(["Rainy"])[0],
-                    le_weather.transform(["Stormy"])[0],
-                    le_weather.transform(["Cloudy"])[0],
-                    le_weather.transform(["Sunny"])[0]],
-    "FoodType_enc": [le_food.transform(["Pizza"])[0],
-                     le_food.transform(["Indian"])[0],
-                     le_food.transform(["Chinese"])[0],
-                     le_food.transform(["Fast Food"])[0],
-                     le_food.transform(["Desserts"])[0]],
-    "CustomerArea_enc": [le_area.transform(["Downtown"])[0],
-                         le_area.transform(["Suburbs"])[0],
-                         le_area.transform(["Business District"])[0],
-                         le_area.transform(["Downtown"])[0],
-                         le_area.transform(["Suburbs"])[0]],
-    "DayType_enc": [le_day.transform(["Weekday"])[0],
-                    le_day.transform(["Weekend"])[0],
-                    le_day.transform(["Weekday"])[0],
-                    le_day.transform(["Weekend"])[0],
-                    le_day.transform(["Weekday"])[0]],
+    "Weather": ["Sunny", "Rainy", "Stormy", "Cloudy", "Sunny"],
+    "FoodType": ["Pizza", "Indian", "Chinese", "Fast Food", "Desserts"],
+    "CustomerArea": ["Downtown", "Suburbs", "Business District", "Downtown", "Suburbs"],
+    "DayType": ["Weekday", "Weekend", "Weekday", "Weekend", "Weekday"],
 })
 
 scenario_labels = [
@@ -143,24 +173,139 @@ scenario_labels = [
     "Medium distance, avg partner, sunny, off-peak",
 ]
 
-predictions = best_model.predict(scenarios)
+predictions = eta_model.predict(scenarios)
 for label, pred in zip(scenario_labels, predictions):
     print(f"  {label}")
     print(f"    -> Predicted delivery time: {pred:.1f} minutes\n")
 
 
-# Peak hour staffing prediction
+# ETA service: concurrent single-order requests against the registered artifact
+print("=" * 60)
+print("ETA SERVICE")
+print("=" * 60)
+eta_requests = df.sample(2000, replace=True, random_state=0)[[
+    "PartnerID", "DistanceKM", "PartnerRating", "OrderHour", "OrderValue",
+    "Weather", "FoodType", "CustomerArea", "DayType",
+]].to_dict("records")
+with EtaService(load_model(model_version)[1]) as eta_service:
+    eta_service.predict(eta_requests[0])
+    latency = benchmark(eta_service, eta_requests)
+print(f"  {latency['requests']:,} requests from 16 threads: p50 {latency['p50_ms']:.2f} ms, "
+      f"p99 {latency['p99_ms']:.2f} ms, {latency['requests_per_s']:,.0f} requests/s "
+      f"(mean micro-batch {latency['mean_batch']:.1f} orders)\n")
+
+
+# Monte Carlo what-ifs: synthetic order days scored with the best model
+print("=" * 60)
+print("WEATHER & DEMAND SCENARIOS")
+print("=" * 60)
+engine = ScenarioEngine(df, best_model, features, le_weather,
+                        residuals=y_test.to_numpy() - results[best_model_name]["predictions"])
+outcomes = run_scenarios(engine, scenario_grid())
+outcomes.to_csv(SCENARIO_PATH, index=False)
+for _, row in outcomes.iterrows():
+    peak = "observed" if pd.isna(row["peak_share"]) else f"{row['peak_share']:.0%}"
+    partners = "all" if pd.isna(row["min_rating"]) else f">={row['min_rating']:.1f}"
+    print(f"  {row['weather']:<8} peak {peak:<8} partners {partners:<6} -> "
+          f"delayed {row['delay_rate']:.1%}, revenue at risk Rs.{row['revenue_at_risk']:,.0f}/day "
+          f"[p5-p95 {row['revenue_at_risk_p5']:,.0f}-{row['revenue_at_risk_p95']:,.0f}]")
+print(f"  {len(outcomes)} scenarios x {outcomes['orders'].iloc[0]:,} orders saved to {SCENARIO_PATH}\n")
+
+
+# Dispatch: re-assign each hour's orders to the partner pool at minimum ETA
+print("=" * 60)
+print("DISPATCH SIMULATION")
+print("=" * 60)
+fleet = partner_positions(df)
+fleet_history = partner_store.bulk(fleet["PartnerID"])
+fleet["PartnerAvgRating"] = fleet_history["avg_rating"].to_numpy()
+fleet["PartnerOrders"] = fleet_history["total_orders"].to_numpy()
+partner_columns = ["PartnerRating", "PartnerAvgRating", "PartnerOrders"]
+partner_slots = [features.index(c) for c in partner_columns]
+
+
+def predicted_minutes(orders, partners, order_pos, partner_pos):
+    pairs = orders[features].to_numpy(dtype=np.float64)[order_pos]
+    pairs[:, partner_slots] = partners[partner_columns].to_numpy(dtype=np.float64)[partner_pos]
+    return best_model.predict(pd.DataFrame(pairs, columns=features))
+
+
+# A partner covers about three orders an hour
+assignments, dispatch_stats = dispatch_stream(
+    (batch for _, batch in df.groupby("OrderHour")), fleet, predicted_minutes, capacity=3
+)
+print(f"  {dispatch_stats['assigned']:,} of {dispatch_stats['orders']:,} orders assigned "
+      f"across {dispatch_stats['batches']} hourly batches")
+print(f"  Throughput: {dispatch_stats['orders_per_s']:,.0f} orders/s, "
+      f"mean batch latency {dispatch_stats['mean_latency_ms']:.1f} ms")
+print(f"  Mean assigned ETA: {dispatch_stats['mean_eta']:.1f} min "
+      f"(recorded mean delivery time {df[target].mean():.1f} min)\n")
+
+
+# Route batching: each order's predicted delivery time is its promise
+print("=" * 60)
+print("ROUTE BATCHING")
+print("=" * 60)
+df["PromisedMin"] = best_model.predict(X)
+routes, batching = batch_orders(df)
+routes.to_csv(ROUTES_PATH)
+print(f"  {batching['orders']:,} orders -> {batching['routes']:,} routes "
+      f"({batching['multi_stop']:,} multi-stop) in {batching['seconds']:.2f}s")
+print(f"  Distance: {batching['solo_km']:,.0f} km solo -> {batching['route_km']:,.0f} km batched "
+      f"(saved {batching['saved_km']:,.0f} km, {batching['saved_pct']:.1f}%)")
+print(f"  Routes saved to {ROUTES_PATH}\n")
+
+
+# Peak hour staffing: minimum partners per hour from the queueing model, split across areas
 print("=" * 60)
 print("STAFFING RECOMMENDATIONS")
 print("=" * 60)
+fleet_size = df["PartnerID"].nunique()
+staffing = staffing_plan(df, fleet_size=fleet_size)
+staffing.to_csv(STAFFING_PATH, index=False)
+hourly_plan = staffing.groupby(["Scenario", "OrderHour"])["partners"].sum().unstack("Scenario")
+hourly_needed = hourly_plan + staffing.groupby(["Scenario", "OrderHour"])["shortfall"].first().unstack("Scenario")
+worst_weather = staffing.groupby("Scenario")["service_min"].mean().drop(OBSERVED).idxmax()
+
 hourly_load = df.groupby("OrderHour").agg(
     orders=("OrderID", "count"),
     avg_time=("ActualDeliveryTime", "mean"),
 ).round(1)
-
-hourly_load["partners_needed"] = np.ceil(hourly_load["orders"] / 3).astype(int)
+hourly_load["partners_needed"] = hourly_needed[OBSERVED]
+hourly_load["partners_planned"] = hourly_plan[OBSERVED]
+hourly_load["rule_of_three"] = np.ceil(hourly_load["orders"] / 3).astype(int)
 
 for hour, row in hourly_load.iterrows():
-    status = "PEAK" if hour in [11, 12, 13, 18, 19, 20, 21] else "    "
+    status = "PEAK" if hour in PEAK_HOURS else "    "
+    short = f", fleet covers {fleet_size}" if row["partners_needed"] > row["partners_planned"] else ""
     print(f"  {status} Hour {hour:02d}:00 -> {int(row['orders']):3d} orders, "
-          f"avg {row['avg_time']:.1f} min, need ~{row['partners_needed']} partners")
\ No newline at end of file
+          f"avg {row['avg_time']:.1f} min, need ~{int(row['partners_needed'])} partners{short} "
+          f"({int(hourly_needed.loc[hour, worst_weather])} if {worst_weather.lower()})")
+short_hours = (hourly_needed > hourly_plan).sum()
+print(f"  Each hour is sized as one pooled queue and split across areas by load. The plan is\n"
+      f"  capped at the fleet of {fleet_size} partners, {short_hours[OBSERVED]} hours short as observed "
+      f"({short_hours[worst_weather]} if {worst_weather.lower()});\n"
+      f"  plan per hour, area and weather saved to {STAFFING_PATH}")
+
+
+# Fleet simulation: replay the day under the old rule and the queueing plan
+print("\n" + "=" * 60)
+print("FLEET SIMULATION")
+print("=" * 60)
+staffing_plans = {
+    "orders/3": hourly_load["rule_of_three"],
+    "queueing": hourly_load["partners_planned"],
+}
+fleet_scenarios = [
+    (name, plan.reindex(range(24), fill_value=0).to_numpy(), policy)
+    for name, plan in staffing_plans.items()
+    for policy in ("nearest", "any")
+]
+fleet_results = sweep(orders_from(df), fleet_scenarios)
+for name, row in fleet_results.iterrows():
+    print(f"  {name:<10} {row['policy']:<8} served {row['served']:,}/{row['orders']:,}, "
+          f"mean {row['mean_delivery']:.1f} min, p90 {row['p90_delivery']:.1f} min, "
+          f"delayed {row['delay_rate']:.1%}, wait {row['mean_wait']:.1f} min, "
+          f"utilization {row['utilization']:.0%}")
+
+report_stage("predictive_model")
@@ -0,0 +1,151 @@
+"""
+render_cache.py - Skip re-rendering charts and maps whose inputs did not change.
+
+Each output is keyed by a fingerprint of the reduced data it draws plus
+the source of the function that draws it. Rendered files (one or more per
+output, e.g. a chart and its thumbnail) are kept under CACHE_DIR and
+copied back into place on a hit; the cache is capped at
+RENDER_CACHE_MB (env, default 256) and evicts least recently used files.
+
+Bump CACHE_VERSION after changing a helper shared by several plot
+functions (e.g. the theme or chart_density), since only each plot
+function's own source is part of its fingerprint.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+CACHE_DIR = "datas/render_cache"
+DEFAULT_CACHE_MB = 256
+
+
+def _digest(h, obj):
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        h.update(type(obj).__name__.encode())
+        if isinstance(obj, pd.DataFrame):
+            h.update(repr(list(obj.columns)).encode())
+            h.update(repr(list(obj.dtypes)).encode())
+        else:
+            h.update(repr(obj.dtype).encode())
+        h.update(pd.util.hash_pandas_object(obj, index=not isinstance(obj, pd.Index)).to_numpy().tobytes())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype}{obj.shape}".encode())
+        if obj.dtype == object:
+            h.update(pd.util.hash_array(obj.ravel()).tobytes())
+        else:
+            h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, dict):
+        h.update(b"{")
+        for key in sorted(obj, key=repr):
+            _digest(h, key)
+            _digest(h, obj[key])
+        h.update(b"}")
+    elif isinstance(obj, (list, tuple)):
+        h.update(f"{type(obj).__name__}[{len(obj)}]".encode())
+        for item in obj:
+            _digest(h, item)
+    else:
+        h.update(repr(obj).encode())
+
+
+def fingerprint(plot, data):
+    h = hashlib.sha256(f"v{CACHE_VERSION}".encode())
+    try:
+        h.update(inspect.getsource(plot).encode())
+    except (OSError, TypeError):
+        h.update(plot.__qualname__.encode())
+    _digest(h, data)
+    return h.hexdigest()
+
+
+def save_figure(fig, path):
+    fig.savefig(path, bbox_inches="tight")
+    plt.close(fig)
+
+
+class RenderCache:
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=None):
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("RENDER_CACHE_MB", DEFAULT_CACHE_MB)) * 1024 ** 2)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.index_path = os.path.join(cache_dir, "index.json")
+        self.index = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as f:
+                self.index = json.load(f)
+
+    def _artifacts(self, key, paths):
+        return [os.path.join(self.cache_dir, f"{key}-{i}{os.path.splitext(path)[1]}")
+                for i, path in enumerate(paths)]
+
+    def fetch(self, key, paths):
+        """Copy the cached files for ``key`` to ``paths``; False on a miss."""
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        artifacts = self._artifacts(key, paths)
+        entry = self.index.get(key)
+        if entry is None or len(entry.get("files", ())) != len(paths) \
+                or not all(os.path.exists(a) for a in artifacts):
+            return False
+        for artifact, path in zip(artifacts, paths):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            shutil.copyfile(artifact, path)
+        entry["used"] = time.time()
+        self._save_index()
+        return True
+
+    def store(self, key, paths):
+        paths = [paths] if isinstance(paths, str) else list(paths)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        artifacts = self._artifacts(key, paths)
+        for path, artifact in zip(paths, artifacts):
+            shutil.copyfile(path, artifact)
+        self.index[key] = {"files": [os.path.basename(a) for a in artifacts],
+                           "size": sum(os.path.getsize(a) for a in artifacts),
+                           "used": time.time()}
+        self._evict()
+        self._save_index()
+
+    def _evict(self):
+        total = sum(entry["size"] for entry in self.index.values())
+        for key in sorted(self.index, key=lambda k: self.index[k]["used"]):
+            if total <= self.max_bytes:
+                break
+            entry = self.index.pop(key)
+            total -= entry["size"]
+            for name in entry.get("files", ()):
+                try:
+                    os.remove(os.path.join(self.cache_dir, name))
+                except FileNotFoundError:
+                    pass
+
+    def _save_index(self):
+        tmp = self.index_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f)
+        os.replace(tmp, self.index_path)
+
+    def render(self, plot, data, path, save=save_figure, outputs=None):
+        """Write ``plot(data)`` to ``path`` unless a cached copy exists.
+
+        ``save(obj, path)`` writes whatever ``plot`` returns; ``outputs``
+        lists every file it writes when that is more than ``path``.
+        Returns True if the output was rendered, False if it came from
+        the cache.
+        """
+        outputs = outputs or [path]
+        key = fingerprint(plot, data)
+        if self.fetch(key, outputs):
+            return False
+        save(plot(data), path)
+        self.store(key, outputs)
+        return True
@@ -0,0 +1,275 @@
+"""
+render_service.py - Long-lived local render worker.
+
+Keeps matplotlib, seaborn, plotly and the chart modules imported, the
+font cache loaded and the chart theme applied, and renders jobs sent over
+a local socket. A job is a list of chart specs given as plain
+(name, plot, data, path) tuples, where ``plot`` is a "module:function"
+reference to a function of one of the CHART_MODULES, so a client only
+needs this module and the data to get a chart rendered:
+
+    python notebooks/render_service.py serve      # start (foreground)
+    python notebooks/render_service.py status
+    python notebooks/render_service.py stop
+
+    from render_service import request_render
+    request_render([("weather", "visualizations:plot_weather_impact", data,
+                     "output/charts/01_weather_impact.png")])
+
+chart_pool.render_charts() uses the service automatically when one is
+listening and renders in-process otherwise. Connections are served
+concurrently, so a status check is answered while a job renders.
+
+The service listens on a Unix socket in a private (0700) runtime
+directory, or on localhost where Unix sockets are unavailable. Each
+session generates a random authentication key and writes it to a 0600
+file in that directory for clients to read; the service refuses to start
+when it cannot.
+"""
+
+import importlib
+import os
+import secrets
+import signal
+import socket
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+SERVICE_HOST = "127.0.0.1"
+DEFAULT_PORT = 6011
+CHART_MODULES = ["visualizations", "dashboard"]
+PRELOAD_MODULES = CHART_MODULES + ["plotly.graph_objects", "folium"]
+# Seconds a client waits for a reply before rendering locally instead
+PING_TIMEOUT = 5
+RENDER_TIMEOUT = 600
+
+
+def runtime_dir():
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.environ.get("RENDER_SERVICE_DIR",
+                          os.path.join(tempfile.gettempdir(), f"render-service-{user}"))
+
+
+def _private_dir():
+    """The runtime directory, created 0700; raises PermissionError if it
+    is not owned by this user or is open to others."""
+    path = runtime_dir()
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.stat(path)
+    if hasattr(os, "getuid") and (info.st_uid != os.getuid() or info.st_mode & 0o077):
+        raise PermissionError(f"{path} must be a directory only you can access")
+    return path
+
+
+def _key_path():
+    return os.path.join(runtime_dir(), "authkey")
+
+
+def service_address():
+    if hasattr(socket, "AF_UNIX"):
+        return os.path.join(runtime_dir(), "render.sock")
+    return SERVICE_HOST, int(os.environ.get("RENDER_SERVICE_PORT", DEFAULT_PORT))
+
+
+def _describe(address):
+    return address if isinstance(address, str) else f"{address[0]}:{address[1]}"
+
+
+def _new_authkey():
+    """Write a fresh session key to a file only this user can read."""
+    key = secrets.token_bytes(32)
+    path = os.path.join(_private_dir(), "authkey")
+    if os.path.lexists(path):
+        os.remove(path)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+def _authkey():
+    try:
+        with open(_key_path(), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def plot_ref(plot):
+    """"module:function" reference for a plot function or reference."""
+    if isinstance(plot, str):
+        return plot
+    module = plot.__module__
+    if module == "__main__":
+        # Functions of a script run directly live in __main__; the service
+        # imports the same file under its module name instead.
+        module = os.path.splitext(os.path.basename(sys.modules["__main__"].__file__))[0]
+    return f"{module}:{plot.__qualname__}"
+
+
+_loaded_at = {}
+
+
+def resolve_plot(ref):
+    """Import the referenced function of one of the CHART_MODULES,
+    reloading its module if the file changed since the service loaded it."""
+    module_name, name = ref.split(":")
+    if module_name not in CHART_MODULES or name.startswith("_"):
+        raise ValueError(f"{ref} is not a chart function")
+    module = importlib.import_module(module_name)
+    path = getattr(module, "__file__", None)
+    if path:
+        mtime = os.path.getmtime(path)
+        if _loaded_at.setdefault(module_name, mtime) != mtime:
+            module = importlib.reload(module)
+            _loaded_at[module_name] = mtime
+    plot = getattr(module, name)
+    if not callable(plot):
+        raise ValueError(f"{ref} is not a chart function")
+    return plot
+
+
+def _connect():
+    key = _authkey()
+    if key is None:
+        return None
+    try:
+        return Client(service_address(), authkey=key)
+    except (ConnectionError, OSError, AuthenticationError):
+        return None
+
+
+def _call(request, timeout):
+    """Reply of the service to ``request``; None when no service is
+    listening or it does not answer within ``timeout`` seconds."""
+    conn = _connect()
+    if conn is None:
+        return None
+    with conn:
+        try:
+            conn.send(request)
+            if not conn.poll(timeout):
+                return None
+            return conn.recv()
+        except (EOFError, OSError):
+            return None
+
+
+def service_running():
+    return _call(("ping",), PING_TIMEOUT) == "pong"
+
+
+def request_render(specs):
+    """Render (name, plot, data, path) specs on the running service.
+
+    Returns ({name: seconds} for the charts it rendered, {name: error}
+    for those it could not), or None when no service is listening.
+    """
+    return _call(("render", [(name, plot_ref(plot), data, path) for name, plot, data, path in specs]),
+                 RENDER_TIMEOUT)
+
+
+def stop_service():
+    return _call(("shutdown",), PING_TIMEOUT) == "bye"
+
+
+def _render_job(specs):
+    from chart_pool import ChartSpec, render_chart
+
+    timings, errors = {}, {}
+    for name, ref, data, path in specs:
+        try:
+            _, timings[name] = render_chart(ChartSpec(name, resolve_plot(ref), data, path))
+        except Exception as exc:
+            errors[name] = f"{type(exc).__name__}: {exc}"
+    return timings, errors
+
+
+def serve():
+    start = time.perf_counter()
+    if service_running():
+        sys.exit("render service is already running")
+    address = service_address()
+    try:
+        authkey = _new_authkey()
+        if isinstance(address, str) and os.path.lexists(address):
+            os.remove(address)
+    except OSError as exc:
+        sys.exit(f"render service not started: cannot write its key ({exc})")
+    from chart_pool import setup_style
+
+    for name in PRELOAD_MODULES:
+        module = importlib.import_module(name)
+        if getattr(module, "__file__", None):
+            _loaded_at[name] = os.path.getmtime(module.__file__)
+    setup_style()
+
+    # Exit through the cleanup below when terminated (run_all stops it so)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        with Listener(address, authkey=authkey) as listener:
+            if isinstance(address, str):
+                os.chmod(address, 0o600)
+            print(f"Render service ready on {_describe(address)} "
+                  f"(warm-up {time.perf_counter() - start:.1f}s)", flush=True)
+            _listen(listener)
+    finally:
+        if os.path.exists(_key_path()):
+            os.remove(_key_path())
+    print("Render service stopped")
+
+
+def _listen(listener):
+    """Serve each connection on its own thread, so pings are answered while
+    a job renders; jobs themselves run one at a time, as pyplot is not
+    thread-safe."""
+    render_lock = threading.Lock()
+    stopping = threading.Event()
+
+    def handle(conn):
+        with conn:
+            try:
+                if not conn.poll(PING_TIMEOUT):
+                    return
+                request = conn.recv()
+                if request[0] == "ping":
+                    conn.send("pong")
+                elif request[0] == "render":
+                    with render_lock:
+                        reply = _render_job(request[1])
+                    conn.send(reply)
+                elif request[0] == "shutdown":
+                    conn.send("bye")
+                    stopping.set()
+                    # Wake the accept loop so it sees the flag
+                    wake = _connect()
+                    if wake is not None:
+                        wake.close()
+            except (EOFError, OSError):
+                pass
+
+    while not stopping.is_set():
+        try:
+            conn = listener.accept()
+        except (AuthenticationError, EOFError, OSError):
+            continue
+        if stopping.is_set():
+            conn.close()
+            break
+        threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else "serve"
+    if command == "serve":
+        serve()
+    elif command == "status":
+        print("running" if service_running() else "not running")
+    elif command == "stop":
+        print("stopped" if stop_service() else "not running")
+    else:
+        sys.exit(f"usage: {sys.argv[0]} [serve|status|stop]")
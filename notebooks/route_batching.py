@@ -0,0 +1,158 @@
+"""
+route_batching.py - Group orders into multi-stop delivery routes.
+
+Orders placed in the same hour are batched Clarke-Wright style: pairs
+whose pickups are within PICKUP_RADIUS_KM (a KD-tree pair query) and
+drops within DROP_RADIUS_KM get a vectorized savings estimate, and the
+pairs are merged best-savings-first into routes of up to
+MAX_ORDERS_PER_ROUTE orders. Every merge is re-planned exactly: all
+pickups, then all drops, each leg ordered by 2-opt over the route's
+distance matrix, and it is only kept if every order still arrives
+within its promised time and the route is shorter than the routes it
+replaces.
+"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from dispatch import COURIER_KMH
+from geo_distance import distance_matrix, haversine_km
+from spatial_index import SpatialIndex
+
+MAX_ORDERS_PER_ROUTE = 3
+PICKUP_RADIUS_KM = 1.0
+DROP_RADIUS_KM = 2.5
+SERVICE_MIN = 2
+ROUTES_PATH = "output/reports/route_batches.csv"
+
+
+def _path_km(dist, path):
+    return float(dist[path[:-1], path[1:]].sum())
+
+
+def two_opt(dist, path, fixed_start=False):
+    """Shorten an open path by reversing segments until no reversal helps."""
+    path = np.asarray(path)
+    best = _path_km(dist, path)
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1 if fixed_start else 0, len(path) - 1):
+            for j in range(i + 1, len(path)):
+                candidate = np.concatenate([path[:i], path[i:j + 1][::-1], path[j + 1:]])
+                km = _path_km(dist, candidate)
+                if km < best - 1e-9:
+                    path, best, improved = candidate, km, True
+    return path
+
+
+def plan_route(lat, lon, promise):
+    """Best found stop sequence for one route, or None if some order
+    would miss its promised time.
+
+    ``lat``/``lon`` hold the m pickups followed by the m drops; returns
+    (stop sequence, km, minutes to each order's drop).
+    """
+    m = len(promise)
+    dist = distance_matrix(lat, lon, lat, lon)
+    pickups = two_opt(dist, np.arange(m))
+
+    def timed(drops):
+        path = np.concatenate([pickups, drops])
+        leg_min = np.concatenate([[0], dist[path[:-1], path[1:]]]) / COURIER_KMH * 60
+        arrive = np.cumsum(leg_min) + SERVICE_MIN * np.arange(1, len(path) + 1)
+        at_drop = np.empty(m)
+        at_drop[path[m:] - m] = arrive[m:]
+        return path, at_drop
+
+    drops = two_opt(dist, np.concatenate([[pickups[-1]], m + np.arange(m)]), fixed_start=True)[1:]
+    path, at_drop = timed(drops)
+    if (at_drop > promise).any():
+        # The shortest drop order misses a promise; try earliest deadline first
+        path, at_drop = timed(m + np.argsort(promise, kind="stable"))
+        if (at_drop > promise).any():
+            return None
+    return path, _path_km(dist, path), at_drop
+
+
+def _batch_group(group, promise_col):
+    n = len(group)
+    plat, plon = group["RestaurantLat"].to_numpy(), group["RestaurantLon"].to_numpy()
+    dlat, dlon = group["DeliveryLat"].to_numpy(), group["DeliveryLon"].to_numpy()
+    promise = group[promise_col].to_numpy(dtype=np.float64)
+    solo_km = haversine_km(plat, plon, dlat, dlon)
+
+    members = {i: [i] for i in range(n)}
+    route_of = np.arange(n)
+    route_km = dict(enumerate(solo_km))
+    if n > 1:
+        index = SpatialIndex(plat, plon)
+        pairs = index.tree.query_pairs(PICKUP_RADIUS_KM * 1000, output_type="ndarray")
+        i, j = pairs[:, 0], pairs[:, 1]
+        pick_km = haversine_km(plat[i], plon[i], plat[j], plon[j])
+        drop_km = haversine_km(dlat[i], dlon[i], dlat[j], dlon[j])
+        # Two pickups, one transfer, two drops: cheapest transfer of the four orderings
+        transfer = np.minimum.reduce([
+            haversine_km(plat[a], plon[a], dlat[b], dlon[b]) for a, b in ((i, i), (i, j), (j, i), (j, j))
+        ])
+        savings = solo_km[i] + solo_km[j] - (pick_km + transfer + drop_km)
+        keep = (drop_km <= DROP_RADIUS_KM) & (savings > 0)
+        order = np.argsort(-savings[keep], kind="stable")
+
+        for a, b in zip(i[keep][order], j[keep][order]):
+            ra, rb = route_of[a], route_of[b]
+            if ra == rb or len(members[ra]) + len(members[rb]) > MAX_ORDERS_PER_ROUTE:
+                continue
+            stops = members[ra] + members[rb]
+            plan = plan_route(np.concatenate([plat[stops], dlat[stops]]),
+                              np.concatenate([plon[stops], dlon[stops]]), promise[stops])
+            if plan is None or plan[1] >= route_km[ra] + route_km[rb]:
+                continue
+            members[ra] = stops
+            route_km[ra] = plan[1]
+            route_of[members.pop(rb)] = ra
+            del route_km[rb]
+
+    order_ids = group["OrderID"].to_numpy()
+    return [
+        {
+            "Orders": len(stops),
+            "OrderIDs": " ".join(map(str, order_ids[stops])),
+            "RouteKM": round(route_km[r], 2),
+            "SoloKM": round(float(solo_km[stops].sum()), 2),
+        }
+        for r, stops in members.items()
+    ]
+
+
+def batch_orders(orders, promise_col="PromisedMin", group_col="OrderHour"):
+    """Batch ``orders`` into routes within each ``group_col`` window.
+
+    ``orders`` needs OrderID, restaurant and delivery coordinates and a
+    promised delivery time in minutes (``promise_col``). Returns (routes,
+    summary) with one row per route and the distance saved against
+    delivering every order on its own.
+    """
+    began = time.perf_counter()
+    routes = []
+    for window, group in orders.groupby(group_col, sort=True):
+        for route in _batch_group(group, promise_col):
+            routes.append({group_col: window, **route})
+    routes = pd.DataFrame(routes)
+    routes["SavedKM"] = (routes["SoloKM"] - routes["RouteKM"]).round(2)
+    routes.index = pd.RangeIndex(1, len(routes) + 1, name="route")
+
+    solo, batched = routes["SoloKM"].sum(), routes["RouteKM"].sum()
+    summary = {
+        "orders": len(orders),
+        "routes": len(routes),
+        "multi_stop": int((routes["Orders"] > 1).sum()),
+        "solo_km": solo,
+        "route_km": batched,
+        "saved_km": solo - batched,
+        "saved_pct": 100 * (solo - batched) / solo if solo else 0.0,
+        "seconds": time.perf_counter() - began,
+    }
+    return routes, summary
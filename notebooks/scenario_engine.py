@@ -0,0 +1,171 @@
+"""
+scenario_engine.py - Monte Carlo what-ifs for weather, demand and partners.
+
+A scenario fixes a weather mix, a share of peak-hour orders and a floor
+on the long-run rating of the partners who deliver. Synthetic orders are
+drawn by resampling recorded ones: peak and off-peak rows are mixed to
+the requested share, weather is redrawn from the mix and partner columns
+are taken from partners above the floor. The trained model scores them
+in large chunks, a resampled test residual is added so each delivery
+varies like the recorded ones, and orders are grouped into synthetic days
+of the observed size to give a distribution of daily delay rate and
+revenue at risk. Scenarios run in parallel worker processes.
+"""
+
+import itertools
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from delivery_rules import DELAY_THRESHOLD
+from memory_budget import chunk_rows
+
+SCENARIO_PATH = "output/reports/scenario_outcomes.csv"
+SCENARIO_ORDERS = int(os.environ.get("SCENARIO_ORDERS", 200_000))
+# Same churn assumption analytics uses for RevenueLossContribution
+CHURN_RATE = 0.15
+# Feature matrix, predictions and outcome columns per sampled order
+SCENARIO_ROW_BYTES = 256
+
+WEATHER_MIXES = {
+    "Observed": None,
+    "Sunny": {"Sunny": 1.0},
+    "Monsoon": {"Rainy": 0.6, "Stormy": 0.3, "Cloudy": 0.1},
+    "Storm": {"Stormy": 1.0},
+}
+PEAK_SHARES = (None, 0.8)
+RATING_FLOORS = (None, 4.0)
+PARTNER_COLUMNS = ["PartnerRating", "PartnerAvgRating", "PartnerOrders"]
+
+
+def scenario_grid(weather_mixes=WEATHER_MIXES, peak_shares=PEAK_SHARES, rating_floors=RATING_FLOORS):
+    """Every combination of weather mix, peak share and rating floor;
+    None keeps the recorded distribution."""
+    return [
+        {"weather": name, "mix": mix, "peak_share": peak, "min_rating": floor}
+        for (name, mix), peak, floor in itertools.product(weather_mixes.items(), peak_shares, rating_floors)
+    ]
+
+
+class ScenarioEngine:
+    """Samples and scores synthetic order days from recorded orders.
+
+    ``df`` holds the model's ``features`` plus Weather, PeakHour and
+    OrderValue; ``weather_encoder`` is the fitted LabelEncoder behind the
+    Weather_enc feature and ``residuals`` are the model's errors on
+    held-out orders.
+    """
+
+    def __init__(self, df, model, features, weather_encoder, residuals, day_orders=None):
+        self.model = model
+        self.features = list(features)
+        self.X = df[self.features].to_numpy(dtype=np.float64)
+        self.value = df["OrderValue"].to_numpy(dtype=np.float64)
+        self.peak_rows = np.flatnonzero(df["PeakHour"].to_numpy() == 1)
+        self.off_peak_rows = np.flatnonzero(df["PeakHour"].to_numpy() != 1)
+        self.partner_rating = df["PartnerAvgRating"].to_numpy()
+        self.weather_codes = dict(zip(weather_encoder.classes_, weather_encoder.transform(weather_encoder.classes_)))
+        self.residuals = np.asarray(residuals, dtype=np.float64)
+        self.day_orders = day_orders or len(df)
+        self.weather_slot = self.features.index("Weather_enc")
+        self.partner_slots = [self.features.index(c) for c in PARTNER_COLUMNS]
+
+    def _sample_rows(self, rng, n, peak_share):
+        if peak_share is None:
+            return rng.integers(0, len(self.X), n)
+        peak = rng.random(n) < peak_share
+        rows = self.off_peak_rows[rng.integers(0, len(self.off_peak_rows), n)]
+        rows[peak] = self.peak_rows[rng.integers(0, len(self.peak_rows), int(peak.sum()))]
+        return rows
+
+    def sample(self, rng, n, mix=None, peak_share=None, min_rating=None):
+        """(features, order values) for ``n`` synthetic orders."""
+        rows = self._sample_rows(rng, n, peak_share)
+        X = self.X[rows]
+        if mix is not None:
+            unknown = set(mix) - set(self.weather_codes)
+            if unknown:
+                raise ValueError(f"unknown weather in mix: {sorted(unknown)}")
+            codes = np.array([self.weather_codes[w] for w in mix], dtype=np.float64)
+            weights = np.array(list(mix.values()), dtype=np.float64)
+            X[:, self.weather_slot] = codes[rng.choice(len(codes), n, p=weights / weights.sum())]
+        if min_rating is not None:
+            pool = np.flatnonzero(self.partner_rating >= min_rating)
+            if not len(pool):
+                raise ValueError(f"no partners rated {min_rating} or above")
+            X[:, self.partner_slots] = self.X[pool[rng.integers(0, len(pool), n)]][:, self.partner_slots]
+        return X, self.value[rows]
+
+    def run(self, scenario, n_orders=SCENARIO_ORDERS, seed=0):
+        """Daily delay rate and revenue at risk for one scenario, as
+        arrays with one entry per synthetic day."""
+        rng = np.random.default_rng(seed)
+        n_days = max(n_orders // self.day_orders, 1)
+        days_per_chunk = max(chunk_rows(SCENARIO_ROW_BYTES) // self.day_orders, 1)
+        delay_rate, at_risk = np.empty(n_days), np.empty(n_days)
+        for start in range(0, n_days, days_per_chunk):
+            days = min(days_per_chunk, n_days - start)
+            n = days * self.day_orders
+            X, value = self.sample(rng, n, scenario.get("mix"), scenario.get("peak_share"),
+                                   scenario.get("min_rating"))
+            minutes = self.model.predict(pd.DataFrame(X, columns=self.features))
+            minutes += self.residuals[rng.integers(0, len(self.residuals), n)]
+            delayed = (minutes > DELAY_THRESHOLD).reshape(days, self.day_orders)
+            delay_rate[start:start + days] = delayed.mean(axis=1)
+            at_risk[start:start + days] = (delayed * value.reshape(days, self.day_orders)).sum(axis=1) * CHURN_RATE
+        return delay_rate, at_risk
+
+
+def _summarize(scenario, delay_rate, at_risk, day_orders):
+    p5, p50, p95 = np.percentile(at_risk, [5, 50, 95])
+    return {
+        "weather": scenario["weather"],
+        "peak_share": scenario.get("peak_share"),
+        "min_rating": scenario.get("min_rating"),
+        "days": len(at_risk),
+        "orders": len(at_risk) * day_orders,
+        "delay_rate": delay_rate.mean(),
+        "delay_rate_p5": np.percentile(delay_rate, 5),
+        "delay_rate_p95": np.percentile(delay_rate, 95),
+        "revenue_at_risk": at_risk.mean(),
+        "revenue_at_risk_p5": p5,
+        "revenue_at_risk_p50": p50,
+        "revenue_at_risk_p95": p95,
+    }
+
+
+_engine = None
+
+
+def _run_scenario(job):
+    index, scenario, n_orders, seed = job
+    delay_rate, at_risk = _engine.run(scenario, n_orders, seed)
+    return index, _summarize(scenario, delay_rate, at_risk, _engine.day_orders)
+
+
+def run_scenarios(engine, scenarios, n_orders=SCENARIO_ORDERS, seed=0, n_workers=None):
+    """Run every scenario with ``n_orders`` sampled orders each, one
+    scenario per worker process. Returns one row per scenario."""
+    global _engine
+    scenarios = list(scenarios)
+    seeds = np.random.SeedSequence(seed).generate_state(len(scenarios))
+    jobs = [(i, s, n_orders, int(seeds[i])) for i, s in enumerate(scenarios)]
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = min(n_workers, len(jobs))
+    _engine = engine
+    try:
+        # Forked workers inherit the engine and model instead of unpickling copies
+        if n_workers < 2 or "fork" not in multiprocessing.get_all_start_methods():
+            rows = [_run_scenario(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(
+                max_workers=n_workers, mp_context=multiprocessing.get_context("fork")
+            ) as pool:
+                rows = list(pool.map(_run_scenario, jobs))
+    finally:
+        _engine = None
+    return pd.DataFrame([row for _, row in sorted(rows, key=lambda r: r[0])])
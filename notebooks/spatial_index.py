@@ -0,0 +1,72 @@
+"""
+spatial_index.py - KD-tree lookups over restaurants and delivery points.
+
+Coordinates are projected once to a local metric plane (equirectangular
+around the data's mean latitude, accurate to well under 1% across a
+city) and indexed with scipy's cKDTree, so batched k-nearest and radius
+queries run in compiled code and distances come back in metres.
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from geo_distance import project_km
+
+
+class SpatialIndex:
+    def __init__(self, lat, lon, ref_lat=None, leafsize=32):
+        lat = np.asarray(lat, dtype=np.float64)
+        lon = np.asarray(lon, dtype=np.float64)
+        self.ref_lat = float(lat.mean()) if ref_lat is None else ref_lat
+        self.tree = cKDTree(self.project(lat, lon), leafsize=leafsize)
+
+    def __len__(self):
+        return self.tree.n
+
+    def project(self, lat, lon):
+        return project_km(lat, lon, self.ref_lat) * 1000
+
+    def knn(self, lat, lon, k=1):
+        """Distances (m) and positions of the ``k`` nearest indexed points
+        to each query point, each of shape (n_queries, k)."""
+        dist, idx = self.tree.query(self.project(lat, lon), k=k, workers=-1)
+        if k == 1:
+            dist, idx = dist[:, None], idx[:, None]
+        return dist, idx
+
+    def within(self, lat, lon, radius_m):
+        """Positions of indexed points within ``radius_m`` of each query
+        point, as one array per query."""
+        hits = self.tree.query_ball_point(self.project(lat, lon), r=radius_m, workers=-1)
+        return [np.asarray(h, dtype=np.int64) for h in hits]
+
+    def count_within(self, lat, lon, radius_m):
+        return self.tree.query_ball_point(
+            self.project(lat, lon), r=radius_m, workers=-1, return_length=True
+        )
+
+
+def build_order_indexes(df):
+    """Indexes over the restaurant sites and the delivery drops of ``df``.
+
+    Returns (restaurants, restaurant_index, delivery_index), where
+    ``restaurants`` holds one mean location per RestaurantName in index
+    order.
+    """
+    restaurants = df.groupby("RestaurantName")[["RestaurantLat", "RestaurantLon"]].mean()
+    ref_lat = float(df["DeliveryLat"].mean())
+    restaurant_index = SpatialIndex(restaurants["RestaurantLat"], restaurants["RestaurantLon"], ref_lat)
+    delivery_index = SpatialIndex(df["DeliveryLat"], df["DeliveryLon"], ref_lat)
+    return restaurants, restaurant_index, delivery_index
+
+
+def nearest_restaurants(restaurants, restaurant_index, lat, lon, k=1):
+    """Names and distances (km) of the ``k`` restaurants closest to each point."""
+    k = min(k, len(restaurant_index))
+    dist, idx = restaurant_index.knn(lat, lon, k=k)
+    names = np.asarray(restaurants.index)[idx]
+    return pd.DataFrame({
+        **{f"restaurant_{j + 1}": names[:, j] for j in range(k)},
+        **{f"km_{j + 1}": dist[:, j] / 1000 for j in range(k)},
+    })
@@ -0,0 +1,175 @@
+"""
+staffing.py - Partner staffing from a multi-server queueing model.
+
+Every (weather scenario, hour) pool of partners is treated as an M/M/c
+queue: orders arrive at the hour's observed rate and keep a partner busy
+for the pool's mean delivery time; the pool's headcount is then split
+across areas by their share of the load. An order is late when its own
+trip passes DELAY_THRESHOLD, or when waiting for a free partner pushes an
+otherwise on-time trip past it. The Erlang-C waiting probability comes
+from the Erlang-B recursion over partner counts, run for all cells at
+once, so the minimum staffing of thousands of cells takes a few hundred
+vector steps. Given the fleet size, an hour never gets more partners
+than the fleet has; the plan then reports the shortfall and the delay
+rate the capped pool reaches.
+"""
+
+import numpy as np
+import pandas as pd
+
+from delivery_rules import DELAY_THRESHOLD
+
+# Share of otherwise on-time orders that waiting for a partner may make late
+TARGET_QUEUE_DELAY = 0.05
+MAX_PARTNERS = 1000
+STAFFING_PATH = "output/reports/staffing_plan.csv"
+OBSERVED = "Observed"
+
+
+def _delay_by_partners(arrivals, service_min, on_time_min, base_delay):
+    """Yield (c, delay rate of every cell with c partners) for c = 1, 2, ..."""
+    load = arrivals * service_min / 60
+    slack = np.maximum(DELAY_THRESHOLD - on_time_min, 0)
+    erlang_b = np.ones_like(load)
+    c = 0
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        while True:
+            c += 1
+            erlang_b = load * erlang_b / (c + load * erlang_b)
+            wait_prob = erlang_b / (1 - load / c * (1 - erlang_b))
+            # Waits are exponential with rate c/service - arrivals (per minute)
+            drain = np.maximum(c / service_min - arrivals / 60, 0)
+            pushed_late = np.where(c > load, wait_prob * np.exp(-drain * slack), 1.0)
+            yield c, base_delay + (1 - base_delay) * pushed_late
+
+
+def _as_arrays(*values):
+    return [np.asarray(v, dtype=np.float64) for v in values]
+
+
+def delay_rate(partners, arrivals, service_min, on_time_min, base_delay):
+    """Modelled delay rate of every cell when staffed with ``partners``.
+
+    ``arrivals`` are orders per hour, ``service_min`` the mean time a
+    partner spends on an order, ``on_time_min`` the mean trip time of the
+    orders that are on time by themselves and ``base_delay`` the share
+    that are late regardless of staffing.
+    """
+    partners = np.asarray(partners, dtype=np.int64)
+    rates = np.ones(len(partners))
+    for c, rate in _delay_by_partners(*_as_arrays(arrivals, service_min, on_time_min, base_delay)):
+        if c > partners.max(initial=0):
+            return rates
+        rates = np.where(partners == c, rate, rates)
+
+
+def min_partners(arrivals, service_min, on_time_min, base_delay,
+                 target=TARGET_QUEUE_DELAY, max_partners=MAX_PARTNERS):
+    """Fewest partners per cell at which waiting makes at most ``target``
+    of the otherwise on-time orders late (see delay_rate for the inputs).
+
+    Returns (partners, delay_rate); cells that need more than
+    ``max_partners`` get max_partners.
+    """
+    arrivals, service_min, on_time_min, base_delay = _as_arrays(
+        arrivals, service_min, on_time_min, base_delay)
+    bound = base_delay + (1 - base_delay) * target + 1e-12
+    partners = np.full(len(arrivals), max_partners, dtype=np.int64)
+    rates = np.ones(len(arrivals))
+    pending = np.ones(len(arrivals), dtype=bool)
+    for c, rate in _delay_by_partners(arrivals, service_min, on_time_min, base_delay):
+        met = pending & (rate <= bound)
+        partners[met], rates[met] = c, rate[met]
+        pending &= ~met
+        if c == max_partners:
+            rates[pending] = rate[pending]
+        if not pending.any() or c == max_partners:
+            return partners, rates
+
+
+def _cell_load(cell, n_cells, scaled, on_time):
+    """Orders, mean service minutes, mean on-time trip and base delay rate
+    of every (scenario, cell), scenario-major."""
+    n_scenarios = scaled.shape[1]
+    slot = (cell[:, None] + n_cells * np.arange(n_scenarios)[None, :]).ravel()
+    size = n_cells * n_scenarios
+    orders = np.tile(np.bincount(cell, minlength=n_cells), n_scenarios).astype(np.float64)
+    busy = np.bincount(slot, weights=scaled.ravel(), minlength=size)
+    n_on_time = np.bincount(slot, weights=on_time.ravel(), minlength=size)
+    on_time_busy = np.bincount(slot, weights=(scaled * on_time).ravel(), minlength=size)
+    service_min = busy / orders
+    on_time_min = np.divide(on_time_busy, n_on_time, out=np.zeros(size), where=n_on_time > 0)
+    return orders, service_min, on_time_min, 1 - n_on_time / orders
+
+
+def _split(total, weights, group):
+    """Integer shares of ``total[group]`` proportional to ``weights`` within
+    each group, by largest remainder."""
+    group_weight = np.bincount(group, weights=weights)
+    exact = total[group] * weights / group_weight[group]
+    shares = np.floor(exact).astype(np.int64)
+    left = total - np.bincount(group, weights=shares, minlength=len(total)).astype(np.int64)
+    order = np.lexsort((-(exact - shares), group))
+    rank = np.arange(len(order)) - np.searchsorted(group[order], group[order])
+    shares[order] += (rank < left[group[order]]).astype(np.int64)
+    return shares
+
+
+def staffing_plan(df, target=TARGET_QUEUE_DELAY, by=("OrderHour", "CustomerArea"),
+                  pool_by=("OrderHour",), time_col="ActualDeliveryTime", fleet_size=None):
+    """Minimum partners per ``by`` cell under the observed weather mix and
+    under a whole day of each weather.
+
+    A weather scenario scales every trip by that weather's mean delivery
+    time relative to the overall mean. ``df`` is treated as one day of
+    orders. Partners are sized for the shared pool of each ``pool_by``
+    cell (partners cross areas within an hour, and one large queue needs
+    fewer partners than the sum of its parts) and split across its ``by``
+    cells in proportion to their load; pool_by=None sizes every ``by``
+    cell as a queue of its own. delay_rate is the modelled rate of the
+    pool. With ``fleet_size``, no pool gets more partners than that;
+    shortfall is how many more its pool would need. Returns one row per
+    (Scenario, *by) cell.
+    """
+    by = list(by)
+    pool_by = by if pool_by is None else list(pool_by)
+    cell = df.groupby(by, sort=True).ngroup().to_numpy()
+    keys = df[by].drop_duplicates().sort_values(by).reset_index(drop=True)
+    n_cells = len(keys)
+    pool = df.groupby(pool_by, sort=True).ngroup().to_numpy()
+    n_pools = pool.max() + 1
+    cell_pool = np.zeros(n_cells, dtype=np.int64)
+    cell_pool[cell] = pool
+
+    times = df[time_col].to_numpy(dtype=np.float64)
+    weather_mean = df.groupby("Weather")[time_col].mean()
+    scale = pd.concat([pd.Series({OBSERVED: 1.0}), weather_mean / times.mean()])
+
+    # All scenarios at once: rows are orders, columns scenarios
+    scaled = times[:, None] * scale.to_numpy()[None, :]
+    on_time = scaled <= DELAY_THRESHOLD
+    orders, service_min, _, base_delay = _cell_load(cell, n_cells, scaled, on_time)
+    pool_load = _cell_load(pool, n_pools, scaled, on_time)
+    pool_partners, pool_rates = min_partners(*pool_load, target)
+    pool_shortfall = np.zeros(len(pool_partners), dtype=np.int64)
+    if fleet_size is not None:
+        pool_shortfall = np.maximum(pool_partners - fleet_size, 0)
+        pool_partners = pool_partners - pool_shortfall
+        pool_rates = np.where(pool_shortfall > 0, delay_rate(pool_partners, *pool_load), pool_rates)
+
+    # Flattened (scenario, cell) -> (scenario, pool)
+    cell_pool = (cell_pool[None, :] + n_pools * np.arange(len(scale))[:, None]).ravel()
+    load = orders * service_min / 60
+    partners = _split(pool_partners, load, cell_pool)
+
+    plan = pd.concat([keys] * len(scale), ignore_index=True)
+    plan.insert(0, "Scenario", np.repeat(scale.index.to_numpy(), n_cells))
+    plan["orders"] = orders.astype(int)
+    plan["service_min"] = service_min.round(1)
+    plan["base_delay_rate"] = base_delay.round(3)
+    plan["partners"] = partners
+    plan["shortfall"] = pool_shortfall[cell_pool]
+    plan["delay_rate"] = pool_rates[cell_pool].round(3)
+    plan["utilization"] = np.divide(load, partners, out=np.full(len(load), np.nan),
+                                    where=partners > 0).round(3)
+    return plan
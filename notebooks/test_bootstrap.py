@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from bootstrap import SegmentBootstrap, bootstrap_ci
+
+
+def make_orders(n=4000, seed=5):
+    rng = np.random.default_rng(seed)
+    times = rng.integers(15, 70, n).astype(float)
+    return pd.DataFrame({
+        "Weather": rng.choice(["Sunny", "Rainy", "Stormy"], n),
+        "ActualDeliveryTime": times,
+        "IsDelayed": times > 40,
+    })
+
+
+def test_intervals_bracket_the_segment_means():
+    orders = make_orders()
+    ci = bootstrap_ci(orders, "Weather", n_boot=500, time="ActualDeliveryTime", delayed="IsDelayed")
+    means = orders.groupby("Weather")[["ActualDeliveryTime", "IsDelayed"]].mean()
+    assert ci.index.name == "Weather"
+    assert ci.index.tolist() == means.index.tolist()
+    assert (ci["time_ci_low"] < means["ActualDeliveryTime"]).all()
+    assert (means["ActualDeliveryTime"] < ci["time_ci_high"]).all()
+    assert (ci["delayed_ci_low"] < means["IsDelayed"]).all()
+    assert (means["IsDelayed"] < ci["delayed_ci_high"]).all()
+    # About 1.96 standard errors either side
+    se = orders.groupby("Weather")["ActualDeliveryTime"].sem()
+    width = (ci["time_ci_high"] - ci["time_ci_low"]) / (2 * 1.96 * se)
+    assert width.between(0.8, 1.2).all()
+
+
+def test_streamed_chunks_match_one_pass():
+    orders = make_orders()
+    values = orders[["ActualDeliveryTime", "IsDelayed"]].to_numpy(dtype=float)
+    one_pass = SegmentBootstrap(["time", "delayed"], n_boot=200)
+    one_pass.add(orders["Weather"].to_numpy(), values)
+    streamed = SegmentBootstrap(["time", "delayed"], n_boot=200)
+    for start in range(0, len(orders), 1500):
+        streamed.add(orders["Weather"].to_numpy()[start:start + 1500], values[start:start + 1500])
+    pd.testing.assert_frame_equal(streamed.intervals(), one_pass.intervals())
+
+
+def test_missing_segments_are_skipped():
+    orders = make_orders()
+    orders.loc[:99, "Weather"] = None
+    ci = bootstrap_ci(orders, "Weather", n_boot=100, time="ActualDeliveryTime")
+    assert ci.index.tolist() == ["Rainy", "Stormy", "Sunny"]
+    assert ci.notna().all().all()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from dispatch import COURIER_KMH, dispatch_batch, dispatch_stream, fixed_batches, partner_positions
+from geo_distance import equirectangular_km
+
+# Orders and partners on one meridian; 0.01 degree of latitude is about 1.1 km
+LAT, LON = 12.97, 77.59
+
+
+def make_orders(rest_lat, drop_lat, distance_km=2.0):
+    n = len(rest_lat)
+    return pd.DataFrame({
+        "OrderID": [f"ORD{i}" for i in range(n)],
+        "RestaurantLat": rest_lat, "RestaurantLon": np.full(n, LON),
+        "DeliveryLat": drop_lat, "DeliveryLon": np.full(n, LON),
+        "DistanceKM": np.full(n, distance_km),
+    })
+
+
+def make_partners(lat):
+    return pd.DataFrame({"PartnerID": [f"P{i}" for i in range(len(lat))], "Lat": lat, "Lon": np.full(len(lat), LON)})
+
+
+def test_each_order_gets_its_nearest_free_partner():
+    orders = make_orders([LAT, LAT + 0.05], [LAT, LAT + 0.05])
+    partners = make_partners([LAT + 0.051, LAT + 0.001])
+    result = dispatch_batch(orders, partners)
+    assert result["PartnerID"].tolist() == ["P1", "P0"]
+    assert (result["QueueMin"] == 0).all()
+    np.testing.assert_allclose(result["ETA"], result["PickupMin"] + result["DeliveryMin"], atol=0.11)
+
+
+def test_orders_beyond_capacity_are_left_unassigned():
+    orders = make_orders([LAT, LAT, LAT], [LAT, LAT, LAT])
+    result = dispatch_batch(orders, make_partners([LAT]), capacity=2)
+    assert result["PartnerID"].notna().sum() == 2
+    assert result["ETA"].isna().sum() == 1
+
+
+def test_later_slots_wait_for_earlier_orders():
+    orders = make_orders([LAT + 0.01, LAT + 0.01], [LAT + 0.03, LAT + 0.02])
+    result = dispatch_batch(orders, make_partners([LAT]), capacity=2).sort_values("QueueMin")
+    first, second = result.iloc[0], result.iloc[1]
+    assert first["QueueMin"] == 0
+    # The second order starts when the first is delivered, from its drop-off
+    assert second["QueueMin"] == pytest.approx(first["ETA"], abs=0.11)
+    drop = orders.set_index("OrderID").loc[first["OrderID"]]
+    leg_km = equirectangular_km(drop["DeliveryLat"], LON, LAT + 0.01, LON)
+    assert second["PickupKM"] == pytest.approx(leg_km, abs=0.006)
+    assert second["PickupMin"] == pytest.approx(leg_km / COURIER_KMH * 60, abs=0.11)
+    assert second["ETA"] > first["ETA"] + second["DeliveryMin"]
+
+
+def test_stream_stats_cover_every_batch():
+    rng = np.random.default_rng(3)
+    orders = make_orders(LAT + rng.uniform(0, 0.05, 50), LAT + rng.uniform(0, 0.05, 50))
+    partners = make_partners(LAT + rng.uniform(0, 0.05, 10))
+    assignments, stats = dispatch_stream(fixed_batches(orders, 20), partners, capacity=3)
+    assert stats["batches"] == 3
+    assert stats["orders"] == 50
+    assert stats["assigned"] == assignments["PartnerID"].notna().sum()
+    # No partner takes more than its capacity in any batch
+    per_batch = assignments.assign(batch=np.arange(50) // 20).groupby(["batch", "PartnerID"]).size()
+    assert per_batch.max() <= 3
+
+
+def test_partner_positions_use_last_drop_off():
+    history = pd.DataFrame({
+        "PartnerID": ["P1", "P2", "P1"],
+        "DeliveryLat": [1.0, 2.0, 3.0], "DeliveryLon": [4.0, 5.0, 6.0],
+        "PartnerRating": [4.0, 3.5, 4.5],
+    })
+    positions = partner_positions(history).set_index("PartnerID")
+    assert positions.loc["P1", ["Lat", "Lon", "PartnerRating"]].tolist() == [3.0, 6.0, 4.5]
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+from sklearn.preprocessing import LabelEncoder
+
+import model_registry
+from delivery_rules import PEAK_HOURS
+from model_registry import EtaModel, load_model, save_model, training_key
+
+FEATURES = ["DistanceKM", "PartnerRating", "OrderHour", "PeakHour", "Weather_enc",
+            "PartnerAvgRating", "PartnerOrders"]
+
+
+@pytest.fixture
+def eta_model():
+    rng = np.random.default_rng(0)
+    n = 200
+    orders = pd.DataFrame({
+        "PartnerID": rng.choice(["P01", "P02", "P03"], n),
+        "DistanceKM": rng.uniform(1, 10, n),
+        "PartnerRating": rng.uniform(3, 5, n),
+        "OrderHour": rng.integers(8, 23, n),
+        "Weather": rng.choice(["Sunny", "Rainy", "Stormy"], n),
+    })
+    orders["PeakHour"] = orders["OrderHour"].isin(PEAK_HOURS).astype(int)
+    weather = LabelEncoder().fit(orders["Weather"])
+    orders["Weather_enc"] = weather.transform(orders["Weather"])
+    partners = orders.groupby("PartnerID").agg(
+        avg_rating=("PartnerRating", "mean"), total_orders=("OrderHour", "count"))
+    orders["PartnerAvgRating"] = partners["avg_rating"].reindex(orders["PartnerID"]).to_numpy()
+    orders["PartnerOrders"] = partners["total_orders"].reindex(orders["PartnerID"]).to_numpy()
+    target = 10 + 4 * orders["DistanceKM"] + 3 * orders["PeakHour"] - 2 * orders["PartnerAvgRating"]
+    model = LinearRegression().fit(orders[FEATURES], target)
+    return EtaModel(model, "Linear Regression", FEATURES, {"Weather": weather}, partners)
+
+
+def test_batch_does_not_change_an_order_estimate(eta_model):
+    order = {"PartnerID": "P01", "DistanceKM": 4.0, "PartnerRating": 4.2, "OrderHour": 12,
+             "Weather": "Rainy"}
+    mixed_batch = [
+        order,
+        {k: v for k, v in order.items() if k != "PartnerID"},
+        dict(order, PartnerID="P-UNKNOWN", OrderHour=15),
+        dict(order, PeakHour=0),
+    ]
+    alone = np.array([eta_model.predict([o])[0] for o in mixed_batch])
+    np.testing.assert_allclose(eta_model.predict(mixed_batch), alone)
+
+
+def test_unknown_partner_scored_from_todays_rating(eta_model):
+    order = {"DistanceKM": 4.0, "PartnerRating": 4.2, "OrderHour": 12, "Weather": "Rainy"}
+    matrix = eta_model.feature_matrix([dict(order, PartnerID="P-UNKNOWN"), order])
+    assert (matrix["PartnerAvgRating"] == 4.2).all()
+    assert (matrix["PartnerOrders"] == eta_model.median_orders).all()
+    assert (matrix["PeakHour"] == 1).all()
+
+
+def test_unknown_category_rejected(eta_model):
+    with pytest.raises(ValueError, match="unknown Weather"):
+        eta_model.predict([{"DistanceKM": 4.0, "PartnerRating": 4.2, "OrderHour": 12, "Weather": "Hail"}])
+
+
+def test_registry_reuses_model_for_same_key(eta_model, tmp_path, monkeypatch):
+    monkeypatch.setattr(model_registry, "MODEL_DIR", str(tmp_path))
+    monkeypatch.setattr(model_registry, "REGISTRY_PATH", str(tmp_path / "registry.json"))
+    frame = pd.DataFrame({"DistanceKM": [1.0, 2.0], "ActualDeliveryTime": [20.0, 30.0]})
+    key = training_key(frame, ["DistanceKM"], "ActualDeliveryTime")
+
+    assert load_model(key=key) is None
+    assert save_model(eta_model, key) == 1
+    assert save_model(eta_model, "other") == 2
+    version, loaded = load_model(key=key)
+    assert version == 1
+    assert loaded.name == eta_model.name
+    assert training_key(frame.assign(DistanceKM=[1.0, 2.5]), ["DistanceKM"], "ActualDeliveryTime") != key
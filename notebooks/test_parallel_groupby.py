@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from parallel_groupby import parallel_groupby
+
+
+@pytest.fixture
+def orders():
+    rng = np.random.default_rng(0)
+    n = 5000
+    return pd.DataFrame({
+        "PartnerID": rng.choice([f"P{i:03d}" for i in range(40)], n),
+        "OrderID": np.arange(2**53, 2**53 + n, dtype=np.int64),
+        "OrderHour": rng.integers(0, 24, n),
+        "ActualDeliveryTime": rng.uniform(10, 60, n),
+        "Weather": rng.choice(["Sunny", "Rainy", "Stormy"], n),
+        "IsDelayed": rng.random(n) < 0.3,
+    })
+
+
+AGGS = {
+    "orders": ("OrderID", "count"),
+    "last_order": ("OrderID", "max"),
+    "first_order": ("OrderID", "first"),
+    "order_id_sum": ("OrderID", "sum"),
+    "hours": ("OrderHour", "nunique"),
+    "avg_time": ("ActualDeliveryTime", "mean"),
+    "min_weather": ("Weather", "min"),
+    "delayed": ("IsDelayed", "sum"),
+}
+
+
+def test_matches_pandas_exactly(orders):
+    expected = orders.groupby("PartnerID").agg(**AGGS)
+    result = parallel_groupby(orders, "PartnerID", n_workers=2, min_rows=0, **AGGS)
+    pd.testing.assert_frame_equal(result, expected, check_exact=False, rtol=1e-12)
+    # Integers above 2**53 are not rounded through float64
+    assert (result["last_order"] == expected["last_order"]).all()
+    assert (result["order_id_sum"] == expected["order_id_sum"]).all()
+
+
+def test_missing_keys_are_dropped(orders):
+    orders.loc[::7, "PartnerID"] = None
+    expected = orders.groupby("PartnerID").agg(avg_time=("ActualDeliveryTime", "mean"))
+    result = parallel_groupby(orders, "PartnerID", n_workers=2, min_rows=0,
+                              avg_time=("ActualDeliveryTime", "mean"))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_small_input_falls_back_to_pandas(orders):
+    expected = orders.groupby("PartnerID").agg(orders=("OrderID", "count"))
+    result = parallel_groupby(orders, "PartnerID", orders=("OrderID", "count"))
+    pd.testing.assert_frame_equal(result, expected)
+
+
+def test_unsupported_aggregation_rejected(orders):
+    with pytest.raises(ValueError, match="Unsupported aggregation 'median'"):
+        parallel_groupby(orders, "PartnerID", n_workers=2, min_rows=0,
+                         median_time=("ActualDeliveryTime", "median"))
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from partner_store import PartnerStore, load_partner_store
+
+
+@pytest.fixture
+def orders():
+    rng = np.random.default_rng(1)
+    n = 3000
+    return pd.DataFrame({
+        "OrderID": [f"ORD{i:05d}" for i in range(n)],
+        "PartnerID": rng.choice([f"P{i:03d}" for i in range(30)], n),
+        "OrderHour": rng.integers(8, 23, n),
+        "PartnerRating": rng.uniform(2.5, 5, n).round(1),
+        "ActualDeliveryTime": rng.uniform(10, 70, n).round(1),
+    })
+
+
+def expected_features(df):
+    return df.groupby("PartnerID").agg(
+        total_orders=("OrderID", "count"),
+        unique_hours=("OrderHour", "nunique"),
+        avg_rating=("PartnerRating", "mean"),
+        avg_time=("ActualDeliveryTime", "mean"),
+    )
+
+
+def test_features_match_groupby(orders):
+    store = PartnerStore()
+    store.sync(orders)
+    features = store.to_frame()
+    expected = expected_features(orders)
+    pd.testing.assert_frame_equal(features[expected.columns], expected, check_dtype=False, check_exact=True)
+    assert (features["utilization"] == features["total_orders"] / features["unique_hours"]).all()
+
+
+def test_incremental_batches_match_one_pass(orders):
+    store = PartnerStore()
+    for start in range(0, len(orders), 700):
+        assert store.sync(orders.iloc[:start + 700])
+    assert not store.sync(orders)
+    one_pass = PartnerStore()
+    one_pass.sync(orders)
+    pd.testing.assert_frame_equal(store.to_frame(), one_pass.to_frame())
+
+
+def test_edited_row_rebuilds_store(orders):
+    store = PartnerStore()
+    store.sync(orders)
+    edited = orders.copy()
+    edited.loc[5, "ActualDeliveryTime"] += 30
+    assert store.sync(edited)
+    pd.testing.assert_frame_equal(
+        store.to_frame()[["avg_time"]], expected_features(edited)[["avg_time"]], check_dtype=False)
+
+
+def test_shorter_table_rebuilds_store(orders):
+    store = PartnerStore()
+    store.sync(orders)
+    assert store.sync(orders.iloc[:100])
+    assert store.n_rows == 100
+    assert store.to_frame()["total_orders"].sum() == 100
+
+
+def test_lookup_bulk_and_persistence(orders, tmp_path):
+    path = str(tmp_path / "store.npz")
+    store = load_partner_store(orders, path=path)
+    reloaded = load_partner_store(orders, path=path)
+    pd.testing.assert_frame_equal(reloaded.to_frame(), store.to_frame())
+
+    one = reloaded.lookup("P007")
+    assert one["total_orders"] == (orders["PartnerID"] == "P007").sum()
+    assert reloaded.lookup("P-UNKNOWN") is None
+    bulk = reloaded.bulk(["P007", "P-UNKNOWN"])
+    assert bulk.loc["P007", "avg_time"] == one["avg_time"]
+    assert bulk["total_orders"].tolist() == [one["total_orders"], 0]
+    assert np.isnan(bulk.loc["P-UNKNOWN", "avg_rating"])
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+
+from geo_distance import distance_matrix
+from route_batching import MAX_ORDERS_PER_ROUTE, batch_orders, plan_route, two_opt
+
+LAT, LON = 12.97, 77.59
+
+
+def make_orders(rest, drop, promise=60.0, hour=12):
+    """Orders from (lat, lon) restaurant and drop-off offsets in degrees."""
+    rest, drop = np.asarray(rest, dtype=float), np.asarray(drop, dtype=float)
+    return pd.DataFrame({
+        "OrderID": [f"ORD{i}" for i in range(len(rest))],
+        "RestaurantLat": LAT + rest[:, 0], "RestaurantLon": LON + rest[:, 1],
+        "DeliveryLat": LAT + drop[:, 0], "DeliveryLon": LON + drop[:, 1],
+        "PromisedMin": promise,
+        "OrderHour": hour,
+    })
+
+
+def test_two_opt_untangles_a_crossing_path():
+    lat = LAT + np.array([0.0, 0.01, 0.0, 0.01])
+    lon = LON + np.array([0.0, 0.01, 0.01, 0.0])
+    dist = distance_matrix(lat, lon, lat, lon)
+    path = two_opt(dist, np.arange(4))
+    assert dist[path[:-1], path[1:]].sum() < dist[[0, 1, 2], [1, 2, 3]].sum()
+    assert sorted(path.tolist()) == [0, 1, 2, 3]
+    assert two_opt(dist, np.arange(4), fixed_start=True)[0] == 0
+
+
+def test_plan_route_visits_pickups_before_drops():
+    lat = LAT + np.array([0.0, 0.001, 0.02, 0.021])
+    lon = np.full(4, LON)
+    path, km, at_drop = plan_route(lat, lon, np.array([60.0, 60.0]))
+    assert sorted(path[:2].tolist()) == [0, 1]
+    assert sorted(path[2:].tolist()) == [2, 3]
+    assert (at_drop <= 60).all()
+    assert plan_route(lat, lon, np.array([1.0, 60.0])) is None
+
+
+def test_nearby_orders_share_a_route():
+    orders = make_orders([(0, 0), (0.001, 0), (0.3, 0.3)], [(0.02, 0), (0.021, 0.001), (0.32, 0.3)])
+    routes, summary = batch_orders(orders)
+    assert summary["routes"] == 2
+    assert summary["multi_stop"] == 1
+    shared = routes[routes["Orders"] == 2].iloc[0]
+    assert set(shared["OrderIDs"].split()) == {"ORD0", "ORD1"}
+    assert shared["SavedKM"] > 0
+    assert summary["saved_km"] > 0
+
+
+def test_tight_promises_keep_orders_solo():
+    orders = make_orders([(0, 0), (0.001, 0)], [(0.02, 0), (0.021, 0.001)], promise=9.0)
+    routes, summary = batch_orders(orders)
+    assert summary["multi_stop"] == 0
+    assert (routes["SavedKM"] == 0).all()
+
+
+def test_routes_respect_size_and_hour_windows():
+    rng = np.random.default_rng(4)
+    rest = rng.uniform(0, 0.004, (12, 2))
+    orders = make_orders(rest, rest + 0.02 + rng.uniform(0, 0.004, (12, 2)))
+    orders["OrderHour"] = [12] * 6 + [13] * 6
+    routes, summary = batch_orders(orders)
+    assert routes["Orders"].max() <= MAX_ORDERS_PER_ROUTE
+    assert routes["Orders"].sum() == 12
+    for hour, group in routes.groupby("OrderHour"):
+        ids = " ".join(group["OrderIDs"]).split()
+        assert set(ids) == set(orders.loc[orders["OrderHour"] == hour, "OrderID"])
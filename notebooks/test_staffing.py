@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+
+from staffing import OBSERVED, delay_rate, min_partners, staffing_plan
+
+
+def make_orders(n=1500, seed=6):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "OrderHour": rng.choice([12, 13, 19], n, p=[0.5, 0.2, 0.3]),
+        "CustomerArea": rng.choice(["Downtown", "Suburbs", "Unzoned"], n),
+        "Weather": rng.choice(["Sunny", "Stormy"], n),
+        "ActualDeliveryTime": rng.uniform(15, 45, n),
+    })
+
+
+def test_min_partners_is_the_smallest_count_meeting_the_target():
+    arrivals, service, on_time, base = [30.0, 120.0], [30.0, 35.0], [28.0, 30.0], [0.1, 0.2]
+    partners, rates = min_partners(arrivals, service, on_time, base, target=0.05)
+    bound = np.array(base) + (1 - np.array(base)) * 0.05
+    assert (rates <= bound + 1e-12).all()
+    assert (delay_rate(partners - 1, arrivals, service, on_time, base) > bound).all()
+    # A queue needs more partners than its offered load to be stable
+    assert (partners > np.array(arrivals) * np.array(service) / 60).all()
+
+
+def test_plan_is_capped_at_the_fleet():
+    orders = make_orders()
+    uncapped = staffing_plan(orders)
+    plan = staffing_plan(orders, fleet_size=40)
+    hourly = plan.groupby(["Scenario", "OrderHour"]).agg(partners=("partners", "sum"), shortfall=("shortfall", "first"))
+    needed = uncapped.groupby(["Scenario", "OrderHour"])["partners"].sum()
+    assert (hourly["partners"] == np.minimum(needed, 40)).all()
+    assert (hourly["shortfall"] == needed - hourly["partners"]).all()
+    assert (uncapped["shortfall"] == 0).all()
+    # Short pools report the delay rate of the partners they actually get
+    short = plan["shortfall"] > 0
+    assert short.any()
+    assert (plan.loc[short, "delay_rate"] >= uncapped.loc[short, "delay_rate"]).all()
+    assert set(plan["Scenario"]) == {OBSERVED, "Sunny", "Stormy"}
@@ -0,0 +1,64 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from zones import UNZONED, ZoneIndex, apply_zones, box_zones, load_zones
+
+# A square with a square hole, an L-shaped zone and a two-part zone
+SQUARE = [[[0, 0], [4, 0], [4, 4], [0, 4], [0, 0]], [[1, 1], [2, 1], [2, 2], [1, 2], [1, 1]]]
+L_SHAPE = [[[5, 0], [9, 0], [9, 1], [6, 1], [6, 4], [5, 4], [5, 0]]]
+TWO_PART = [[[0, 5], [2, 5], [2, 6], [0, 6]], [[7, 5], [9, 5], [9.5, 7], [7, 6]]]
+
+
+def naive_zone(x, y, rings_per_zone):
+    """Even-odd ray cast of one point against every edge of every zone."""
+    for zone, rings in enumerate(rings_per_zone):
+        inside = False
+        for ring in rings:
+            ring = np.asarray(ring, dtype=float)
+            for (x0, y0), (x1, y1) in zip(ring, np.roll(ring, -1, axis=0)):
+                if (y0 > y) != (y1 > y) and x < x0 + (y - y0) * (x1 - x0) / (y1 - y0):
+                    inside = not inside
+        if inside:
+            return zone
+    return -1
+
+
+@pytest.fixture
+def index():
+    return ZoneIndex(["Square", "L", "Two"], [SQUARE, L_SHAPE, TWO_PART], grid_cells=16)
+
+
+def test_known_points(index):
+    lon = [0.5, 1.5, 5.5, 7.0, 7.0, 1.0, 8.0, 20.0]
+    lat = [0.5, 1.5, 3.0, 0.5, 3.0, 5.5, 5.8, 20.0]
+    assert index.assign(lat, lon).tolist() == [0, -1, 1, 1, -1, 2, 2, -1]
+
+
+def test_matches_naive_ray_cast(index):
+    rng = np.random.default_rng(2)
+    lon, lat = rng.uniform(-1, 10, 5000), rng.uniform(-1, 8, 5000)
+    expected = [naive_zone(x, y, [SQUARE, L_SHAPE, TWO_PART]) for x, y in zip(lon, lat)]
+    assert index.assign(lat, lon).tolist() == expected
+
+
+def test_zone_names_and_apply(index):
+    assert index.zone_names([0.5, 20.0], [0.5, 20.0]).tolist() == ["Square", UNZONED]
+    frame = pd.DataFrame({"DeliveryLat": [3.0, 1.5], "DeliveryLon": [5.5, 1.5], "CustomerArea": ["A", "B"]})
+    assert apply_zones(frame.copy(), None)["CustomerArea"].tolist() == ["A", "B"]
+    assert apply_zones(frame, index)["CustomerArea"].tolist() == ["L", UNZONED]
+
+
+def test_box_zones_round_trip(tmp_path):
+    path = tmp_path / "zones.geojson"
+    assert load_zones(str(path)) is None
+    path.write_text(json.dumps(box_zones({
+        "Downtown": {"lat_range": (12.95, 12.99), "lon_range": (77.57, 77.61)},
+        "Suburbs": {"lat_range": (12.90, 12.95), "lon_range": (77.61, 77.67)},
+    })))
+    zones = load_zones(str(path))
+    assert len(zones) == 2
+    assert zones.zone_names([12.97, 12.92, 12.92], [77.59, 77.64, 77.58]).tolist() == \
+        ["Downtown", "Suburbs", UNZONED]
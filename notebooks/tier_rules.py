@@ -0,0 +1,145 @@
+"""
+tier_rules.py - Single source of truth for every tier / bucket used in
+the pipeline.
+
+Each Tiering is an ordered list of (label, conditions) rules plus a
+default label. The same definition is evaluated vectorized over pandas
+columns or NumPy arrays, and rendered as a HiveQL CASE expression.
+
+Run this file to rewrite the CASE blocks in hive_queries/queries.hql
+(between "-- BEGIN RULE <name>" / "-- END RULE <name>" markers), or
+with --check to fail if the checked-in queries have drifted.
+"""
+
+import operator
+import re
+import sys
+
+import numpy as np
+
+HQL_PATH = "hive_queries/queries.hql"
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class Tiering:
+    def __init__(self, name, rules, default, columns, sql_columns=None):
+        for _, conditions in rules:
+            for _, op, _ in conditions:
+                if op not in OPERATORS:
+                    raise ValueError(f"{name}: unsupported operator {op!r}")
+        self.name = name
+        self.rules = rules
+        self.default = default
+        self.columns = columns
+        self.sql_columns = sql_columns or columns
+
+    @property
+    def labels(self):
+        return [label for label, _ in self.rules] + [self.default]
+
+    def evaluate(self, data, columns=None):
+        """Label every row of ``data`` (a DataFrame or dict of arrays)."""
+        columns = {**self.columns, **(columns or {})}
+        conditions = []
+        for _, rule in self.rules:
+            mask = True
+            for field, op, threshold in rule:
+                values = np.asarray(data[columns[field]], dtype=float)
+                mask = mask & OPERATORS[op](values, threshold)
+            conditions.append(mask)
+        labels = [label for label, _ in self.rules]
+        return np.select(conditions, labels, default=self.default).astype(object)
+
+    def to_sql(self, columns=None, indent=""):
+        columns = {**self.sql_columns, **(columns or {})}
+        lines = [f"{indent}CASE"]
+        for label, rule in self.rules:
+            condition = " AND ".join(
+                f"{columns[field]} {op} {threshold!r}" for field, op, threshold in rule
+            )
+            lines.append(f"{indent}    WHEN {condition} THEN '{label}'")
+        lines.append(f"{indent}    ELSE '{self.default}'")
+        lines.append(f"{indent}END")
+        return "\n".join(lines)
+
+
+RATING_TIER = Tiering(
+    "RatingTier",
+    [
+        ("High", [("rating", ">=", 4.0)]),
+        ("Medium", [("rating", ">=", 3.0)]),
+    ],
+    default="Low",
+    columns={"rating": "PartnerRating"},
+)
+
+DISTANCE_BUCKET = Tiering(
+    "DistanceBucket",
+    [
+        ("Short", [("distance", "<", 3)]),
+        ("Medium", [("distance", "<", 6)]),
+    ],
+    default="Long",
+    columns={"distance": "DistanceKM"},
+)
+
+PERFORMANCE_TIER = Tiering(
+    "PerformanceTier",
+    [
+        ("Premium", [("rating", ">=", 4.0), ("time", "<", 35)]),
+        ("Standard", [("rating", ">=", 3.0), ("time", "<", 45)]),
+    ],
+    default="Training",
+    columns={"rating": "AvgRating", "time": "AvgTime"},
+    sql_columns={"rating": "AVG(PartnerRating)", "time": "AVG(ActualDeliveryTime)"},
+)
+
+DELIVERY_SPEED = Tiering(
+    "DeliverySpeed",
+    [
+        ("Fast", [("time", "<", 30)]),
+        ("Normal", [("time", "<", 40)]),
+    ],
+    default="Slow",
+    columns={"time": "avg_time"},
+    sql_columns={"time": "AVG(ActualDeliveryTime)"},
+)
+
+TIERINGS = {t.name: t for t in (RATING_TIER, DISTANCE_BUCKET, PERFORMANCE_TIER, DELIVERY_SPEED)}
+
+_RULE_BLOCK = re.compile(
+    r"^(?P<indent>[ \t]*)-- BEGIN RULE (?P<name>\w+)\n.*?^[ \t]*-- END RULE (?P=name)$",
+    re.MULTILINE | re.DOTALL,
+)
+
+
+def render_hql(text):
+    def replace(match):
+        indent, name = match.group("indent"), match.group("name")
+        return (
+            f"{indent}-- BEGIN RULE {name}\n"
+            f"{TIERINGS[name].to_sql(indent=indent)}\n"
+            f"{indent}-- END RULE {name}"
+        )
+    return _RULE_BLOCK.sub(replace, text)
+
+
+if __name__ == "__main__":
+    with open(HQL_PATH) as f:
+        current = f.read()
+    rendered = render_hql(current)
+    if "--check" in sys.argv:
+        if rendered != current:
+            print(f"{HQL_PATH} is out of date with tier_rules.py")
+            sys.exit(1)
+        print(f"{HQL_PATH} matches tier_rules.py")
+    else:
+        with open(HQL_PATH, "w") as f:
+            f.write(rendered)
+        print(f"Rule blocks in {HQL_PATH} regenerated")
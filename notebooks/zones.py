@@ -0,0 +1,160 @@
+"""
+zones.py - Point-in-polygon assignment of orders to delivery zones.
+
+Zones are GeoJSON Polygon/MultiPolygon features with a ``name`` property
+(datas/zones.geojson). A fixed grid is laid over their combined bounding
+box: cells that no zone edge passes through lie wholly inside one zone
+or outside all of them, so points there are assigned by a single cell
+lookup. Only points in cells crossed by an edge are ray-cast, and only
+against the edges overlapping their grid row, in one vectorized pass per
+row. Holes and multi-part zones follow from the even-odd rule. Points
+outside every zone are assigned to UNZONED.
+"""
+
+import json
+import os
+
+import numpy as np
+
+ZONES_PATH = "datas/zones.geojson"
+UNZONED = "Unzoned"
+GRID_CELLS = 256
+MAX_PAIRS_PER_PASS = 4_000_000
+
+
+def _rings(geometry):
+    if geometry["type"] == "Polygon":
+        return geometry["coordinates"]
+    if geometry["type"] == "MultiPolygon":
+        return [ring for polygon in geometry["coordinates"] for ring in polygon]
+    raise ValueError(f"unsupported zone geometry: {geometry['type']}")
+
+
+class ZoneIndex:
+    def __init__(self, names, rings, grid_cells=GRID_CELLS):
+        """``rings[z]`` is a list of (n, 2) lon/lat rings for zone ``z``."""
+        self.names = list(names)
+        edges = []
+        for zone, zone_rings in enumerate(rings):
+            for ring in zone_rings:
+                ring = np.asarray(ring, dtype=np.float64)[:, :2]
+                closed = np.vstack([ring, ring[:1]]) if (ring[0] != ring[-1]).any() else ring
+                edges.append(np.column_stack([closed[:-1], closed[1:], np.full(len(closed) - 1, zone)]))
+        edges = np.vstack(edges)
+        x0, y0, x1, y1 = edges[:, :4].T
+
+        xs, ys = np.concatenate([x0, x1]), np.concatenate([y0, y1])
+        self.lon0, self.lat0 = xs.min(), ys.min()
+        self.n = grid_cells
+        self.dx = (xs.max() - self.lon0) / grid_cells or 1.0
+        self.dy = (ys.max() - self.lat0) / grid_cells or 1.0
+
+        # Cells any edge passes through, horizontal ones included
+        ci0, ci1 = self._cols(np.minimum(x0, x1)), self._cols(np.maximum(x0, x1))
+        ri0, ri1 = self._rows(np.minimum(y0, y1)), self._rows(np.maximum(y0, y1))
+        self.boundary = np.zeros((grid_cells, grid_cells), dtype=bool)
+        for r0, r1, c0, c1 in zip(ri0, ri1, ci0, ci1):
+            self.boundary[r0:r1 + 1, c0:c1 + 1] = True
+
+        # Edges a ray can cross (horizontal ones never do), per grid row (CSR)
+        crossing = y0 != y1
+        self.x0, self.y0, self.x1, self.y1 = x0[crossing], y0[crossing], x1[crossing], y1[crossing]
+        self.edge_zone = edges[crossing, 4].astype(np.int64)
+        ri0, ri1 = ri0[crossing], ri1[crossing]
+        span = ri1 - ri0 + 1
+        row_edges = np.repeat(np.arange(len(span)), span)
+        rows = np.repeat(ri0, span) + np.arange(span.sum()) - np.repeat(np.cumsum(span) - span, span)
+        order = np.argsort(rows, kind="stable")
+        self.row_edges = row_edges[order]
+        self.row_ptr = np.searchsorted(rows[order], np.arange(grid_cells + 1))
+
+        centre_r, centre_c = np.nonzero(~self.boundary)
+        self.cell_zone = np.full((grid_cells, grid_cells), -1, dtype=np.int64)
+        self.cell_zone[centre_r, centre_c] = self._ray_cast(
+            self.lon0 + (centre_c + 0.5) * self.dx, self.lat0 + (centre_r + 0.5) * self.dy, centre_r
+        )
+
+    def __len__(self):
+        return len(self.names)
+
+    def _cols(self, x):
+        return np.clip(((x - self.lon0) / self.dx).astype(np.int64), 0, self.n - 1)
+
+    def _rows(self, y):
+        return np.clip(((y - self.lat0) / self.dy).astype(np.int64), 0, self.n - 1)
+
+    def _ray_cast(self, x, y, rows):
+        """Zone of each point by even-odd crossings of a ray towards +x,
+        testing only the edges that overlap the point's grid row."""
+        zone = np.full(len(x), -1, dtype=np.int64)
+        order = np.argsort(rows, kind="stable")
+        bounds = np.searchsorted(rows[order], np.arange(self.n + 1))
+        for row in np.flatnonzero(np.diff(bounds)):
+            e = self.row_edges[self.row_ptr[row]:self.row_ptr[row + 1]]
+            if not len(e):
+                continue
+            members = order[bounds[row]:bounds[row + 1]]
+            x0, y0, x1, y1 = self.x0[e], self.y0[e], self.x1[e], self.y1[e]
+            owner = np.zeros((len(e), len(self.names)), dtype=np.float32)
+            owner[np.arange(len(e)), self.edge_zone[e]] = 1
+            step = max(1, MAX_PAIRS_PER_PASS // len(e))
+            for start in range(0, len(members), step):
+                idx = members[start:start + step]
+                px, py = x[idx, None], y[idx, None]
+                crosses = ((y0 > py) != (y1 > py)) & (px < x0 + (py - y0) * (x1 - x0) / (y1 - y0))
+                inside = (crosses.astype(np.float32) @ owner) % 2 == 1
+                zone[idx] = np.where(inside.any(axis=1), inside.argmax(axis=1), -1)
+        return zone
+
+    def assign(self, lat, lon):
+        """Zone position of every point, -1 where no zone contains it."""
+        x = np.asarray(lon, dtype=np.float64)
+        y = np.asarray(lat, dtype=np.float64)
+        zone = np.full(len(x), -1, dtype=np.int64)
+        in_box = np.flatnonzero(
+            (x >= self.lon0) & (x <= self.lon0 + self.n * self.dx)
+            & (y >= self.lat0) & (y <= self.lat0 + self.n * self.dy)
+        )
+        rows, cols = self._rows(y[in_box]), self._cols(x[in_box])
+        zone[in_box] = self.cell_zone[rows, cols]
+        edge = self.boundary[rows, cols]
+        zone[in_box[edge]] = self._ray_cast(x[in_box[edge]], y[in_box[edge]], rows[edge])
+        return zone
+
+    def zone_names(self, lat, lon, outside=UNZONED):
+        return np.array(self.names + [outside], dtype=object)[self.assign(lat, lon)]
+
+
+def load_zones(path=ZONES_PATH):
+    """ZoneIndex over the zones in ``path``, or None if there is no file."""
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        features = json.load(f)["features"]
+    return ZoneIndex(
+        [feature["properties"]["name"] for feature in features],
+        [_rings(feature["geometry"]) for feature in features],
+    )
+
+
+def apply_zones(frame, zones):
+    """Replace ``frame["CustomerArea"]`` by the zone of each delivery
+    point. Every stage that groups by area calls this on the raw orders,
+    so their area tables agree; a no-op when ``zones`` is None."""
+    if zones is not None:
+        frame["CustomerArea"] = zones.zone_names(frame["DeliveryLat"], frame["DeliveryLon"])
+    return frame
+
+
+def box_zones(area_coords):
+    """FeatureCollection of rectangular zones given as lat/lon ranges."""
+    features = []
+    for name, box in area_coords.items():
+        (lat0, lat1), (lon0, lon1) = box["lat_range"], box["lon_range"]
+        ring = [[lon0, lat0], [lon1, lat0], [lon1, lat1], [lon0, lat1], [lon0, lat0]]
+        features.append({
+            "type": "Feature",
+            "properties": {"name": name},
+            "geometry": {"type": "Polygon", "coordinates": [ring]},
+        })
+    return {"type": "FeatureCollection", "features": features}
@@ -1,7 +1,20 @@
+import argparse
+import os
 import subprocess
 import sys
 import time
 
+parser = argparse.ArgumentParser(description="Run the full analytics pipeline")
+parser.add_argument("--memory-mb", type=float, default=None,
+                    help="RAM budget shared by all stages (sets PIPELINE_MEMORY_MB)")
+parser.add_argument("--render-service", action="store_true",
+                    help="keep one warm chart render worker for all stages")
+args = parser.parse_args()
+
+env = dict(os.environ)
+if args.memory_mb is not None:
+    env["PIPELINE_MEMORY_MB"] = str(args.memory_mb)
+
 scripts = [
     ("notebooks/generate_data.py",     "Generating Dataset"),
     ("notebooks/setup_hive.py",        "Setting Up Hive Metastore & Tables"),
@@ -18,21 +31,41 @@ scripts = [
 print("=" * 60)
 print("SMART FOOD DELIVERY ANALYTICS PLATFORM")
 print("Full Pipeline Execution")
+if "PIPELINE_MEMORY_MB" in env:
+    print(f"Memory budget: {float(env['PIPELINE_MEMORY_MB']):,.0f} MB")
 print("=" * 60)
 
+service = None
 failed = False
-for script, description in scripts:
-    print(f"\n>>> {description}...")
-    print("-" * 40)
-    start = time.time()
-    result = subprocess.run([sys.executable, script], capture_output=False)
-    elapsed = time.time() - start
-    if result.returncode == 0:
-        print(f"    Completed in {elapsed:.1f}s")
-    else:
-        print(f"    FAILED with return code {result.returncode}")
-        failed = True
-        break
+try:
+    if args.render_service:
+        service = subprocess.Popen([sys.executable, "notebooks/render_service.py", "serve"], env=env)
+        for _ in range(100):
+            if subprocess.run([sys.executable, "notebooks/render_service.py", "status"],
+                              capture_output=True, text=True, env=env).stdout.strip() == "running":
+                break
+            time.sleep(0.2)
+
+    for script, description in scripts:
+        print(f"\n>>> {description}...")
+        print("-" * 40)
+        start = time.time()
+        result = subprocess.run([sys.executable, script], capture_output=False, env=env)
+        elapsed = time.time() - start
+        if result.returncode == 0:
+            print(f"    Completed in {elapsed:.1f}s")
+        else:
+            print(f"    FAILED with return code {result.returncode}")
+            failed = True
+            break
+finally:
+    if service is not None:
+        service.terminate()
+        try:
+            service.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            service.kill()
+            service.wait()
 
 print("\n" + "=" * 60)
 if failed: